@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+import random
+import resource
+import tracemalloc
+from typing import Callable, List
+
+here = os.path.dirname(__file__)
+sys.path.append(here + "/../lib/shared/layers/python-sdk/python")
+
+os.environ.setdefault("AWS_REGION", "us-east-1")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("DOCUMENTS_TABLE_NAME", "DocumentTableName")
+os.environ.setdefault("PROCESSING_BUCKET_NAME", "Bucket")
+os.environ.setdefault("POWERTOOLS_LOG_LEVEL", "WARNING")
+
+WORDS = [
+    "retrieval",
+    "augmented",
+    "generation",
+    "workspace",
+    "document",
+    "embedding",
+    "vector",
+    "search",
+    "the",
+    "of",
+    "and",
+    "a",
+    "to",
+    "in",
+    "is",
+    "chatbot",
+    "model",
+    "latency",
+    "throughput",
+    "index",
+]
+
+
+def generate_document(size: int) -> str:
+    """Deterministic text of `size` characters split in paragraphs. Every
+    sentence is numbered so the chunks are distinct and miss the cache."""
+    rng = random.Random(size)  # nosec B311 not cryptographic
+    parts = []
+    length = 0
+    sentence = 0
+    while length < size:
+        words = rng.choices(WORDS, k=rng.randint(8, 20))
+        value = f"{sentence} {' '.join(words)}."
+        value += "\n\n" if sentence % 8 == 7 else " "
+        parts.append(value)
+        length += len(value)
+        sentence += 1
+
+    return "".join(parts)[:size]
+
+
+def percentile(values: List[float], value: float) -> float:
+    if not values:
+        return 0.0
+
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, int(round(value / 100 * len(values))) - 1))
+
+    return values[idx]
+
+
+def get_max_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return max_rss / 1024**2
+
+    return max_rss / 1024
+
+
+def measure(fn: Callable, *args, trace_memory: bool = False, **kwargs):
+    """Run fn once, return its result, the elapsed seconds and, with
+    trace_memory, the peak Python memory allocated during the call in
+    megabytes. Tracing slows allocation heavy code down noticeably."""
+    if trace_memory:
+        tracemalloc.start()
+
+    try:
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / 1024**2 if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    return result, elapsed, peak
+
+
+def print_table(rows: List[dict], columns: List[str]):
+    widths = [
+        max(len(column), *(len(format_value(row.get(column))) for row in rows))
+        for column in columns
+    ]
+
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    print("  ".join("-" * width for width in widths))
+    for row in rows:
+        print(
+            "  ".join(
+                format_value(row.get(column)).ljust(width)
+                for column, width in zip(columns, widths)
+            )
+        )
+
+
+def format_value(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+
+    return str(value)
@@ -0,0 +1,255 @@
+"""Ingestion throughput benchmark.
+
+Runs split_content, generate_embeddings and add_chunks against local
+stand-ins of the embeddings providers (see stub_providers.py) for several
+document sizes and reports chunks/sec, requests issued, request latency
+percentiles and the peak RSS of the process.
+
+    python benchmarks/embeddings_benchmark.py
+    python benchmarks/embeddings_benchmark.py --sizes 100000 --latency-ms 50 \
+        --throttle-rate 0.05 --providers bedrock-titan sagemaker
+    python benchmarks/embeddings_benchmark.py --output results.json
+
+The storage engine and S3 are replaced with no-ops, add_chunks measures the
+embeddings and the in-process work of the ingestion only.
+"""
+
+import json
+import argparse
+import common
+from unittest import mock
+from stub_providers import (
+    StubBedrockClient,
+    StubOpenAIClient,
+    StubSageMakerClient,
+    StubSettings,
+)
+import genai_core.chunks
+import genai_core.embeddings
+import genai_core.embeddings_cache
+from genai_core.types import EmbeddingsModel, Task
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+PROVIDERS = {
+    "bedrock-titan": {
+        "provider": "bedrock",
+        "name": "amazon.titan-embed-text-v1",
+        "client": StubBedrockClient,
+    },
+    "bedrock-cohere": {
+        "provider": "bedrock",
+        "name": "cohere.embed-multilingual-v3",
+        "client": StubBedrockClient,
+    },
+    "sagemaker": {
+        "provider": "sagemaker",
+        "name": "intfloat/multilingual-e5-large",
+        "client": StubSageMakerClient,
+    },
+    "openai": {
+        "provider": "openai",
+        "name": "text-embedding-ada-002",
+        "client": StubOpenAIClient,
+    },
+}
+COLUMNS = [
+    "provider",
+    "stage",
+    "doc_chars",
+    "chunks",
+    "seconds",
+    "chunks_per_sec",
+    "requests",
+    "throttled",
+    "max_in_flight",
+    "p50_ms",
+    "p99_ms",
+    "peak_traced_mb",
+    "max_rss_mb",
+    "error",
+]
+
+
+def run_benchmark(args) -> list:
+    workspace = {
+        "workspace_id": "benchmark",
+        "engine": "aurora",
+        "has_index": True,
+        "chunking_strategy": "recursive",
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+    }
+    settings = StubSettings(
+        dimensions=args.dimensions,
+        latency_ms=args.latency_ms,
+        item_latency_ms=args.item_latency_ms,
+        throttle_rate=args.throttle_rate,
+    )
+
+    rows = []
+    for size in args.sizes:
+        content = common.generate_document(size)
+        chunks, elapsed, peak = common.measure(
+            genai_core.chunks.split_content,
+            workspace,
+            content,
+            trace_memory=args.trace_memory,
+        )
+        rows.append(
+            {
+                "provider": "-",
+                "stage": "split_content",
+                "doc_chars": size,
+                "chunks": len(chunks),
+                "seconds": elapsed,
+                "chunks_per_sec": len(chunks) / elapsed if elapsed else None,
+                "peak_traced_mb": peak,
+                "max_rss_mb": common.get_max_rss_mb(),
+            }
+        )
+
+        for key in args.providers:
+            rows.extend(
+                run_provider(key, settings, workspace, size, chunks, args.trace_memory)
+            )
+
+    return rows
+
+
+def run_provider(
+    key: str,
+    settings: StubSettings,
+    workspace: dict,
+    size: int,
+    chunks: list,
+    trace_memory: bool,
+):
+    provider = PROVIDERS[key]
+    client = provider["client"](settings)
+    model = {
+        "provider": provider["provider"],
+        "name": provider["name"],
+        "dimensions": settings.dimensions,
+        "default": False,
+    }
+    config = {
+        "bedrock": {"enabled": True},
+        "rag": {"embeddingsModels": [model], "crossEncoderModels": []},
+    }
+    workspace = {
+        **workspace,
+        "embeddings_model_provider": model["provider"],
+        "embeddings_model_name": model["name"],
+    }
+    document = {
+        "document_id": "document",
+        "document_type": "text",
+        "document_sub_type": None,
+        "path": "benchmark.txt",
+        "title": "benchmark",
+    }
+
+    def add_chunks_engine(**kwargs):
+        return {"added_vectors": len(kwargs["chunk_ids"])}
+
+    stages = [
+        (
+            "generate_embeddings",
+            lambda: genai_core.embeddings.generate_embeddings(
+                EmbeddingsModel(**model), chunks, Task.STORE.value, as_array=True
+            ),
+        ),
+        (
+            "add_chunks",
+            lambda: genai_core.chunks.add_chunks(
+                True, workspace, document, None, chunks, []
+            ),
+        ),
+    ]
+
+    rows = []
+    with mock.patch(
+        "genai_core.parameters.get_config", return_value=config
+    ), mock.patch(
+        "genai_core.clients.get_bedrock_client", return_value=client
+    ), mock.patch(
+        "genai_core.clients.get_sagemaker_client", return_value=client
+    ), mock.patch(
+        "genai_core.clients.get_openai_client", return_value=client
+    ), mock.patch(
+        "genai_core.chunks.store_chunks_on_s3"
+    ), mock.patch(
+        "genai_core.aurora.chunks.add_chunks_aurora", side_effect=add_chunks_engine
+    ), mock.patch(
+        "genai_core.aurora.index.request_rebuild"
+    ), mock.patch(
+        "genai_core.documents.set_document_vectors"
+    ):
+        for stage, fn in stages:
+            # Every stage starts cold, the cache would hide the providers
+            genai_core.embeddings_cache.memory_cache.clear()
+            client.reset()
+
+            error = None
+            try:
+                _, elapsed, peak = common.measure(fn, trace_memory=trace_memory)
+            except Exception as e:
+                elapsed, peak = None, None
+                error = f"{type(e).__name__}: {e}"
+
+            metrics = client.metrics
+            rows.append(
+                {
+                    "provider": key,
+                    "stage": stage,
+                    "doc_chars": size,
+                    "chunks": len(chunks),
+                    "seconds": elapsed,
+                    "chunks_per_sec": len(chunks) / elapsed if elapsed else None,
+                    "requests": metrics.requests,
+                    "throttled": metrics.throttled,
+                    "max_in_flight": metrics.max_in_flight,
+                    "p50_ms": common.percentile(metrics.latencies, 50),
+                    "p99_ms": common.percentile(metrics.latencies, 99),
+                    "peak_traced_mb": peak,
+                    "max_rss_mb": common.get_max_rss_mb(),
+                    "error": error,
+                }
+            )
+
+    return rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--providers",
+        nargs="+",
+        choices=list(PROVIDERS.keys()),
+        default=list(PROVIDERS.keys()),
+    )
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--latency-ms", type=float, default=30)
+    parser.add_argument("--item-latency-ms", type=float, default=0.2)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Report the peak Python allocations of each stage (slower)",
+    )
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    rows = run_benchmark(args)
+    common.print_table(rows, COLUMNS)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": vars(args), "results": rows}, f, indent=2)
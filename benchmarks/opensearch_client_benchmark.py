@@ -0,0 +1,155 @@
+"""OpenSearch client per-query overhead benchmark.
+
+Runs the same search against a local HTTP stand-in of the collection with a
+client built for every query (the behaviour before the process-level client
+cache: new boto3 Session, AWS4Auth and OpenSearch client) and with the
+cached get_open_search_client(), and reports the per-query latency.
+
+    python benchmarks/opensearch_client_benchmark.py
+    python benchmarks/opensearch_client_benchmark.py --queries 500 --latency-ms 5
+
+The stand-in answers every request with an empty result after latency-ms,
+the difference between the modes is the client overhead: session and
+credentials resolution, client construction and the TCP connection.
+"""
+
+import os
+import json
+import time
+import boto3
+import argparse
+import threading
+import common
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from opensearchpy import OpenSearch, RequestsHttpConnection
+from requests_aws4auth import AWS4Auth
+import genai_core.opensearch.client
+
+COLUMNS = ["mode", "queries", "seconds", "p50_ms", "p99_ms", "connections"]
+EMPTY_RESPONSE = json.dumps(
+    {"took": 1, "timed_out": False, "hits": {"total": 0, "hits": []}}
+).encode()
+
+
+class StubCollection(object):
+    """A local HTTP server answering every search with no hits."""
+
+    def __init__(self, latency_ms: float):
+        collection = self
+        self.latency_ms = latency_ms
+        self.connections = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, with Nagle the
+            # keep-alive connections would wait for delayed ACKs
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                collection.connections += 1
+                super().setup()
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep(collection.latency_ms / 1000)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(EMPTY_RESPONSE)))
+                self.end_headers()
+                self.wfile.write(EMPTY_RESPONSE)
+
+            do_GET = do_POST
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def create_client_per_call(endpoint: str):
+    session = boto3.Session()
+    credentials = session.get_credentials()
+    url = urllib.parse.urlparse(endpoint)
+
+    awsauth = AWS4Auth(
+        credentials.access_key,
+        credentials.secret_key,
+        session.region_name,
+        "aoss",
+        session_token=credentials.token,
+    )
+
+    return OpenSearch(
+        hosts=[{"host": url.hostname, "port": url.port}],
+        http_auth=awsauth,
+        use_ssl=False,
+        connection_class=RequestsHttpConnection,
+        timeout=300,
+    )
+
+
+def run_mode(mode: str, collection: StubCollection, queries: int) -> dict:
+    genai_core.opensearch.client._clients.clear()
+    collection.connections = 0
+    body = {"query": {"match": {"content": "benchmark"}}}
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(queries):
+        query_start = time.perf_counter()
+        if mode == "per-call":
+            client = create_client_per_call(collection.endpoint)
+        else:
+            client = genai_core.opensearch.client.get_open_search_client()
+        client.search(index="benchmark", body=body, size=25)
+        latencies.append((time.perf_counter() - query_start) * 1000)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "queries": queries,
+        "seconds": elapsed,
+        "p50_ms": common.percentile(latencies, 50),
+        "p99_ms": common.percentile(latencies, 99),
+        "connections": collection.connections,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=2)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    # Static credentials, resolving them is part of the measured overhead
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+    collection = StubCollection(args.latency_ms)
+    genai_core.opensearch.client.OPEN_SEARCH_COLLECTION_ENDPOINT = collection.endpoint
+    try:
+        rows = [
+            run_mode(mode, collection, args.queries) for mode in ["per-call", "cached"]
+        ]
+    finally:
+        collection.shutdown()
+
+    common.print_table(rows, COLUMNS)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": vars(args), "results": rows}, f, indent=2)
@@ -0,0 +1,165 @@
+"""Local stand-ins for the Bedrock, SageMaker and OpenAI embeddings APIs.
+
+Each stub sleeps for a configurable request latency, can throttle a share of
+the requests and returns deterministic vectors, so the ingestion code can be
+benchmarked without AWS credentials or network access.
+"""
+
+import io
+import json
+import time
+import zlib
+import random
+import threading
+import numpy as np
+from botocore.exceptions import ClientError
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import List
+
+
+@dataclass
+class StubSettings:
+    dimensions: int = 1024
+    # Fixed latency of a request plus the latency added by each text
+    latency_ms: float = 30
+    item_latency_ms: float = 0.2
+    # Share of the requests rejected with a throttling error
+    throttle_rate: float = 0.0
+    seed: int = 0
+
+
+@dataclass
+class StubMetrics:
+    requests: int = 0
+    throttled: int = 0
+    items: int = 0
+    latencies: List[float] = field(default_factory=list)
+    max_in_flight: int = 0
+
+
+class StubProvider(object):
+    def __init__(self, settings: StubSettings):
+        self.settings = settings
+        self.metrics = StubMetrics()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(settings.seed)  # nosec B311 not cryptographic
+
+    def reset(self):
+        with self._lock:
+            self.metrics = StubMetrics()
+
+    def _request(self, texts: List[str]) -> np.ndarray:
+        with self._lock:
+            self._in_flight += 1
+            self.metrics.requests += 1
+            self.metrics.max_in_flight = max(
+                self.metrics.max_in_flight, self._in_flight
+            )
+            throttled = self._random.random() < self.settings.throttle_rate
+
+        start = time.perf_counter()
+        try:
+            if throttled:
+                # Throttled requests are rejected quickly
+                time.sleep(self.settings.latency_ms / 4000)
+                with self._lock:
+                    self.metrics.throttled += 1
+                raise self._throttling_error()
+
+            time.sleep(
+                (self.settings.latency_ms + self.settings.item_latency_ms * len(texts))
+                / 1000
+            )
+
+            return np.stack([self._embed(text) for text in texts])
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._in_flight -= 1
+                if not throttled:
+                    self.metrics.items += len(texts)
+                    self.metrics.latencies.append(elapsed * 1000)
+
+    def _embed(self, text: str) -> np.ndarray:
+        seed = zlib.crc32(text.encode("utf-8"))
+        vector = np.random.default_rng(seed).standard_normal(
+            self.settings.dimensions, dtype=np.float32
+        )
+
+        return vector / np.linalg.norm(vector)
+
+    def _throttling_error(self) -> Exception:
+        return ClientError(
+            {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+            "InvokeModel",
+        )
+
+
+class StubBedrockClient(StubProvider):
+    """bedrock-runtime client for the Amazon Titan and Cohere models."""
+
+    def invoke_model(self, body, modelId, accept=None, contentType=None):
+        request = json.loads(body)
+
+        if modelId.startswith("cohere."):
+            embeddings = self._request(request["texts"])
+            response = {"embeddings": embeddings.tolist()}
+        else:
+            embeddings = self._request([request["inputText"]])
+            response = {"embedding": embeddings[0].tolist()}
+
+        return {"body": io.BytesIO(json.dumps(response).encode("utf-8"))}
+
+
+class StubSageMakerClient(StubProvider):
+    """sagemaker-runtime client for the RAG models endpoint."""
+
+    def invoke_endpoint(self, EndpointName, ContentType, Body):
+        request = json.loads(Body)
+        embeddings = self._request(request["input"])
+
+        return {"Body": io.BytesIO(json.dumps(embeddings.tolist()).encode("utf-8"))}
+
+    def _throttling_error(self) -> Exception:
+        return ClientError(
+            {
+                "Error": {
+                    "Code": "ServiceUnavailableException",
+                    "Message": "Endpoint is busy",
+                }
+            },
+            "InvokeEndpoint",
+        )
+
+
+class StubOpenAIClient(StubProvider):
+    """openai module, only embeddings.create is implemented.
+
+    The OpenAI SDK retries rate limited requests itself, the stub does the
+    same so throttling shows up as latency instead of failures.
+    """
+
+    max_retries = 2
+
+    def __init__(self, settings: StubSettings):
+        super().__init__(settings)
+        self.embeddings = SimpleNamespace(create=self._create)
+
+    def _create(self, input: List[str], model: str):
+        for attempt in range(self.max_retries + 1):
+            try:
+                embeddings = self._request(input)
+                break
+            except RuntimeError:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(0.5 * 2**attempt)
+
+        return SimpleNamespace(
+            data=[SimpleNamespace(embedding=value.tolist()) for value in embeddings]
+        )
+
+    def _throttling_error(self) -> Exception:
+        return RuntimeError("Rate limit reached for requests")
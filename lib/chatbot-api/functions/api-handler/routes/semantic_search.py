@@ -1,6 +1,15 @@
-from common.constant import ID_FIELD_VALIDATION, SAFE_SHORT_STR_VALIDATION
+from datetime import datetime
+from typing import Optional
+from common.constant import (
+    ID_FIELD_VALIDATION,
+    ID_FIELD_VALIDATION_OPTIONAL,
+    SAFE_HTTP_STR_REGEX,
+    SAFE_SHORT_STR_VALIDATION,
+    SAFE_SHORT_STR_VALIDATION_OPTIONAL,
+)
 import genai_core.semantic_search
-from pydantic import BaseModel
+import genai_core.types
+from pydantic import BaseModel, Field
 from aws_lambda_powertools import Logger, Tracer
 from aws_lambda_powertools.event_handler.appsync import Router
 
@@ -9,9 +18,23 @@ router = Router()
 logger = Logger()
 
 
+class SemanticSearchFilter(BaseModel):
+    documentId: Optional[str] = ID_FIELD_VALIDATION_OPTIONAL
+    documentSubId: Optional[str] = ID_FIELD_VALIDATION_OPTIONAL
+    documentType: Optional[str] = SAFE_SHORT_STR_VALIDATION_OPTIONAL
+    pathPrefix: Optional[str] = Field(
+        min_length=1, max_length=2000, pattern=SAFE_HTTP_STR_REGEX, default=None
+    )
+    createdAfter: Optional[datetime] = None
+    createdBefore: Optional[datetime] = None
+
+
 class SemanticSearchRequest(BaseModel):
     workspaceId: str = ID_FIELD_VALIDATION
     query: str = SAFE_SHORT_STR_VALIDATION
+    probes: Optional[int] = Field(default=None, ge=1, le=1000)
+    efSearch: Optional[int] = Field(default=None, ge=1, le=1000)
+    filter: Optional[SemanticSearchFilter] = None
 
 
 @router.resolver(field_name="performSemanticSearch")
@@ -24,12 +47,29 @@ def semantic_search(input: dict):
         query=request.query,
         limit=25,
         full_response=True,
+        probes=request.probes,
+        ef_search=request.efSearch,
+        filter=_convert_filter(request.filter),
     )
     result = _convert_semantic_search_result(request.workspaceId, result)
 
     return result
 
 
+def _convert_filter(filter: Optional[SemanticSearchFilter]):
+    if filter is None:
+        return None
+
+    return genai_core.types.SearchFilter(
+        document_id=filter.documentId,
+        document_sub_id=filter.documentSubId,
+        document_type=filter.documentType,
+        path_prefix=filter.pathPrefix,
+        created_after=filter.createdAfter,
+        created_before=filter.createdBefore,
+    )
+
+
 def _convert_semantic_search_result(workspace_id: str, result: dict):
     vector_search_items = result.get("vector_search_items")
     keyword_search_items = result.get("keyword_search_items")
@@ -56,11 +96,28 @@ def _convert_semantic_search_result(workspace_id: str, result: dict):
         "vectorSearchMetric": result.get("vector_search_metric"),
         "vectorSearchItems": vector_search_items,
         "keywordSearchItems": keyword_search_items,
+        "timings": _convert_timings(result.get("timings")),
     }
 
     return ret_value
 
 
+def _convert_timings(timings: Optional[dict]):
+    if timings is None:
+        return None
+
+    return {
+        "embeddings": timings.get("embeddings"),
+        "languageDetection": timings.get("language_detection"),
+        "vectorSearch": timings.get("vector_search"),
+        "keywordSearch": timings.get("keyword_search"),
+        "hybridSearch": timings.get("hybrid_search"),
+        "rerank": timings.get("rerank"),
+        "cacheHit": timings.get("cache_hit"),
+        "total": timings.get("total"),
+    }
+
+
 def _convert_semantic_search_item(item: dict):
     ret_value = {
         "sources": item["sources"],
@@ -9,6 +9,7 @@ import genai_core.kendra
 import genai_core.bedrock_kb
 import genai_core.parameters
 import genai_core.workspaces
+from genai_core.aurora.index import HNSW_EF_CONSTRUCTION, HNSW_M
 from pydantic import BaseModel, Field
 from aws_lambda_powertools import Logger, Tracer
 from aws_lambda_powertools.event_handler.appsync import Router
@@ -42,6 +43,14 @@ class CreateWorkspaceAuroraRequest(BaseModel):
     chunkingStrategy: str = SAFE_SHORT_STR_VALIDATION
     chunkSize: int = Field(gt=100)
     chunkOverlap: int = Field(gt=0)
+    vectorQuantization: Optional[str] = SAFE_SHORT_STR_VALIDATION_OPTIONAL
+    indexType: Optional[str] = SAFE_SHORT_STR_VALIDATION_OPTIONAL
+    hnswM: Optional[int] = Field(default=None, ge=2, le=100)
+    hnswEfConstruction: Optional[int] = Field(default=None, ge=4, le=1000)
+    hnswEfSearch: Optional[int] = Field(default=None, ge=1, le=1000)
+    ivfflatProbes: Optional[int] = Field(default=None, ge=1, le=1000)
+    rerankTopN: Optional[int] = Field(default=None, ge=1, le=1000)
+    rerankSkipGap: Optional[float] = Field(default=None, ge=0, le=1)
 
 
 class CreateWorkspaceOpenSearchRequest(BaseModel):
@@ -60,6 +69,9 @@ class CreateWorkspaceOpenSearchRequest(BaseModel):
     chunkingStrategy: str = SAFE_SHORT_STR_VALIDATION
     chunkSize: int = Field(gt=0)
     chunkOverlap: int = Field(gt=0)
+    vectorQuantization: Optional[str] = SAFE_SHORT_STR_VALIDATION_OPTIONAL
+    rerankTopN: Optional[int] = Field(default=None, ge=1, le=1000)
+    rerankSkipGap: Optional[float] = Field(default=None, ge=0, le=1)
 
 
 class CreateWorkspaceKendraRequest(BaseModel):
@@ -194,6 +206,18 @@ def _create_workspace_aurora(request: CreateWorkspaceAuroraRequest, config: dict
     if request.chunkOverlap < 0 or request.chunkOverlap >= request.chunkSize:
         raise genai_core.types.CommonError("Invalid chunk overlap")
 
+    if request.vectorQuantization not in [None, "none", "halfvec", "binary"]:
+        raise genai_core.types.CommonError("Invalid vector quantization")
+
+    if request.indexType not in [None, "ivfflat", "hnsw"]:
+        raise genai_core.types.CommonError("Invalid index type")
+
+    # pgvector requires ef_construction >= 2 * m
+    hnsw_m = request.hnswM or HNSW_M
+    hnsw_ef_construction = request.hnswEfConstruction or HNSW_EF_CONSTRUCTION
+    if hnsw_ef_construction < 2 * hnsw_m:
+        raise genai_core.types.CommonError("Invalid HNSW parameters")
+
     return _convert_workspace(
         genai_core.workspaces.create_workspace_aurora(
             workspace_name=workspace_name,
@@ -209,6 +233,14 @@ def _create_workspace_aurora(request: CreateWorkspaceAuroraRequest, config: dict
             chunking_strategy=request.chunkingStrategy,
             chunk_size=request.chunkSize,
             chunk_overlap=request.chunkOverlap,
+            vector_quantization=request.vectorQuantization or "none",
+            index_type=request.indexType or "ivfflat",
+            hnsw_m=request.hnswM,
+            hnsw_ef_construction=request.hnswEfConstruction,
+            hnsw_ef_search=request.hnswEfSearch,
+            ivfflat_probes=request.ivfflatProbes,
+            rerank_top_n=request.rerankTopN,
+            rerank_skip_gap=request.rerankSkipGap,
         )
     )
 
@@ -258,6 +290,9 @@ def _create_workspace_open_search(
     if request.chunkOverlap < 0 or request.chunkOverlap >= request.chunkSize:
         raise genai_core.types.CommonError("Invalid chunk overlap")
 
+    if request.vectorQuantization not in [None, "none", "fp16", "byte"]:
+        raise genai_core.types.CommonError("Invalid vector quantization")
+
     return _convert_workspace(
         genai_core.workspaces.create_workspace_open_search(
             workspace_name=workspace_name,
@@ -271,6 +306,9 @@ def _create_workspace_open_search(
             chunking_strategy=request.chunkingStrategy,
             chunk_size=request.chunkSize,
             chunk_overlap=request.chunkOverlap,
+            vector_quantization=request.vectorQuantization or "none",
+            rerank_top_n=request.rerankTopN,
+            rerank_skip_gap=request.rerankSkipGap,
         )
     )
 
@@ -341,6 +379,19 @@ def _convert_workspace(workspace: dict):
         "chunkingStrategy": workspace.get("chunking_strategy"),
         "chunkSize": workspace.get("chunk_size"),
         "chunkOverlap": workspace.get("chunk_overlap"),
+        "vectorQuantization": workspace.get("vector_quantization"),
+        "indexType": workspace.get("index_type"),
+        "hnswM": workspace.get("hnsw_m"),
+        "hnswEfConstruction": workspace.get("hnsw_ef_construction"),
+        "hnswEfSearch": workspace.get("hnsw_ef_search"),
+        "ivfflatProbes": workspace.get("ivfflat_probes"),
+        "ivfflatLists": workspace.get("ivfflat_lists"),
+        "rerankTopN": workspace.get("rerank_top_n"),
+        "rerankSkipGap": (
+            float(workspace["rerank_skip_gap"])
+            if workspace.get("rerank_skip_gap") is not None
+            else None
+        ),
         "vectors": workspace.get("vectors", 0),
         "documents": workspace.get("documents", 0),
         "aossEngine": workspace.get("aoss_engine"),
@@ -83,6 +83,9 @@ export class ApiResolvers extends Construct {
           AURORA_DB_PORT:
             props.ragEngines?.auroraPgVector?.database?.clusterEndpoint?.port +
             "",
+          AURORA_DB_READER_HOST:
+            props.ragEngines?.auroraPgVector?.database?.clusterReadEndpoint
+              ?.hostname ?? "",
           WORKSPACES_TABLE_NAME:
             props.ragEngines?.workspacesTable.tableName ?? "",
           WORKSPACES_BY_OBJECT_TYPE_INDEX_NAME:
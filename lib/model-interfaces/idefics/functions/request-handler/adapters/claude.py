@@ -3,7 +3,7 @@ import boto3
 from .base import MultiModalModelBase
 from genai_core.types import ChatbotMessageType
 import os
-from genai_core.clients import get_bedrock_client
+from genai_core.clients import call_endpoint, get_bedrock_client
 import json
 from base64 import b64encode
 from genai_core.registry import registry
@@ -39,7 +39,7 @@ class Claude3(MultiModalModelBase):
 
     def __init__(self, model_id: str):
         self.model_id = model_id
-        self.client = get_bedrock_client()
+        self.client = get_bedrock_client(retries=False)
 
     def format_prompt(
         self, prompt: str, messages: list, files: list, user_id: str
@@ -92,7 +92,9 @@ class Claude3(MultiModalModelBase):
             body["top_k"] = model_kwargs["topK"]
 
         body_str = json.dumps(body)
-        mlm_response = self.client.invoke_model(
+        mlm_response = call_endpoint(
+            f"bedrock:{self.model_id}",
+            self.client.invoke_model,
             modelId=self.model_id,
             body=body_str,
             accept="application/json",
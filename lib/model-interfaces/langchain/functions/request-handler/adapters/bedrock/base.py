@@ -93,6 +93,12 @@ class BedrockChatAdapter(ModelAdapter):
 
     def get_llm(self, model_kwargs={}, extra={}):
         bedrock = genai_core.clients.get_bedrock_client()
+        if bedrock:
+            # The calls are made by langchain, they go through the endpoint
+            # concurrency limit with client hooks.
+            genai_core.clients.register_concurrency_control(
+                bedrock, f"bedrock:{self.model_id}"
+            )
         params = {}
 
         # Collect temperature, topP, and maxTokens if available
@@ -65,6 +65,9 @@ export class LangChainInterface extends Construct {
         AURORA_DB_PORT:
           props.ragEngines?.auroraPgVector?.database?.clusterEndpoint?.port +
           "",
+        AURORA_DB_READER_HOST:
+          props.ragEngines?.auroraPgVector?.database?.clusterReadEndpoint
+            ?.hostname ?? "",
         SAGEMAKER_RAG_MODELS_ENDPOINT:
           props.ragEngines?.sageMakerRagModels?.model?.endpoint
             ?.attrEndpointName ?? "",
@@ -0,0 +1,56 @@
+import os
+import time
+import genai_core.workspaces
+import genai_core.aurora.index
+import genai_core.aurora.keywords
+from aws_lambda_powertools import Logger
+from aws_lambda_powertools.utilities.typing import LambdaContext
+
+# Time kept for the last backfill batch and the concurrent index builds
+# before the Lambda timeout
+KEYWORD_MIGRATION_MARGIN_SECONDS = int(
+    os.environ.get("KEYWORD_MIGRATION_MARGIN_SECONDS", "180")
+)
+
+logger = Logger()
+
+
+@logger.inject_lambda_context(log_event=True)
+def lambda_handler(event, context: LambdaContext):
+    workspace_id = event["workspace_id"]
+    force = event.get("force", False)
+
+    workspace = genai_core.workspaces.get_workspace(workspace_id)
+    if not workspace:
+        raise Exception(f"Workspace {workspace_id} does not exist")
+
+    if workspace["engine"] != "aurora" or workspace["status"] != "ready":
+        logger.info(f"Workspace {workspace_id} is not a ready Aurora workspace")
+        return {"ok": False}
+
+    if genai_core.aurora.index.needs_keyword_migration(workspace):
+        # A paused backfill resumes with the next rebuild request of the
+        # workspace, the keyword search reads to_tsvector(content) until then
+        deadline = (
+            time.monotonic()
+            + context.get_remaining_time_in_millis() / 1000
+            - KEYWORD_MIGRATION_MARGIN_SECONDS
+        )
+        if not genai_core.aurora.keywords.migrate_keyword_columns(
+            workspace, deadline=deadline
+        ):
+            return {"ok": True, "rebuilt": False}
+
+        genai_core.workspaces.set_keyword_columns(workspace_id)
+        # The keyword search reads the stored columns from now on
+        genai_core.aurora.keywords.drop_expression_indexes(workspace)
+        logger.info(f"Keyword columns of workspace {workspace_id} added")
+
+    state = genai_core.aurora.index.rebuild_index(workspace, force=force)
+    if state is None:
+        return {"ok": True, "rebuilt": False}
+
+    genai_core.workspaces.set_index_state(workspace_id, state["rows"], state["lists"])
+    logger.info(f"Vector index of workspace {workspace_id} rebuilt", **state)
+
+    return {"ok": True, "rebuilt": True}
@@ -28,6 +28,7 @@ export enum AURORA_DB_USERS {
 export class AuroraPgVector extends Construct {
   readonly database: rds.DatabaseCluster;
   public readonly createAuroraWorkspaceWorkflow: sfn.StateMachine;
+  public readonly indexRebuildFunction: lambda.Function;
 
   constructor(scope: Construct, id: string, props: AuroraPgVectorProps) {
     super(scope, id);
@@ -116,8 +117,46 @@ export class AuroraPgVector extends Construct {
       }
     );
 
+    // Rebuilds the IVFFlat indexes once the tables have grown, started by
+    // the ingestion jobs. Only the table owner can create the indexes.
+    const indexRebuildFunction = new lambda.Function(
+      this,
+      "IndexRebuildFunction",
+      {
+        vpc: props.shared.vpc,
+        code: props.shared.sharedCode.bundleWithLambdaAsset(
+          path.join(__dirname, "./functions/index-rebuild")
+        ),
+        description: "Rebuilds the vector index of Aurora workspaces",
+        runtime: props.shared.pythonRuntime,
+        architecture: props.shared.lambdaArchitecture,
+        handler: "index.lambda_handler",
+        layers: [props.shared.powerToolsLayer, props.shared.commonLayer],
+        timeout: cdk.Duration.minutes(15),
+        logRetention: props.config.logRetention ?? logs.RetentionDays.ONE_WEEK,
+        loggingFormat: lambda.LoggingFormat.JSON,
+        environment: {
+          ...props.shared.defaultEnvironmentVariables,
+          AURORA_DB_USER: AURORA_DB_USERS.ADMIN,
+          AURORA_DB_HOST: dbCluster.clusterEndpoint.hostname,
+          AURORA_DB_PORT: dbCluster.clusterEndpoint.port + "",
+          WORKSPACES_TABLE_NAME:
+            props.ragDynamoDBTables.workspacesTable.tableName,
+          WORKSPACES_BY_OBJECT_TYPE_INDEX_NAME:
+            props.ragDynamoDBTables.workspacesByObjectTypeIndexName,
+        },
+      }
+    );
+
+    dbCluster.grantConnect(indexRebuildFunction, AURORA_DB_USERS.ADMIN);
+    dbCluster.connections.allowDefaultPortFrom(indexRebuildFunction);
+    props.ragDynamoDBTables.workspacesTable.grantReadWriteData(
+      indexRebuildFunction
+    );
+
     this.database = dbCluster;
     this.createAuroraWorkspaceWorkflow = createWorkflow.stateMachine;
+    this.indexRebuildFunction = indexRebuildFunction;
 
     /**
      * CDK NAG suppression
@@ -9,6 +9,7 @@ import * as ecs from "aws-cdk-lib/aws-ecs";
 import * as s3 from "aws-cdk-lib/aws-s3";
 import * as aws_ecr_assets from "aws-cdk-lib/aws-ecr-assets";
 import * as iam from "aws-cdk-lib/aws-iam";
+import * as lambda from "aws-cdk-lib/aws-lambda";
 import * as rds from "aws-cdk-lib/aws-rds";
 import * as sagemaker from "aws-cdk-lib/aws-sagemaker";
 import { NagSuppressions } from "cdk-nag";
@@ -21,6 +22,7 @@ export interface FileImportBatchJobProps {
   readonly processingBucket: s3.Bucket;
   readonly ragDynamoDBTables: RagDynamoDBTables;
   readonly auroraDatabase?: rds.DatabaseCluster;
+  readonly auroraIndexRebuildFunction?: lambda.IFunction;
   readonly sageMakerRagModelsEndpoint?: sagemaker.CfnEndpoint;
   readonly openSearchVector?: OpenSearchVector;
 }
@@ -83,6 +85,8 @@ export class FileImportBatchJob extends Construct {
           AURORA_DB_USER: AURORA_DB_USERS.WRITE,
           AURORA_DB_HOST: props.auroraDatabase?.clusterEndpoint?.hostname ?? "",
           AURORA_DB_PORT: props.auroraDatabase?.clusterEndpoint?.port + "",
+          AURORA_INDEX_REBUILD_FUNCTION_NAME:
+            props.auroraIndexRebuildFunction?.functionName ?? "",
           PROCESSING_BUCKET_NAME: props.processingBucket.bucketName,
           WORKSPACES_TABLE_NAME:
             props.ragDynamoDBTables.workspacesTable.tableName,
@@ -135,6 +139,7 @@ export class FileImportBatchJob extends Construct {
         AURORA_DB_USERS.WRITE
       );
       props.auroraDatabase.connections.allowDefaultPortFrom(computeEnvironment);
+      props.auroraIndexRebuildFunction?.grantInvoke(fileImportJobRole);
     }
 
     if (props.openSearchVector) {
@@ -29,6 +29,7 @@ export interface DataImportProps {
   readonly config: SystemConfig;
   readonly shared: Shared;
   readonly auroraDatabase?: rds.DatabaseCluster;
+  readonly auroraIndexRebuildFunction?: lambda.IFunction;
   readonly ragDynamoDBTables: RagDynamoDBTables;
   readonly openSearchVector?: OpenSearchVector;
   readonly kendraRetrieval?: KendraRetrieval;
@@ -166,6 +167,7 @@ export class DataImport extends Construct {
         uploadBucket,
         processingBucket,
         auroraDatabase: props.auroraDatabase,
+        auroraIndexRebuildFunction: props.auroraIndexRebuildFunction,
         ragDynamoDBTables: props.ragDynamoDBTables,
         sageMakerRagModelsEndpoint: props.sageMakerRagModels?.model?.endpoint,
         openSearchVector: props.openSearchVector,
@@ -192,6 +194,7 @@ export class DataImport extends Construct {
         uploadBucket,
         processingBucket,
         auroraDatabase: props.auroraDatabase,
+        auroraIndexRebuildFunction: props.auroraIndexRebuildFunction,
         ragDynamoDBTables: props.ragDynamoDBTables,
         sageMakerRagModelsEndpoint: props.sageMakerRagModels?.model?.endpoint,
         openSearchVector: props.openSearchVector,
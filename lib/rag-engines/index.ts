@@ -80,6 +80,7 @@ export class RagEngines extends Construct {
       shared: props.shared,
       config: props.config,
       auroraDatabase: auroraPgVector?.database,
+      auroraIndexRebuildFunction: auroraPgVector?.indexRebuildFunction,
       sageMakerRagModels: sageMakerRagModels ?? undefined,
       workspacesTable: tables.workspacesTable,
       documentsTable: tables.documentsTable,
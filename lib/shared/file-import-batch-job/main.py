@@ -74,6 +74,7 @@ def add_chunks(workspace: dict, document: dict, content: str):
         chunks=chunks,
         chunk_complements=None,
         replace=True,
+        delta=True,
     )
 
 
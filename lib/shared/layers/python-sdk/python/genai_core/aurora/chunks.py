@@ -1,6 +1,45 @@
+import os
+import numpy as np
 from psycopg2 import sql
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from genai_core.aurora.connection import AuroraConnection
+from genai_core.aurora.copy import BinaryCopyWriter, to_copy_vectors
+
+AURORA_COPY_BATCH_SIZE = int(os.environ.get("AURORA_COPY_BATCH_SIZE", "1000"))
+# Upper bound of the COPY payload held in memory
+AURORA_COPY_MAX_BYTES = int(
+    os.environ.get("AURORA_COPY_MAX_BYTES", str(16 * 1024 * 1024))
+)
+COPY_COLUMNS = [
+    "chunk_id",
+    "workspace_id",
+    "document_id",
+    "document_sub_id",
+    "document_type",
+    "document_sub_type",
+    "path",
+    "language",
+    "title",
+    "content",
+    "content_complement",
+    "content_embeddings",
+    "metadata",
+]
+COPY_TYPES = [
+    "uuid",
+    "uuid",
+    "uuid",
+    "uuid",
+    "text",
+    "text",
+    "text",
+    "text",
+    "text",
+    "text",
+    "text",
+    "vector",
+    "jsonb",
+]
 
 
 def add_chunks_aurora(
@@ -12,10 +51,12 @@ def add_chunks_aurora(
     path: Optional[str],
     title: Optional[str],
     chunk_ids: List[str],
-    chunk_embeddings: List[int],
+    chunk_embeddings: Union[np.ndarray, List[List[float]]],
     chunks: List[str],
     chunk_complements: List[str],
     replace: bool,
+    chunk_hashes: Optional[List[str]] = None,
+    chunk_languages: Optional[List[str]] = None,
 ):
     table_name = sql.Identifier(workspace_id.replace("-", ""))
     complements_len = len(chunk_complements) if chunk_complements else 0
@@ -33,46 +74,42 @@ def add_chunks_aurora(
 
             removed_vectors = cursor.rowcount
 
+        # Rows are sent with binary COPY statements bounded by row count and
+        # payload size, the vectors are converted to float4 once.
+        vectors = to_copy_vectors(chunk_embeddings)
+        writer = BinaryCopyWriter(COPY_COLUMNS, COPY_TYPES)
         for idx in range(len(chunk_ids)):
-            chunk_id = chunk_ids[idx]
-            content = chunks[idx]
             content_complement = (
                 chunk_complements[idx] if idx < complements_len else None
             )
+            metadata = {"content_hash": chunk_hashes[idx]} if chunk_hashes else None
 
-            cursor.execute(
-                sql.SQL(
-                    """INSERT INTO {table} (
-                        chunk_id,
-                        workspace_id,
-                        document_id,
-                        document_sub_id,
-                        document_type,
-                        document_sub_type,
-                        path,
-                        title,
-                        content,
-                        content_complement,
-                        content_embeddings
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,%s
-                    );"""
-                ).format(table=table_name),
+            writer.add_row(
                 [
-                    chunk_id,
+                    chunk_ids[idx],
                     workspace_id,
                     document_id,
                     document_sub_id,
                     document_type,
                     document_sub_type,
                     path,
+                    chunk_languages[idx] if chunk_languages else None,
                     title,
-                    content,
+                    chunks[idx],
                     content_complement,
-                    chunk_embeddings[idx],
-                ],
+                    vectors[idx],
+                    metadata,
+                ]
             )
 
+            if (
+                writer.rows >= AURORA_COPY_BATCH_SIZE
+                or writer.size >= AURORA_COPY_MAX_BYTES
+            ):
+                writer.copy(cursor, table_name)
+
+        writer.copy(cursor, table_name)
+
         cursor.connection.commit()
 
     return {"removed_vectors": removed_vectors, "added_vectors": len(chunk_ids)}
@@ -88,3 +125,34 @@ def clean_chunks_aurora(workspace_id: str, document_id: str):
             ).format(table=table_name),
             [workspace_id, document_id],
         )
+
+
+def get_chunk_hashes_aurora(workspace_id: str, document_id: str) -> Dict[str, str]:
+    table_name = sql.Identifier(workspace_id.replace("-", ""))
+    with AuroraConnection() as cursor:
+        cursor.execute(
+            sql.SQL(
+                """SELECT chunk_id, metadata->>'content_hash' FROM {table} WHERE
+                    workspace_id = %s AND document_id = %s;"""
+            ).format(table=table_name),
+            [workspace_id, document_id],
+        )
+
+        return {str(chunk_id): chunk_hash for chunk_id, chunk_hash in cursor}
+
+
+def delete_chunks_aurora(workspace_id: str, chunk_ids: List[str]) -> int:
+    if not chunk_ids:
+        return 0
+
+    table_name = sql.Identifier(workspace_id.replace("-", ""))
+    with AuroraConnection() as cursor:
+        cursor.execute(
+            sql.SQL(
+                """DELETE FROM {table} WHERE
+                    workspace_id = %s AND chunk_id = ANY(%s::uuid[]);"""
+            ).format(table=table_name),
+            [workspace_id, chunk_ids],
+        )
+
+        return cursor.rowcount
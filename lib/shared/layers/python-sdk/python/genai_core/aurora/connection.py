@@ -1,65 +1,219 @@
 import os
+import time
 import boto3
+import threading
 import psycopg2
 import psycopg2.extras
-from datetime import datetime, timedelta
+import psycopg2.extensions
+from aws_lambda_powertools import Logger
 from pgvector.psycopg2 import register_vector
 
 client = boto3.client("rds")
+logger = Logger()
 
 AURORA_DB_USER = os.environ.get("AURORA_DB_USER")
 AURORA_DB_HOST = os.environ.get("AURORA_DB_HOST")
+AURORA_DB_READER_HOST = os.environ.get("AURORA_DB_READER_HOST")
 AURORA_DB_PORT = os.environ.get("AURORA_DB_PORT")
 AURORA_DB_REGION = os.environ.get("AWS_REGION")
+# Idle connections kept per host across warm invocations
+AURORA_DB_POOL_SIZE = int(os.environ.get("AURORA_DB_POOL_SIZE", "4"))
+# Connections idle for longer are checked with a round trip before reuse
+AURORA_DB_POOL_CHECK_INTERVAL = int(
+    os.environ.get("AURORA_DB_POOL_CHECK_INTERVAL", "30")
+)
+AURORA_DB_POOL_MAX_AGE = int(os.environ.get("AURORA_DB_POOL_MAX_AGE", "3600"))
+# IAM authentication tokens expire after 15 minutes
+TOKEN_LIFETIME = 600
+AUTHENTICATION_ERRORS = ["PAM authentication failed", "password authentication"]
+
+psycopg2.extras.register_uuid()
+
+_tokens = {}
+_tokens_lock = threading.Lock()
+_pools = {}
+_pools_lock = threading.Lock()
 
 
 class AuroraConnection(object):
-    token = None
-    token_refresh = datetime.now() - timedelta(minutes=1)
-
-    def __init__(self, autocommit=True):
-        now = datetime.now()
-        if AuroraConnection.token_refresh < now:
-            AuroraConnection.token_refresh = now + timedelta(
-                minutes=10
-            )  # Expires after 15 min
+    """A cursor on a pooled connection.
+
+    Readonly connections use the cluster reader endpoint when
+    AURORA_DB_READER_HOST is set. Uncommitted transactions are rolled back
+    when the connection is returned to the pool.
+    """
+
+    def __init__(self, autocommit=True, readonly=False):
+        self.autocommit = autocommit
+        self.readonly = readonly
+
+        self.dbhost = AURORA_DB_HOST
+        if readonly and AURORA_DB_READER_HOST:
+            self.dbhost = AURORA_DB_READER_HOST
+
+    def __enter__(self):
+        self.pool = get_pool(self.dbhost)
+        self.connection = self.pool.get()
+
+        try:
+            self.connection.set_session(
+                autocommit=self.autocommit, readonly=self.readonly
+            )
+            self.cursor = self.connection.cursor()
+        except psycopg2.Error:
+            self.pool._close(self.connection)
+            raise
+
+        return self.cursor
+
+    def __exit__(self, *args):
+        if not self.cursor.closed:
+            self.cursor.close()
+
+        if not self.connection.closed and not self.autocommit:
+            try:
+                self.connection.rollback()
+            except psycopg2.Error:
+                self.connection.close()
+
+        self.pool.put(self.connection)
+
+
+class ConnectionPool(object):
+    """Idle connections to one host, reused by the next AuroraConnection."""
+
+    def __init__(self, host: str, size: int):
+        self.host = host
+        self.size = size
+        self.idle = []
+        self.created = {}
+        self.lock = threading.Lock()
+
+    def get(self):
+        while True:
+            with self.lock:
+                if len(self.idle) == 0:
+                    break
+                connection, last_used = self.idle.pop()
+
+            if self._is_healthy(connection, last_used):
+                return connection
+
+            self._close(connection)
+
+        connection = connect(self.host)
+        with self.lock:
+            self.created[id(connection)] = time.monotonic()
+
+        return connection
+
+    def put(self, connection):
+        if (
+            connection.closed
+            or connection.get_transaction_status()
+            != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        ):
+            self._close(connection)
+            return
+
+        with self.lock:
+            if len(self.idle) < self.size:
+                self.idle.append((connection, time.monotonic()))
+                return
+
+        self._close(connection)
+
+    def clear(self):
+        with self.lock:
+            idle = self.idle
+            self.idle = []
+
+        for connection, _ in idle:
+            self._close(connection)
+
+    def _is_healthy(self, connection, last_used: float) -> bool:
+        now = time.monotonic()
+        if connection.closed:
+            return False
+
+        created = self.created.get(id(connection), now)
+        if now - created > AURORA_DB_POOL_MAX_AGE:
+            return False
+
+        if now - last_used > AURORA_DB_POOL_CHECK_INTERVAL:
+            try:
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            except psycopg2.Error as error:
+                logger.info("Discarding pooled connection", error=str(error))
+                return False
+
+        return True
+
+    def _close(self, connection):
+        with self.lock:
+            self.created.pop(id(connection), None)
+
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+
+def get_pool(host: str) -> ConnectionPool:
+    with _pools_lock:
+        pool = _pools.get(host)
+        if pool is None:
+            pool = _pools[host] = ConnectionPool(host, AURORA_DB_POOL_SIZE)
+
+        return pool
+
+
+def connect(host: str):
+    try:
+        connection = _connect(host, get_auth_token(host))
+    except psycopg2.OperationalError as error:
+        if not any(value in str(error) for value in AUTHENTICATION_ERRORS):
+            raise
+
+        # The cached token may have been revoked or issued for another user
+        logger.info("Authentication failed, refreshing the token", host=host)
+        connection = _connect(host, get_auth_token(host, refresh=True))
+
+    register_vector(connection)
+
+    return connection
+
+
+def get_auth_token(host: str, refresh: bool = False) -> str:
+    now = time.monotonic()
+
+    with _tokens_lock:
+        token, expires = _tokens.get(host, (None, 0))
+        if refresh or token is None or expires < now:
             # Base on
             # https://docs.aws.amazon.com/AmazonRDS/latest/UserGuide/UsingWithRDS.IAMDBAuth.Connecting.Python.html
-            AuroraConnection.token = client.generate_db_auth_token(
-                DBHostname=AURORA_DB_HOST,
+            token = client.generate_db_auth_token(
+                DBHostname=host,
                 Port=AURORA_DB_PORT,
                 DBUsername=AURORA_DB_USER,
                 Region=AURORA_DB_REGION,
             )
-        self.autocommit = autocommit
+            _tokens[host] = (token, now + TOKEN_LIFETIME)
 
-        self.dbhost = AURORA_DB_HOST
-        self.dbport = AURORA_DB_PORT
-        self.dbuser = AURORA_DB_USER
-        self.dbpass = AuroraConnection.token
+    if token is None:
+        raise ValueError("Token is not set.")
 
-        if AuroraConnection.token is None:
-            raise ValueError("Token is not set.")
+    return token
 
-    def __enter__(self):
-        connection = psycopg2.connect(
-            database="postgres",
-            host=self.dbhost,
-            user=self.dbuser,
-            password=self.dbpass,
-            port=self.dbport,
-            connect_timeout=10,
-        )
-
-        connection.set_session(autocommit=self.autocommit)
-        psycopg2.extras.register_uuid()
-        register_vector(connection)
-        cursor = connection.cursor()
-        self.connection = connection
-        self.cursor = cursor
-
-        return cursor
 
-    def __exit__(self, *args):
-        self.cursor.close()
-        self.connection.close()
+def _connect(host: str, token: str):
+    return psycopg2.connect(
+        database="postgres",
+        host=host,
+        user=AURORA_DB_USER,
+        password=token,
+        port=AURORA_DB_PORT,
+        connect_timeout=10,
+    )
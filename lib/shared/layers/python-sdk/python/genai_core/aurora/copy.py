@@ -0,0 +1,91 @@
+"""Binary COPY payloads for the chunk tables.
+
+https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.4
+Vectors use the pgvector binary format: int16 dimensions, int16 unused and
+the float4 values, all in network byte order.
+"""
+
+import io
+import json
+import uuid
+import struct
+import numpy as np
+from psycopg2 import sql
+from typing import List
+
+HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+TRAILER = struct.pack("!h", -1)
+NULL = struct.pack("!i", -1)
+
+_int16 = struct.Struct("!h")
+_int32 = struct.Struct("!i")
+_vector_header = struct.Struct("!ihh")
+
+
+class BinaryCopyWriter(object):
+    """Rows of uuid, text, vector and jsonb columns encoded for
+    COPY ... FROM STDIN WITH (FORMAT binary)."""
+
+    def __init__(self, columns: List[str], types: List[str]):
+        self.columns = columns
+        self.types = types
+        self.buffer = bytearray(HEADER)
+        self.rows = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.buffer)
+
+    def add_row(self, values: list):
+        """Vector values are rows of a to_copy_vectors matrix."""
+        buffer = self.buffer
+        buffer += _int16.pack(len(self.types))
+
+        for value, type in zip(values, self.types):
+            if value is None:
+                buffer += NULL
+            elif type == "vector":
+                data = value.tobytes()
+                buffer += _vector_header.pack(len(data) + 4, len(value), 0)
+                buffer += data
+            else:
+                data = _encode(value, type)
+                buffer += _int32.pack(len(data))
+                buffer += data
+
+        self.rows += 1
+
+    def copy(self, cursor, table: sql.Composable):
+        """Send the rows with one COPY statement and start a new payload."""
+        if self.rows == 0:
+            return
+
+        self.buffer += TRAILER
+        statement = sql.SQL(
+            "COPY {table} ({columns}) FROM STDIN WITH (FORMAT binary)"
+        ).format(
+            table=table,
+            columns=sql.SQL(", ").join(map(sql.Identifier, self.columns)),
+        )
+        cursor.copy_expert(statement, io.BytesIO(self.buffer))
+
+        self.buffer = bytearray(HEADER)
+        self.rows = 0
+
+
+def to_copy_vectors(embeddings) -> np.ndarray:
+    return np.ascontiguousarray(embeddings, dtype=">f4")
+
+
+def _encode(value, type: str) -> bytes:
+    if type == "uuid":
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(str(value))
+        return value.bytes
+    elif type == "text":
+        return value.encode("utf-8")
+    elif type == "jsonb":
+        # jsonb binary format version 1 followed by the JSON text
+        return b"\x01" + json.dumps(value).encode("utf-8")
+
+    raise ValueError(f"Unsupported COPY type {type}")
@@ -1,6 +1,8 @@
 from aws_lambda_powertools import Logger
 from psycopg2 import sql
 from genai_core.aurora.connection import AuroraConnection
+from genai_core.aurora.index import create_vector_index
+from genai_core.aurora.keywords import create_keyword_columns
 
 logger = Logger()
 
@@ -11,9 +13,7 @@ def create_workspace_table(workspace: dict):
 
     embeddings_model_dimensions = workspace["embeddings_model_dimensions"]
     hybrid_search = workspace["hybrid_search"]
-    languages = workspace["languages"]
     has_index = workspace["has_index"]
-    metric = workspace["metric"]
 
     with AuroraConnection(autocommit=False) as cursor:
         cursor.execute(
@@ -49,36 +49,12 @@ def create_workspace_table(workspace: dict):
         )
 
         if hybrid_search:
-            for language in languages:
-                cursor.execute(
-                    sql.SQL(
-                        "CREATE INDEX ON {table} USING "
-                        + " GIN (to_tsvector('{language}', content));"
-                    ).format(table=table_name, language=sql.Identifier(language))
-                )
+            create_keyword_columns(cursor, workspace)
 
         if has_index:
-            if metric == "cosine":
-                cursor.execute(
-                    sql.SQL(
-                        "CREATE INDEX ON {table} USING ivfflat "
-                        + "(content_embeddings vector_cosine_ops) WITH (lists = 100);"
-                    ).format(table=table_name)
-                )
-            elif metric == "l2":
-                cursor.execute(
-                    sql.SQL(
-                        "CREATE INDEX ON {table} USING ivfflat "
-                        + "(content_embeddings vector_l2_ops) WITH (lists = 100);"
-                    ).format(table=table_name)
-                )
-            elif metric == "inner":
-                cursor.execute(
-                    sql.SQL(
-                        "CREATE INDEX ON {table} USING ivfflat "
-                        + "(content_embeddings vector_ip_ops) WITH (lists = 100);"
-                    ).format(table=table_name)
-                )
+            # The table is empty, IVFFlat lists are sized again by the
+            # rebuild job once the table has rows
+            create_vector_index(cursor, workspace)
 
         cursor.connection.commit()
         logger.info("Created workspace table")
@@ -0,0 +1,302 @@
+"""Vector index of the workspace tables.
+
+HNSW indexes are built with the table and maintained by the inserts. IVFFlat
+centroids are computed from the rows present when the index is built, so the
+index is rebuilt with lists sized for the row count once the table has grown.
+https://github.com/pgvector/pgvector#indexing
+"""
+
+import os
+import json
+import math
+import boto3
+from aws_lambda_powertools import Logger
+from psycopg2 import sql
+from typing import Optional
+from genai_core.aurora.connection import AuroraConnection
+from genai_core.aurora.utils import get_vector_operator_class, quantize_vector
+from genai_core.types import CommonError
+
+AURORA_INDEX_REBUILD_FUNCTION_NAME = os.environ.get(
+    "AURORA_INDEX_REBUILD_FUNCTION_NAME"
+)
+# The IVFFlat index is rebuilt when the lists for the current row count
+# differ from the built lists by this factor
+AURORA_INDEX_REBUILD_GROWTH = float(os.environ.get("AURORA_INDEX_REBUILD_GROWTH", "2"))
+AURORA_INDEX_MAINTENANCE_WORK_MEM = os.environ.get(
+    "AURORA_INDEX_MAINTENANCE_WORK_MEM", "1GB"
+)
+
+INDEX_TYPES = ["ivfflat", "hnsw"]
+# pgvector defaults
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+HNSW_EF_SEARCH = 40
+
+lambda_client = boto3.client("lambda")
+logger = Logger()
+
+
+def get_index_type(workspace: dict) -> str:
+    return workspace.get("index_type") or "ivfflat"
+
+
+def get_ivfflat_lists(rows: int) -> int:
+    """rows / 1000 up to 1M rows and sqrt(rows) over 1M rows."""
+    if rows > 1_000_000:
+        return int(math.sqrt(rows))
+
+    return max(1, rows // 1000)
+
+
+def get_ivfflat_probes(lists: int) -> int:
+    return max(1, round(math.sqrt(lists)))
+
+
+def get_search_settings(
+    workspace: dict,
+    candidates: int,
+    probes: Optional[int] = None,
+    ef_search: Optional[int] = None,
+) -> dict:
+    """Index settings for one vector search, the per query values take
+    precedence over the workspace values.
+
+    The HNSW search returns at most ef_search rows, it is raised to the
+    number of candidates read through the index.
+    """
+    if not workspace["has_index"]:
+        return {}
+
+    if get_index_type(workspace) == "hnsw":
+        ef_search = ef_search or workspace.get("hnsw_ef_search") or HNSW_EF_SEARCH
+        return {"hnsw.ef_search": max(int(ef_search), candidates)}
+
+    probes = probes or workspace.get("ivfflat_probes")
+    if probes is None and workspace.get("ivfflat_lists") is not None:
+        probes = get_ivfflat_probes(int(workspace["ivfflat_lists"]))
+    if probes is None:
+        return {}
+
+    return {"ivfflat.probes": int(probes)}
+
+
+def create_vector_index(
+    cursor,
+    workspace: dict,
+    rows: int = 0,
+    name: Optional[str] = None,
+    concurrently: bool = False,
+):
+    workspace_id = workspace["workspace_id"]
+    metric = workspace["metric"]
+    dimensions = workspace["embeddings_model_dimensions"]
+    vector_quantization = workspace.get("vector_quantization", "none")
+    index_type = get_index_type(workspace)
+
+    if metric not in ["cosine", "l2", "inner"]:
+        raise CommonError("Unknown metric")
+
+    if index_type not in INDEX_TYPES:
+        raise CommonError("Unknown index type")
+
+    if index_type == "hnsw":
+        options = sql.SQL("m = {m}, ef_construction = {ef_construction}").format(
+            m=sql.Literal(int(workspace.get("hnsw_m") or HNSW_M)),
+            ef_construction=sql.Literal(
+                int(workspace.get("hnsw_ef_construction") or HNSW_EF_CONSTRUCTION)
+            ),
+        )
+    else:
+        options = sql.SQL("lists = {lists}").format(
+            lists=sql.Literal(get_ivfflat_lists(rows))
+        )
+
+    cursor.execute(
+        sql.SQL(
+            "CREATE INDEX {concurrently}{name} ON {table} USING {index_type} "
+            + "({vector} {operator_class}) WITH ({options});"
+        ).format(
+            concurrently=sql.SQL("CONCURRENTLY " if concurrently else ""),
+            name=sql.Identifier(name or get_index_name(workspace_id)),
+            table=sql.Identifier(get_table_name(workspace_id)),
+            index_type=sql.SQL(index_type),
+            vector=quantize_vector(
+                sql.Identifier("content_embeddings"), vector_quantization, dimensions
+            ),
+            operator_class=get_vector_operator_class(metric, vector_quantization),
+            options=options,
+        )
+    )
+
+
+def get_index_state(cursor, workspace_id: str) -> dict:
+    """The row count estimate of the table and its vector index, tables
+    created before the index name was fixed have a generated index name."""
+    table_name = get_table_name(workspace_id)
+    cursor.execute(
+        """SELECT t.reltuples::bigint, i.relname, am.amname, i.reloptions
+        FROM pg_class t
+        LEFT JOIN pg_index x ON x.indrelid = t.oid
+        LEFT JOIN pg_class i ON i.oid = x.indexrelid
+        LEFT JOIN pg_am am ON am.oid = i.relam
+            AND am.amname IN ('ivfflat', 'hnsw')
+        WHERE t.oid = %s::regclass
+        ORDER BY am.amname NULLS LAST
+        LIMIT 1;""",
+        [table_name],
+    )
+    rows, index_name, index_type, options = cursor.fetchone()
+
+    if rows < 0:
+        # Never analyzed
+        cursor.execute(
+            sql.SQL("SELECT count(*) FROM {table};").format(
+                table=sql.Identifier(table_name)
+            )
+        )
+        rows = cursor.fetchone()[0]
+
+    if index_type is None:
+        index_name = None
+        options = None
+
+    lists = None
+    for option in options or []:
+        key, _, value = option.partition("=")
+        if key == "lists":
+            lists = int(value)
+
+    return {
+        "rows": rows,
+        "index_name": index_name,
+        "index_type": index_type,
+        "lists": lists,
+    }
+
+
+def needs_rebuild(workspace: dict, state: dict) -> bool:
+    if not workspace["has_index"]:
+        return False
+
+    index_type = get_index_type(workspace)
+    if state["index_type"] != index_type:
+        return True
+
+    if index_type == "hnsw" or state["lists"] is None:
+        return False
+
+    lists = get_ivfflat_lists(state["rows"])
+    growth = max(lists, state["lists"]) / min(lists, state["lists"])
+
+    return growth >= AURORA_INDEX_REBUILD_GROWTH
+
+
+def needs_keyword_migration(workspace: dict) -> bool:
+    """Hybrid workspaces created before the stored tsvector columns, they are
+    added by the rebuild job."""
+    return bool(workspace.get("hybrid_search")) and not workspace.get("keyword_columns")
+
+
+def request_rebuild(workspace: dict) -> bool:
+    """Start the rebuild job when the index no longer fits the table or the
+    keyword columns are missing. Processes without the rebuild function do
+    not check the table."""
+    if not AURORA_INDEX_REBUILD_FUNCTION_NAME:
+        return False
+
+    state = {}
+    if not needs_keyword_migration(workspace):
+        if not workspace.get("has_index") or get_index_type(workspace) == "hnsw":
+            return False
+
+        with AuroraConnection() as cursor:
+            state = get_index_state(cursor, workspace["workspace_id"])
+
+        if not needs_rebuild(workspace, state):
+            return False
+
+    response = lambda_client.invoke(
+        FunctionName=AURORA_INDEX_REBUILD_FUNCTION_NAME,
+        InvocationType="Event",
+        Payload=json.dumps({"workspace_id": workspace["workspace_id"]}),
+    )
+    logger.info("Vector index rebuild requested", response=response, **state)
+
+    return True
+
+
+def rebuild_index(workspace: dict, force: bool = False) -> Optional[dict]:
+    """Build a new vector index next to the current one and swap them.
+
+    The queries keep using the current index during the build. Returns the
+    index state after the rebuild, or None when no rebuild was done.
+    Workspaces without a vector index are never indexed, even with force.
+    """
+    if not workspace.get("has_index"):
+        return None
+
+    workspace_id = workspace["workspace_id"]
+    table_name = get_table_name(workspace_id)
+    index_name = get_index_name(workspace_id)
+    new_index_name = f"{table_name}_embeddings_new"
+
+    with AuroraConnection() as cursor:
+        # Concurrent rebuild requests of the same table
+        cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s));", [table_name])
+        if not cursor.fetchone()[0]:
+            logger.info("Vector index rebuild in progress", workspace_id=workspace_id)
+            return None
+
+        try:
+            state = get_index_state(cursor, workspace_id)
+            if not force and not needs_rebuild(workspace, state):
+                return None
+
+            logger.info("Rebuilding vector index", workspace_id=workspace_id, **state)
+
+            cursor.execute(
+                "SET maintenance_work_mem = %s;", [AURORA_INDEX_MAINTENANCE_WORK_MEM]
+            )
+            # Left invalid by an interrupted build
+            cursor.execute(
+                sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {name};").format(
+                    name=sql.Identifier(new_index_name)
+                )
+            )
+            create_vector_index(
+                cursor,
+                workspace,
+                rows=state["rows"],
+                name=new_index_name,
+                concurrently=True,
+            )
+
+            # One implicit transaction, the table always has an index
+            drop_current = sql.SQL("")
+            if state["index_name"] is not None:
+                drop_current = sql.SQL("DROP INDEX {name}; ").format(
+                    name=sql.Identifier(state["index_name"])
+                )
+            cursor.execute(
+                sql.SQL(
+                    "{drop_current}ALTER INDEX {new_name} RENAME TO {name};"
+                ).format(
+                    drop_current=drop_current,
+                    new_name=sql.Identifier(new_index_name),
+                    name=sql.Identifier(index_name),
+                )
+            )
+
+            return get_index_state(cursor, workspace_id)
+        finally:
+            cursor.execute("RESET maintenance_work_mem;")
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(%s));", [table_name])
+
+
+def get_table_name(workspace_id: str) -> str:
+    return workspace_id.replace("-", "")
+
+
+def get_index_name(workspace_id: str) -> str:
+    return f"{get_table_name(workspace_id)}_embeddings_idx"
@@ -0,0 +1,293 @@
+"""Stored tsvector columns of the keyword search.
+
+Each workspace language has a content_tsv_<language> column with a GIN
+index, the keyword search matches and ranks against the stored vectors
+instead of parsing the content of every candidate row. In workspaces with
+tagged chunk languages the index only covers the chunks of its language.
+https://www.postgresql.org/docs/current/textsearch-tables.html
+
+New tables have generated columns. Adding a generated column to a populated
+table rewrites it under an ACCESS EXCLUSIVE lock, so existing tables get
+plain columns kept up to date by a trigger and backfilled in batches.
+"""
+
+import os
+import time
+from aws_lambda_powertools import Logger
+from psycopg2 import sql
+from typing import List, Optional
+from genai_core.aurora.connection import AuroraConnection
+from genai_core.aurora.index import AURORA_INDEX_MAINTENANCE_WORK_MEM, get_table_name
+
+# Rows updated per backfill transaction
+AURORA_KEYWORD_BACKFILL_BATCH_SIZE = int(
+    os.environ.get("AURORA_KEYWORD_BACKFILL_BATCH_SIZE", "2000")
+)
+# Adding the columns waits at most this long for the table lock, instead of
+# queuing the searches and ingests behind it
+AURORA_KEYWORD_LOCK_TIMEOUT = os.environ.get("AURORA_KEYWORD_LOCK_TIMEOUT", "5s")
+
+logger = Logger()
+
+
+def get_keyword_column(language: str) -> str:
+    return f"content_tsv_{language}"
+
+
+def add_keyword_column(cursor, workspace_id: str, language: str):
+    """Adding a stored generated column rewrites the table."""
+    cursor.execute(
+        sql.SQL(
+            "ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} tsvector "
+            + "GENERATED ALWAYS AS (to_tsvector('{language}', content)) STORED;"
+        ).format(
+            table=sql.Identifier(get_table_name(workspace_id)),
+            column=sql.Identifier(get_keyword_column(language)),
+            language=sql.Identifier(language),
+        )
+    )
+
+
+def create_keyword_index(
+    cursor,
+    workspace_id: str,
+    language: str,
+    concurrently: bool = False,
+    partial: bool = False,
+):
+    table_name = get_table_name(workspace_id)
+    column = get_keyword_column(language)
+
+    predicate = sql.SQL("")
+    if partial:
+        predicate = sql.SQL(" WHERE language = {language}").format(
+            language=sql.Literal(language)
+        )
+
+    cursor.execute(
+        sql.SQL(
+            "CREATE INDEX {concurrently}IF NOT EXISTS {name} ON {table} "
+            + "USING GIN ({column}){predicate};"
+        ).format(
+            concurrently=sql.SQL("CONCURRENTLY " if concurrently else ""),
+            name=sql.Identifier(f"{table_name}_{column}_idx"),
+            table=sql.Identifier(table_name),
+            column=sql.Identifier(column),
+            predicate=predicate,
+        )
+    )
+
+
+def create_keyword_columns(cursor, workspace: dict):
+    partial = bool(workspace.get("chunk_languages"))
+    for language in workspace["languages"]:
+        add_keyword_column(cursor, workspace["workspace_id"], language)
+        create_keyword_index(
+            cursor, workspace["workspace_id"], language, partial=partial
+        )
+
+
+def migrate_keyword_columns(workspace: dict, deadline: Optional[float] = None) -> bool:
+    """Add the stored columns to a table indexed on to_tsvector(content).
+
+    The plain columns and the trigger only hold the table lock for a moment.
+    The rows are backfilled in short transactions until the deadline (a
+    time.monotonic() value), the migration resumes from the rows left
+    empty. The GIN indexes are built concurrently once every row is filled.
+
+    Returns False when the deadline was reached or another migration of the
+    table is in progress.
+    """
+    workspace_id = workspace["workspace_id"]
+    table_name = get_table_name(workspace_id)
+    languages = workspace["languages"]
+    lock_key = f"{table_name}_keywords"
+
+    with AuroraConnection() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s));", [lock_key])
+        if not cursor.fetchone()[0]:
+            logger.info(
+                "Keyword columns migration in progress", workspace_id=workspace_id
+            )
+            return False
+
+        try:
+            cursor.execute("SET lock_timeout = %s;", [AURORA_KEYWORD_LOCK_TIMEOUT])
+            for language in languages:
+                _add_plain_keyword_column(cursor, workspace_id, language)
+            _create_keyword_trigger(cursor, workspace_id, languages)
+            cursor.execute("RESET lock_timeout;")
+
+            rows = 0
+            after = None
+            while True:
+                if deadline is not None and time.monotonic() >= deadline:
+                    logger.info(
+                        "Keyword columns backfill paused",
+                        workspace_id=workspace_id,
+                        rows=rows,
+                    )
+                    return False
+
+                chunk_ids = _backfill_keyword_columns(
+                    cursor, workspace_id, languages, after
+                )
+                rows += len(chunk_ids)
+                if len(chunk_ids) < AURORA_KEYWORD_BACKFILL_BATCH_SIZE:
+                    break
+                after = chunk_ids[-1]
+
+            logger.info(
+                "Keyword columns backfilled", workspace_id=workspace_id, rows=rows
+            )
+
+            cursor.execute(
+                "SET maintenance_work_mem = %s;", [AURORA_INDEX_MAINTENANCE_WORK_MEM]
+            )
+            for language in languages:
+                _drop_invalid_index(
+                    cursor, f"{table_name}_{get_keyword_column(language)}_idx"
+                )
+                create_keyword_index(cursor, workspace_id, language, concurrently=True)
+        finally:
+            cursor.execute("RESET lock_timeout;")
+            cursor.execute("RESET maintenance_work_mem;")
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(%s));", [lock_key])
+
+    return True
+
+
+def _add_plain_keyword_column(cursor, workspace_id: str, language: str):
+    """A nullable column without default only changes the catalog."""
+    cursor.execute(
+        sql.SQL(
+            "ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} tsvector;"
+        ).format(
+            table=sql.Identifier(get_table_name(workspace_id)),
+            column=sql.Identifier(get_keyword_column(language)),
+        )
+    )
+
+
+def _create_keyword_trigger(cursor, workspace_id: str, languages: List[str]):
+    """Fill the columns of the rows inserted or updated during and after the
+    backfill, COPY fires the trigger as well."""
+    table_name = get_table_name(workspace_id)
+    function_name = f"{table_name}_keywords"
+    assignments = sql.SQL("; ").join(
+        sql.SQL("NEW.{column} := to_tsvector('{language}', NEW.content)").format(
+            column=sql.Identifier(get_keyword_column(language)),
+            language=sql.Identifier(language),
+        )
+        for language in languages
+    )
+
+    cursor.execute(
+        sql.SQL(
+            "CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$ "
+            + "BEGIN {assignments}; RETURN NEW; END; $$ LANGUAGE plpgsql; "
+            + "CREATE OR REPLACE TRIGGER {trigger} "
+            + "BEFORE INSERT OR UPDATE OF content ON {table} "
+            + "FOR EACH ROW EXECUTE FUNCTION {function}();"
+        ).format(
+            function=sql.Identifier(function_name),
+            assignments=assignments,
+            trigger=sql.Identifier(f"{table_name}_keywords_trigger"),
+            table=sql.Identifier(table_name),
+        )
+    )
+
+
+def _backfill_keyword_columns(
+    cursor, workspace_id: str, languages: List[str], after: Optional[str]
+) -> List[str]:
+    """Fill the next batch of empty rows after the chunk id, in primary key
+    order and in its own transaction. Returns the chunk ids filled."""
+    table = sql.Identifier(get_table_name(workspace_id))
+    empty = sql.SQL(" OR ").join(
+        sql.SQL("{column} IS NULL").format(
+            column=sql.Identifier(get_keyword_column(language))
+        )
+        for language in languages
+    )
+    after_condition = sql.SQL("")
+    params = []
+    if after is not None:
+        after_condition = sql.SQL(" AND chunk_id > %s")
+        params.append(after)
+
+    cursor.execute(
+        sql.SQL(
+            "SELECT chunk_id FROM {table} WHERE ({empty}){after} "
+            + "ORDER BY chunk_id LIMIT %s;"
+        ).format(table=table, empty=empty, after=after_condition),
+        params + [AURORA_KEYWORD_BACKFILL_BATCH_SIZE],
+    )
+    chunk_ids = [str(row[0]) for row in cursor.fetchall()]
+    if not chunk_ids:
+        return []
+
+    cursor.execute(
+        sql.SQL(
+            "UPDATE {table} SET {assignments} WHERE chunk_id = ANY(%s::uuid[]);"
+        ).format(
+            table=table,
+            assignments=sql.SQL(", ").join(
+                sql.SQL("{column} = to_tsvector('{language}', content)").format(
+                    column=sql.Identifier(get_keyword_column(language)),
+                    language=sql.Identifier(language),
+                )
+                for language in languages
+            ),
+        ),
+        [chunk_ids],
+    )
+
+    return chunk_ids
+
+
+def _drop_invalid_index(cursor, index_name: str):
+    """Left invalid by a concurrent build interrupted by the Lambda timeout,
+    CREATE INDEX IF NOT EXISTS would keep it."""
+    cursor.execute(
+        """SELECT NOT x.indisvalid
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE i.relname = %s;""",
+        [index_name],
+    )
+    row = cursor.fetchone()
+    if row is not None and row[0]:
+        cursor.execute(
+            sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {name};").format(
+                name=sql.Identifier(index_name)
+            )
+        )
+
+
+def drop_expression_indexes(workspace: dict):
+    """Drop the to_tsvector(content) indexes replaced by the stored columns,
+    once the keyword search of the workspace reads the stored columns."""
+    table_name = get_table_name(workspace["workspace_id"])
+
+    with AuroraConnection() as cursor:
+        for index_name in _get_expression_indexes(cursor, table_name):
+            cursor.execute(
+                sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {name};").format(
+                    name=sql.Identifier(index_name)
+                )
+            )
+
+
+def _get_expression_indexes(cursor, table_name: str) -> list:
+    cursor.execute(
+        """SELECT i.relname
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = %s::regclass
+            AND x.indexprs IS NOT NULL
+            AND pg_get_indexdef(x.indexrelid) LIKE '%%to_tsvector(%%';""",
+        [table_name],
+    )
+
+    return [row[0] for row in cursor.fetchall()]
@@ -1,16 +1,33 @@
+import time
 import numpy as np
 import genai_core.embeddings
 import genai_core.cross_encoder
+import genai_core.fusion
+import genai_core.aurora.index
 import genai_core.utils.comprehend
-from typing import List
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
 from psycopg2 import sql
 from genai_core.aurora.connection import AuroraConnection
-from genai_core.aurora.utils import convert_types
+from genai_core.aurora.keywords import get_keyword_column
+from genai_core.aurora.utils import (
+    StatementParameters,
+    convert_types,
+    execute_prepared,
+    get_filter_conditions,
+    get_vector_operator,
+    quantize_vector,
+)
 from aws_lambda_powertools import Logger
-from genai_core.types import CommonError, Task
+from genai_core.types import CommonError, SearchFilter, Task
+from genai_core.utils.timing import timed
 
 logger = Logger()
 
+# Quantized searches read a larger shortlist through the quantized index and
+# rescore it with the full precision vectors.
+QUANTIZATION_OVERSAMPLE = {"halfvec": 2, "binary": 8}
+
 
 def query_workspace_aurora(
     workspace_id: str,
@@ -19,7 +36,12 @@ def query_workspace_aurora(
     limit: int,
     full_response: bool,
     threshold: int = 0,
+    probes: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    filter: Optional[SearchFilter] = None,
 ):
+    """probes and ef_search override the index search settings of the
+    workspace for this query, the filter restricts both searches."""
     table_name = sql.Identifier(workspace_id.replace("-", ""))
     embeddings_model_provider = workspace["embeddings_model_provider"]
     embeddings_model_name = workspace["embeddings_model_name"]
@@ -38,148 +60,59 @@ def query_workspace_aurora(
     if selected_model is None:
         raise CommonError("Embeddings model not found")
 
-    query_embeddings = genai_core.embeddings.generate_embeddings(
-        selected_model, [query], Task.RETRIEVE
-    )[0]
-
-    language_name, detected_languages = genai_core.utils.comprehend.get_query_language(
-        query, languages
-    )
-
-    items = []
-    vector_search_records = []
-    keyword_search_records = []
-    with AuroraConnection() as cursor:
-        if metric == "cosine":
-            cursor.execute(
-                sql.SQL(
-                    """SELECT chunk_id,
-                        workspace_id,
-                        document_id,
-                        document_sub_id,
-                        document_type,
-                        document_sub_type,
-                        path,
-                        language,
-                        title,
-                        content,
-                        content_complement,
-                        metadata,
-                        content_embeddings <=> %s AS vector_search_score
-                FROM {table} ORDER BY vector_search_score LIMIT %s;"""
-                ).format(table=table_name),
-                [np.array(query_embeddings), vector_search_limit],
-            )
-        elif metric == "l2":
-            cursor.execute(
-                sql.SQL(
-                    """SELECT chunk_id,
-                        workspace_id,
-                        document_id,
-                        document_sub_id,
-                        document_type,
-                        document_sub_type,
-                        path,
-                        language,
-                        title,
-                        content,
-                        content_complement,
-                        metadata,
-                        content_embeddings <-> %s AS vector_search_score
-                FROM {table} ORDER BY vector_search_score LIMIT %s;"""
-                ).format(table=table_name),
-                [np.array(query_embeddings), vector_search_limit],
-            )
-        elif metric == "inner":
-            cursor.execute(
-                sql.SQL(
-                    """SELECT chunk_id,
-                        workspace_id,
-                        document_id,
-                        document_sub_id,
-                        document_type,
-                        document_sub_type,
-                        path,
-                        language,
-                        title,
-                        content,
-                        content_complement,
-                        metadata,
-                        content_embeddings <#> %s AS vector_search_score
-                FROM {table} ORDER BY vector_search_score LIMIT %s;"""
-                ).format(table=table_name),
-                [np.array(query_embeddings), vector_search_limit],
-            )
-        else:
-            raise Exception("Unknown metric")
-
-        vector_search_records = cursor.fetchall()
-        vector_search_records = _convert_records("vector_search", vector_search_records)
-        items.extend(vector_search_records)
-
-        if hybrid_search:
-            language = sql.Identifier(language_name)
-
-            cursor.execute(
-                sql.SQL(
-                    """SELECT chunk_id,
-                            workspace_id,
-                            document_id,
-                            document_sub_id,
-                            document_type,
-                            document_sub_type,
-                            path,
-                            language,
-                            title,
-                            content,
-                            content_complement,
-                            metadata,
-                            ts_rank_cd(to_tsvector('{language}', content), query) AS keyword_search_score
-                            FROM {table},
-                            plainto_tsquery('{language}', %s) query
-                            WHERE to_tsvector('{language}', content) @@ query
-                            ORDER BY keyword_search_score DESC
-                            LIMIT %s;"""  # noqa:E501
-                ).format(table=table_name, language=language),
-                [query, keyword_search_limit],
-            )
-
-            keyword_search_records = cursor.fetchall()
-            keyword_search_records = _convert_records(
-                "keyword_search", keyword_search_records
-            )
-            items.extend(keyword_search_records)
-
-    unique_items = dict({})
-    for item in items:
-        chunk_id = item["chunk_id"]
-
-        if chunk_id not in unique_items:
-            unique_items[chunk_id] = item
-        else:
-            current = unique_items[chunk_id]
-            for source in item["sources"]:
-                if source not in current["sources"]:
-                    current["sources"].append(source)
-            current["sources"] = sorted(current["sources"])
-
-            for source in current["sources"]:
-                if source not in item["sources"]:
-                    item["sources"].append(source)
-            item["sources"] = sorted(item["sources"])
-
-            if current["vector_search_score"] is None:
-                current["vector_search_score"] = item["vector_search_score"]
-            if current["keyword_search_score"] is None:
-                current["keyword_search_score"] = item["keyword_search_score"]
-
-            if item["vector_search_score"] is None:
-                item["vector_search_score"] = current["vector_search_score"]
-            if item["keyword_search_score"] is None:
-                item["keyword_search_score"] = current["keyword_search_score"]
+    # The query embeddings and the query language are independent, they are
+    # computed concurrently before the single search statement.
+    timings = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        query_embeddings_future = executor.submit(
+            timed,
+            timings,
+            "embeddings",
+            genai_core.embeddings.generate_embeddings,
+            selected_model,
+            [query],
+            Task.RETRIEVE,
+        )
+        language_name, detected_languages = timed(
+            timings,
+            "language_detection",
+            genai_core.utils.comprehend.get_query_language,
+            query,
+            languages,
+        )
+        query_embeddings = query_embeddings_future.result()[0]
+
+    # Comprehend falls back to english, the keyword columns and the chunk
+    # language tags only exist for the workspace languages
+    if languages and language_name not in languages:
+        language_name = languages[0]
+
+    with AuroraConnection(readonly=True) as cursor:
+        records = timed(
+            timings,
+            "hybrid_search" if hybrid_search else "vector_search",
+            _search,
+            cursor,
+            table_name,
+            workspace,
+            query_embeddings,
+            vector_search_limit,
+            language_name if hybrid_search else None,
+            query,
+            keyword_search_limit,
+            probes=probes,
+            ef_search=ef_search,
+            filter=filter,
+        )
 
-    unique_items = list(unique_items.values())
+    # The statement returns the hits in reciprocal rank fusion order
+    hits = _convert_hits(records)
+    if genai_core.fusion.HYBRID_SEARCH_FUSION != "rrf":
+        # The vector search scores are distances, lower is better
+        hits = genai_core.fusion.fuse(hits, vector_higher_is_better=False)
 
+    reranked = False
     if cross_encoder_model_name is not None:
         cross_encoder_model = genai_core.cross_encoder.get_cross_encoder_model(
             cross_encoder_model_provider, cross_encoder_model_name
@@ -188,82 +121,59 @@ def query_workspace_aurora(
         if cross_encoder_model is None:
             raise genai_core.types.CommonError("Cross encoder model not found")
 
-        score_dict = dict({})
-        if len(unique_items) > 0:
-            passages = [record["content"] for record in unique_items]
-            passage_scores = genai_core.cross_encoder.rank_passages(
-                cross_encoder_model, query, passages
-            )
-
-            for i in range(len(unique_items)):
-                score = passage_scores[i]
-                unique_items[i]["score"] = score
-                score_dict[unique_items[i]["chunk_id"]] = score
-
-        unique_items = sorted(unique_items, key=lambda x: x["score"], reverse=True)
+        hits, reranked = timed(
+            timings,
+            "rerank",
+            genai_core.cross_encoder.rerank_items,
+            cross_encoder_model,
+            query,
+            hits,
+            top_n=workspace.get("rerank_top_n"),
+            skip_gap=workspace.get("rerank_skip_gap"),
+        )
 
-        for record in vector_search_records:
-            record["score"] = score_dict[record["chunk_id"]]
-        for record in keyword_search_records:
-            record["score"] = score_dict[record["chunk_id"]]
+    timings["total"] = round((time.perf_counter() - start) * 1000, 2)
+    logger.info("Retrieval timings", timings=timings)
 
     if full_response:
-        unique_items = unique_items[:limit]
         ret_value = {
             "engine": "aurora",
             "query_language": language_name,
             "supported_languages": languages,
             "detected_languages": detected_languages,
-            "items": convert_types(unique_items),
+            "items": convert_types([hit.to_dict() for hit in hits[:limit]]),
             "vector_search_metric": metric,
-            "vector_search_items": convert_types(vector_search_records),
-            "keyword_search_items": convert_types(keyword_search_records),
+            "vector_search_items": convert_types(
+                [
+                    hit.to_dict()
+                    for hit in genai_core.fusion.get_source_hits(hits, "vector_search")
+                ]
+            ),
+            "keyword_search_items": convert_types(
+                [
+                    hit.to_dict()
+                    for hit in genai_core.fusion.get_source_hits(hits, "keyword_search")
+                ]
+            ),
+            "timings": timings,
         }
     else:
-        if cross_encoder_model_name is not None:
-            ret_items = list(
-                filter(lambda val: val["score"] > threshold, unique_items)
-            )[:limit]
-        else:
-            ret_items = unique_items[:limit]
-
-        if len(ret_items) < limit:
-            # inner product metric is negative hence we sort ascending
-            if metric == "inner":
-                unique_items = sorted(
-                    unique_items,
-                    key=lambda x: x["vector_search_score"] or 1,
-                    reverse=False,
-                )
-                ret_items = ret_items + (
-                    list(
-                        filter(
-                            lambda val: (val["vector_search_score"] or 1) < -0.5,
-                            unique_items,
-                        )
-                    )[: (limit - len(ret_items))]
-                )
-            else:
-                unique_items = sorted(
-                    unique_items,
-                    key=lambda x: x["vector_search_score"] or -1,
-                    reverse=True,
-                )
-                ret_items = ret_items + (
-                    list(
-                        filter(
-                            lambda val: (val["vector_search_score"] or -1) > 0.5,
-                            unique_items,
-                        )
-                    )[: (limit - len(ret_items))]
-                )
+        # inner product metric is negative hence lower scores are better
+        ret_items = genai_core.fusion.select(
+            hits,
+            limit,
+            threshold,
+            reranked,
+            vector_sign=-1 if metric == "inner" else 1,
+        )
 
         ret_value = {
             "engine": "aurora",
             "query_language": language_name,
             "supported_languages": languages,
             "detected_languages": detected_languages,
-            "items": convert_types(ret_items),
+            "items": convert_types([hit.to_dict() for hit in ret_items]),
+            "timings": timings,
         }
 
     logger.debug(ret_value)
@@ -271,35 +181,205 @@ def query_workspace_aurora(
     return ret_value
 
 
-def _convert_records(source: str, records: List[dict]):
-    converted_records = []
-    for record in records:
-        converted = {
-            "chunk_id": record[0],
-            "workspace_id": record[1],
-            "document_id": record[2],
-            "document_sub_id": record[3],
-            "document_type": record[4],
-            "document_sub_type": record[5],
-            "path": record[6],
-            "language": record[7],
-            "title": record[8],
-            "content": record[9],
-            "content_complement": record[10],
-            "metadata": record[11],
-            "sources": [source],
-            "score": None,
-        }
+def _search(
+    cursor,
+    table_name,
+    workspace: dict,
+    query_embeddings: List[float],
+    vector_search_limit: int,
+    language_name: Optional[str],
+    query: str,
+    keyword_search_limit: int,
+    probes: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    filter: Optional[SearchFilter] = None,
+):
+    """Vector search and, with a language, keyword search in one statement.
 
-        if source == "vector_search":
-            converted["vector_search_score"] = record[12]
-            converted["keyword_search_score"] = None
-        elif source == "keyword_search":
-            converted["keyword_search_score"] = record[12]
-            converted["vector_search_score"] = None
+    Both searches only select chunk ids and scores, they are fused with the
+    reciprocal rank fusion and the chunk rows are joined once per fused hit.
+    The filter conditions are part of both searches.
+    """
+    metric = workspace["metric"]
+    vector_quantization = workspace.get("vector_quantization", "none")
+    dimensions = workspace["embeddings_model_dimensions"]
+
+    if metric not in ["cosine", "l2", "inner"]:
+        raise Exception("Unknown metric")
+
+    params = StatementParameters()
+    query_vector = params.add(np.array(query_embeddings))
+    candidates = vector_search_limit
+    conditions = get_filter_conditions(filter, params)
+    where = sql.SQL("")
+    if conditions:
+        where = sql.SQL(" WHERE {}").format(sql.SQL(" AND ").join(conditions))
+
+    if not workspace["has_index"] or vector_quantization not in QUANTIZATION_OVERSAMPLE:
+        vector_candidates = sql.SQL(
+            """SELECT chunk_id, content_embeddings {operator} {query_vector} AS score
+            FROM {table}{where} ORDER BY score LIMIT {limit}"""
+        ).format(
+            table=table_name,
+            where=where,
+            operator=get_vector_operator(metric),
+            query_vector=query_vector,
+            limit=params.add(vector_search_limit),
+        )
+    else:
+        # Shortlist through the quantized index, rescored at full precision
+        candidates = vector_search_limit * QUANTIZATION_OVERSAMPLE[vector_quantization]
+        vector_candidates = sql.SQL(
+            """SELECT chunk_id, content_embeddings {operator} {query_vector} AS score
+            FROM (
+                SELECT chunk_id, content_embeddings FROM {table}{where}
+                ORDER BY {indexed_vector} {quantized_operator} {quantized_query_vector}
+                LIMIT {shortlist_size}
+            ) shortlist
+            ORDER BY score LIMIT {limit}"""
+        ).format(
+            table=table_name,
+            where=where,
+            operator=get_vector_operator(metric),
+            query_vector=query_vector,
+            indexed_vector=quantize_vector(
+                sql.Identifier("content_embeddings"), vector_quantization, dimensions
+            ),
+            quantized_operator=get_vector_operator(metric, vector_quantization),
+            quantized_query_vector=quantize_vector(
+                sql.SQL("{}::vector").format(query_vector),
+                vector_quantization,
+                dimensions,
+            ),
+            shortlist_size=params.add(candidates),
+            limit=params.add(vector_search_limit),
+        )
+
+    if language_name is not None:
+        # Chunks tagged with another language, a literal so that the partial
+        # index of the language matches the statement
+        language_filter = sql.SQL("")
+        if workspace.get("chunk_languages"):
+            language_filter = sql.SQL(" AND language = {language}").format(
+                language=sql.Literal(language_name)
+            )
+
+        if workspace.get("keyword_columns"):
+            document = sql.Identifier(get_keyword_column(language_name))
         else:
-            raise CommonError("Unknown source")
+            # Tables not migrated to the stored tsvector columns yet
+            document = sql.SQL("to_tsvector('{language}', content)").format(
+                language=sql.Identifier(language_name)
+            )
+
+        keyword_search = sql.SQL(
+            """, keyword_search AS (
+                SELECT chunk_id, score, row_number() OVER (ORDER BY score DESC) AS rank
+                FROM (
+                    SELECT chunk_id,
+                        ts_rank_cd({document}, query) AS score
+                    FROM {table}, plainto_tsquery('{language}', {query}) query
+                    WHERE {document} @@ query{language_filter}{conditions}
+                    ORDER BY score DESC LIMIT {limit}
+                ) candidates
+            ), fused AS (
+                SELECT chunk_id,
+                    vector_search.score AS vector_search_score,
+                    keyword_search.score AS keyword_search_score,
+                    vector_search.rank AS vector_rank,
+                    keyword_search.rank AS keyword_rank
+                FROM vector_search FULL OUTER JOIN keyword_search USING (chunk_id)
+            )"""
+        ).format(
+            table=table_name,
+            document=document,
+            language_filter=language_filter,
+            conditions=sql.Composed(
+                [sql.SQL(" AND {}").format(condition) for condition in conditions]
+            ),
+            language=sql.Identifier(language_name),
+            query=params.add(query),
+            limit=params.add(keyword_search_limit),
+        )
+    else:
+        keyword_search = sql.SQL(
+            """, fused AS (
+                SELECT chunk_id,
+                    score AS vector_search_score,
+                    NULL::real AS keyword_search_score,
+                    rank AS vector_rank,
+                    NULL::bigint AS keyword_rank
+                FROM vector_search
+            )"""
+        )
+
+    statement = sql.SQL(
+        """WITH vector_search AS (
+            SELECT chunk_id, score, row_number() OVER (ORDER BY score) AS rank
+            FROM ({vector_candidates}) candidates
+        ){keyword_search}
+        SELECT chunks.chunk_id,
+            chunks.workspace_id,
+            chunks.document_id,
+            chunks.document_sub_id,
+            chunks.document_type,
+            chunks.document_sub_type,
+            chunks.path,
+            chunks.language,
+            chunks.title,
+            chunks.content,
+            chunks.content_complement,
+            chunks.metadata,
+            fused.vector_search_score,
+            fused.keyword_search_score,
+            fused.vector_rank,
+            fused.keyword_rank,
+            COALESCE(1.0::float8 / ({rrf_k} + fused.vector_rank), 0)
+                + COALESCE(1.0::float8 / ({rrf_k} + fused.keyword_rank), 0)
+                AS fused_score
+        FROM fused JOIN {table} chunks USING (chunk_id)
+        ORDER BY fused_score DESC, fused.vector_rank, fused.keyword_rank;"""
+    ).format(
+        table=table_name,
+        vector_candidates=vector_candidates,
+        keyword_search=keyword_search,
+        rrf_k=sql.Literal(genai_core.fusion.RRF_K),
+    )
+
+    settings = genai_core.aurora.index.get_search_settings(
+        workspace, candidates, probes=probes, ef_search=ef_search
+    )
+    execute_prepared(cursor, statement, params.values, settings=settings)
+
+    return cursor.fetchall()
+
+
+def _convert_hits(records: List[tuple]) -> List[genai_core.fusion.Hit]:
+    hits = []
+    for record in records:
+        hit = genai_core.fusion.Hit(
+            record[0],
+            {
+                "chunk_id": record[0],
+                "workspace_id": record[1],
+                "document_id": record[2],
+                "document_sub_id": record[3],
+                "document_type": record[4],
+                "document_sub_type": record[5],
+                "path": record[6],
+                "language": record[7],
+                "title": record[8],
+                "content": record[9],
+                "content_complement": record[10],
+                "metadata": record[11],
+            },
+        )
+        hit.vector_search_score = record[12]
+        hit.keyword_search_score = record[13]
+        hit.vector_rank = record[14]
+        hit.keyword_rank = record[15]
+        hit.fused_score = record[16]
 
-        converted_records.append(converted)
+        hits.append(hit)
 
-    return converted_records
+    return hits
@@ -1,4 +1,30 @@
 import uuid
+import hashlib
+import weakref
+import psycopg2.errors
+from psycopg2 import sql
+from typing import List, Optional
+from genai_core.types import CommonError, SearchFilter
+
+VECTOR_OPERATORS = {"cosine": "<=>", "l2": "<->", "inner": "<#>"}
+VECTOR_OPERATOR_CLASSES = {
+    "none": {
+        "cosine": "vector_cosine_ops",
+        "l2": "vector_l2_ops",
+        "inner": "vector_ip_ops",
+    },
+    "halfvec": {
+        "cosine": "halfvec_cosine_ops",
+        "l2": "halfvec_l2_ops",
+        "inner": "halfvec_ip_ops",
+    },
+}
+# Binary quantized vectors are always compared with the hamming distance
+BINARY_OPERATOR = "<~>"
+BINARY_OPERATOR_CLASS = "bit_hamming_ops"
+
+# Names of the statements prepared on each connection
+_prepared_statements = weakref.WeakKeyDictionary()
 
 
 def convert_types(data):
@@ -10,3 +36,152 @@ def convert_types(data):
         return str(data)
     else:
         return data
+
+
+def get_vector_operator(metric: str, vector_quantization: str = "none"):
+    if vector_quantization == "binary":
+        return sql.SQL(BINARY_OPERATOR)
+
+    return sql.SQL(VECTOR_OPERATORS[metric])
+
+
+def get_vector_operator_class(metric: str, vector_quantization: str = "none"):
+    if vector_quantization == "binary":
+        return sql.SQL(BINARY_OPERATOR_CLASS)
+
+    return sql.SQL(VECTOR_OPERATOR_CLASSES[vector_quantization][metric])
+
+
+def quantize_vector(
+    expression: sql.Composable, vector_quantization: str, dimensions: int
+) -> sql.Composable:
+    """Wrap a vector expression in its quantized representation, the same
+    expression must be used by the index and by the queries to use the index.
+    """
+    if vector_quantization == "halfvec":
+        return sql.SQL("(({expression})::halfvec({dimensions}))").format(
+            expression=expression, dimensions=sql.Literal(int(dimensions))
+        )
+    elif vector_quantization == "binary":
+        return sql.SQL("(binary_quantize({expression})::bit({dimensions}))").format(
+            expression=expression, dimensions=sql.Literal(int(dimensions))
+        )
+
+    return expression
+
+
+class StatementParameters(object):
+    """Positional $n parameters of a prepared statement. Each add() sends a
+    new value, a value used twice in the statement is sent once by reusing
+    the returned placeholder."""
+
+    def __init__(self):
+        self.values = []
+
+    def add(self, value) -> sql.Composable:
+        self.values.append(value)
+
+        return sql.SQL("${}".format(len(self.values)))
+
+
+def get_filter_conditions(
+    filter: Optional[SearchFilter], params: StatementParameters
+) -> List[sql.Composable]:
+    """WHERE conditions of a search filter, the values are statement
+    parameters. The document ids are matched with the document_id and
+    document_sub_id indexes."""
+    if filter is None:
+        return []
+
+    conditions = []
+    for column in ["document_id", "document_sub_id"]:
+        value = getattr(filter, column)
+        if value is not None:
+            try:
+                value = str(uuid.UUID(value))
+            except ValueError:
+                raise CommonError(f"Invalid {column}")
+
+            conditions.append(
+                sql.SQL("{column} = {value}").format(
+                    column=sql.Identifier(column), value=params.add(value)
+                )
+            )
+
+    if filter.document_type is not None:
+        conditions.append(
+            sql.SQL("document_type = {}").format(params.add(filter.document_type))
+        )
+
+    if filter.path_prefix is not None:
+        pattern = (
+            filter.path_prefix.replace("\\", "\\\\")
+            .replace("%", "\\%")
+            .replace("_", "\\_")
+        )
+        conditions.append(sql.SQL("path LIKE {}").format(params.add(pattern + "%")))
+
+    if filter.created_after is not None:
+        conditions.append(
+            sql.SQL("created_at >= {}").format(params.add(filter.created_after))
+        )
+
+    if filter.created_before is not None:
+        conditions.append(
+            sql.SQL("created_at < {}").format(params.add(filter.created_before))
+        )
+
+    return conditions
+
+
+def execute_prepared(
+    cursor, statement: sql.Composable, params: list, settings: Optional[dict] = None
+):
+    """Execute a statement with $n placeholders as a prepared statement of
+    the cursor connection. The statement is prepared in the same round trip
+    as its first execution and planned once per connection.
+
+    The settings are set with SET LOCAL in the same query string, they only
+    apply to this execution (the query string is one implicit transaction).
+    """
+    text = statement.as_string(cursor)
+    name = "stmt_" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+    prepared = _prepared_statements.setdefault(cursor.connection, set())
+
+    execute = sql.SQL("EXECUTE {name}").format(name=sql.Identifier(name))
+    if len(params) > 0:
+        execute = sql.SQL("{execute} ({params})").format(
+            execute=execute,
+            params=sql.SQL(", ").join(sql.Placeholder() * len(params)),
+        )
+
+    if name not in prepared:
+        try:
+            query = sql.SQL("PREPARE {name} AS {statement}; {execute}").format(
+                name=sql.Identifier(name),
+                statement=sql.SQL(text.replace("%", "%%")),
+                execute=execute,
+            )
+            cursor.execute(_set_local(query, settings), params)
+            prepared.add(name)
+
+            return
+        except psycopg2.errors.DuplicatePreparedStatement:
+            prepared.add(name)
+
+    cursor.execute(_set_local(execute, settings), params)
+
+
+def _set_local(query: sql.Composable, settings: Optional[dict]) -> sql.Composable:
+    if not settings:
+        return query
+
+    return sql.Composed(
+        [
+            sql.SQL("SET LOCAL {name} = {value}; ").format(
+                name=sql.SQL(name), value=sql.Literal(value)
+            )
+            for name, value in settings.items()
+        ]
+        + [query]
+    )
@@ -1,16 +1,23 @@
 import os
 import uuid
 import boto3
+import hashlib
+from aws_lambda_powertools import Logger
 import genai_core.documents
 import genai_core.embeddings
 import genai_core.aurora.chunks
+import genai_core.aurora.index
 import genai_core.opensearch.chunks
+import genai_core.opensearch.utils
+import genai_core.utils.language
 from genai_core.types import CommonError, Task
-from typing import List, Optional
+from collections import defaultdict
+from typing import Dict, List, Optional
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 PROCESSING_BUCKET_NAME = os.environ.get("PROCESSING_BUCKET_NAME", "")
 s3 = boto3.resource("s3")
+logger = Logger()
 
 
 def add_chunks(
@@ -21,7 +28,14 @@ def add_chunks(
     chunks: List[str],
     chunk_complements: List[str],
     path: Optional[str] = None,
+    delta: bool = False,
 ):
+    """Embed and store the chunks of a document.
+
+    With replace=True and delta=True the chunks already stored for the
+    document are compared by content hash: unchanged chunks are kept, only
+    new chunks are embedded and inserted, and stale chunks are deleted.
+    """
     workspace_id = workspace["workspace_id"]
     engine = workspace["engine"]
     embeddings_model_provider = workspace["embeddings_model_provider"]
@@ -39,10 +53,51 @@ def add_chunks(
     if embeddings_model is None:
         raise CommonError("Embeddings model not found")
 
+    if engine not in ["aurora", "opensearch"]:
+        raise CommonError("Engine not supported")
+
+    complements_len = len(chunk_complements) if chunk_complements else 0
+    chunk_hashes = [
+        get_chunk_hash(
+            document_sub_id,
+            path,
+            title,
+            chunk,
+            chunk_complements[idx] if idx < complements_len else None,
+        )
+        for idx, chunk in enumerate(chunks)
+    ]
+
+    stale_ids = []
+    total_vectors = len(chunks)
+    if replace and delta:
+        stored_hashes = get_chunk_hashes(engine, workspace_id, document_id)
+        new_indexes, stale_ids = _get_chunks_delta(chunk_hashes, stored_hashes)
+
+        logger.info(
+            "Delta ingestion",
+            document_id=document_id,
+            kept=len(chunks) - len(new_indexes),
+            added=len(new_indexes),
+            removed=len(stale_ids),
+        )
+
+        chunks = [chunks[idx] for idx in new_indexes]
+        chunk_hashes = [chunk_hashes[idx] for idx in new_indexes]
+        if complements_len > 0:
+            chunk_complements = [
+                chunk_complements[idx] if idx < complements_len else None
+                for idx in new_indexes
+            ]
+
     chunk_embeddings = genai_core.embeddings.generate_embeddings(
-        embeddings_model, chunks, Task.STORE.value
+        embeddings_model, chunks, Task.STORE.value, as_array=True
     )
     chunk_ids = [uuid.uuid4() for _ in chunks]
+    chunk_languages = [
+        genai_core.utils.language.get_chunk_language(chunk, workspace.get("languages"))
+        for chunk in chunks
+    ]
 
     store_chunks_on_s3(workspace_id, document_id, document_sub_id, chunk_ids, chunks)
 
@@ -59,7 +114,9 @@ def add_chunks(
             chunk_embeddings=chunk_embeddings,
             chunks=chunks,
             chunk_complements=chunk_complements,
-            replace=replace,
+            replace=replace and not delta,
+            chunk_hashes=chunk_hashes,
+            chunk_languages=chunk_languages,
         )
     elif engine == "opensearch":
         result = genai_core.opensearch.chunks.add_chunks_open_search(
@@ -74,16 +131,105 @@ def add_chunks(
             chunk_embeddings=chunk_embeddings,
             chunks=chunks,
             chunk_complements=chunk_complements,
-            replace=replace,
+            replace=replace and not delta,
+            chunk_hashes=chunk_hashes,
+            chunk_languages=chunk_languages,
+            vector_quantization=workspace.get("vector_quantization"),
+            byte_vector_scale=genai_core.opensearch.utils.get_byte_vector_scale(
+                workspace
+            ),
         )
-    else:
-        raise CommonError("Engine not supported")
 
     added_vectors = result["added_vectors"]
+    failed_vectors = result.get("failed_vectors", 0)
+    if replace and delta:
+        delete_chunks(engine, workspace_id, stale_ids)
+        # The document keeps the unchanged chunks, so its vector count is
+        # the total number of chunks and not only the inserted ones.
+        added_vectors = total_vectors - failed_vectors
+
     genai_core.documents.set_document_vectors(
         workspace_id, document_id, added_vectors, replace=replace
     )
 
+    if engine == "aurora" and result["added_vectors"] > 0:
+        _request_index_rebuild(workspace)
+
+    if failed_vectors > 0:
+        raise CommonError(
+            f"{failed_vectors} chunks of document {document_id} were not indexed"
+        )
+
+
+def get_chunk_hash(
+    document_sub_id: Optional[str],
+    path: Optional[str],
+    title: Optional[str],
+    content: str,
+    content_complement: Optional[str],
+) -> str:
+    # Every stored column of the chunk is part of the hash, a chunk is only
+    # kept when the row would be identical.
+    value = "\x00".join(
+        [
+            str(document_sub_id or ""),
+            path or "",
+            title or "",
+            content,
+            content_complement or "",
+        ]
+    )
+
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def get_chunk_hashes(engine: str, workspace_id: str, document_id: str):
+    if engine == "aurora":
+        return genai_core.aurora.chunks.get_chunk_hashes_aurora(
+            workspace_id, document_id
+        )
+    elif engine == "opensearch":
+        return genai_core.opensearch.chunks.get_chunk_hashes_open_search(
+            workspace_id, document_id
+        )
+
+    raise CommonError("Engine not supported")
+
+
+def delete_chunks(engine: str, workspace_id: str, ids: List[str]):
+    if engine == "aurora":
+        return genai_core.aurora.chunks.delete_chunks_aurora(workspace_id, ids)
+    elif engine == "opensearch":
+        return genai_core.opensearch.chunks.delete_chunks_open_search(workspace_id, ids)
+
+    raise CommonError("Engine not supported")
+
+
+def _request_index_rebuild(workspace: dict):
+    # The chunks are stored, the index is rebuilt again on the next ingest
+    try:
+        genai_core.aurora.index.request_rebuild(workspace)
+    except Exception as e:
+        logger.exception(e)
+
+
+def _get_chunks_delta(chunk_hashes: List[str], stored_hashes: Dict[str, str]):
+    available = defaultdict(list)
+    for id, chunk_hash in stored_hashes.items():
+        available[chunk_hash].append(id)
+
+    # A stored chunk can only be reused once, duplicated chunks stay duplicated
+    new_indexes = []
+    for idx, chunk_hash in enumerate(chunk_hashes):
+        if available.get(chunk_hash):
+            available[chunk_hash].pop()
+        else:
+            new_indexes.append(idx)
+
+    stale_ids = [id for ids in available.values() for id in ids]
+
+    return new_indexes, stale_ids
+
 
 def split_content(workspace: dict, content: str):
     chunking_strategy = workspace["chunking_strategy"]
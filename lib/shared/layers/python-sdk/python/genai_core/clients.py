@@ -1,9 +1,33 @@
+import os
+import time
 import boto3
+import random
 import openai
+import threading
 import genai_core.types
 import genai_core.parameters
 from botocore.config import Config
-
+from botocore.exceptions import ClientError
+from contextlib import contextmanager
+from typing import Callable
+
+# Adaptive concurrency of the model endpoints (Bedrock models, SageMaker
+# endpoints). Each endpoint starts at the initial limit, grows by one request
+# per round trip while it succeeds and halves when it is throttled.
+ENDPOINTS_INITIAL_CONCURRENCY = int(
+    os.environ.get("MODEL_ENDPOINTS_INITIAL_CONCURRENCY", "4")
+)
+ENDPOINTS_MAX_CONCURRENCY = int(os.environ.get("MODEL_ENDPOINTS_MAX_CONCURRENCY", "32"))
+ENDPOINTS_MAX_ATTEMPTS = int(os.environ.get("MODEL_ENDPOINTS_MAX_ATTEMPTS", "6"))
+THROTTLING_ERROR_CODES = [
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+]
+# Transient errors are retried but do not lower the concurrency limit
+RETRYABLE_ERROR_CODES = THROTTLING_ERROR_CODES + ["InternalServerError"]
+BASE_BACKOFF_SECONDS = 0.25
+MAX_BACKOFF_SECONDS = 8
 
 sts_client = boto3.client("sts")
 
@@ -18,15 +42,20 @@ def get_openai_client():
     return openai
 
 
-def get_sagemaker_client():
-    config = Config(retries={"max_attempts": 15, "mode": "adaptive"})
+# Clients of call_endpoint, throttling is retried by call_endpoint so the
+# endpoint limiter sees it
+NO_RETRIES_CONFIG = Config(retries={"total_max_attempts": 1, "mode": "standard"})
 
-    client = boto3.client("sagemaker-runtime", config=config)
+
+def get_sagemaker_client():
+    client = boto3.client("sagemaker-runtime", config=NO_RETRIES_CONFIG)
 
     return client
 
 
-def get_bedrock_client(service_name="bedrock-runtime"):
+def get_bedrock_client(service_name="bedrock-runtime", retries=True):
+    """With retries=False the client makes a single attempt per request, for
+    the requests sent with call_endpoint."""
     config = genai_core.parameters.get_config()
     bedrock_config = config.get("bedrock", {})
     bedrock_enabled = bedrock_config.get("enabled", False)
@@ -34,6 +63,8 @@ def get_bedrock_client(service_name="bedrock-runtime"):
         return None
 
     bedrock_config_data = {"service_name": service_name}
+    if not retries:
+        bedrock_config_data["config"] = NO_RETRIES_CONFIG
     region_name = bedrock_config.get("region")
     role_arn = bedrock_config.get("roleArn")
 
@@ -52,3 +83,163 @@ def get_bedrock_client(service_name="bedrock-runtime"):
         bedrock_config_data["aws_session_token"] = credentials["SessionToken"]
 
     return boto3.client(**bedrock_config_data)
+
+
+class ConcurrencyLimiter(object):
+    """Additive increase / multiplicative decrease limit of the requests in
+    flight to one endpoint."""
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        max_limit: int,
+        min_limit: int = 1,
+        decrease_factor: float = 0.5,
+    ):
+        self.name = name
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.successes = 0
+        self.throttles = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> float:
+        """Wait for a free slot, return the time the request was started."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+            return time.monotonic()
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        started_at = self.acquire()
+        try:
+            yield started_at
+        finally:
+            self.release()
+
+    def on_success(self):
+        with self._condition:
+            self.successes += 1
+            # +1 once a full window of requests succeeded
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self, started_at: float):
+        with self._condition:
+            self.throttles += 1
+
+            # Requests sent before the last decrease were sent with the old
+            # limit, they must not decrease the limit a second time.
+            if started_at < self._last_decrease:
+                return
+
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            self._last_decrease = time.monotonic()
+
+    def get_metrics(self) -> dict:
+        with self._condition:
+            return {
+                "endpoint": self.name,
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "successes": self.successes,
+                "throttles": self.throttles,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_concurrency_limiter(endpoint: str) -> ConcurrencyLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(endpoint)
+        if limiter is None:
+            limiter = ConcurrencyLimiter(
+                endpoint, ENDPOINTS_INITIAL_CONCURRENCY, ENDPOINTS_MAX_CONCURRENCY
+            )
+            _limiters[endpoint] = limiter
+
+        return limiter
+
+
+def get_concurrency_metrics():
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+
+    return [limiter.get_metrics() for limiter in limiters]
+
+
+def call_endpoint(endpoint: str, fn: Callable, *args, **kwargs):
+    """Call a model endpoint within its concurrency limit, throttled and
+    transient errors are retried with exponential backoff."""
+    limiter = get_concurrency_limiter(endpoint)
+
+    for attempt in range(ENDPOINTS_MAX_ATTEMPTS):
+        with limiter.slot() as started_at:
+            try:
+                response = fn(*args, **kwargs)
+            except ClientError as error:
+                error_code = error.response.get("Error", {}).get("Code")
+                if error_code not in RETRYABLE_ERROR_CODES:
+                    raise error
+                if error_code in THROTTLING_ERROR_CODES:
+                    limiter.on_throttle(started_at)
+                if attempt == ENDPOINTS_MAX_ATTEMPTS - 1:
+                    raise error
+            else:
+                limiter.on_success()
+                return response
+
+        # Exponential backoff with full jitter, outside of the slot
+        delay = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2**attempt)
+        time.sleep(
+            random.uniform(
+                0, delay
+            )  # nosec B311 Random value not used for cyptographic purposes
+        )
+
+
+def register_concurrency_control(client, endpoint: str):
+    """Route every call of a boto3 client through the endpoint limiter. Used
+    for the clients handed over to libraries making the calls themselves,
+    the retries stay with botocore."""
+    limiter = get_concurrency_limiter(endpoint)
+
+    def before_call(context, **kwargs):
+        context["concurrency_started_at"] = limiter.acquire()
+
+    def after_call(http_response, parsed, context, **kwargs):
+        started_at = context.pop("concurrency_started_at", None)
+        if started_at is None:
+            return
+
+        limiter.release()
+        error_code = parsed.get("Error", {}).get("Code")
+        if error_code in THROTTLING_ERROR_CODES:
+            limiter.on_throttle(started_at)
+        elif http_response.status_code < 300:
+            limiter.on_success()
+
+    def after_call_error(context, **kwargs):
+        if context.pop("concurrency_started_at", None) is not None:
+            limiter.release()
+
+    client.meta.events.register("before-call", before_call)
+    client.meta.events.register("after-call", after_call)
+    client.meta.events.register("after-call-error", after_call_error)
+
+    return client
@@ -1,12 +1,25 @@
 import os
 import json
+import hashlib
+import unicodedata
 import genai_core.types
 import genai_core.clients
 import genai_core.parameters
-from typing import List, Optional
+import genai_core.local_models
+from aws_lambda_powertools import Logger
+from genai_core.fusion import Hit
+from genai_core.utils.cache import LRUCache
+from typing import List, Optional, Tuple
 
 
 SAGEMAKER_RAG_MODELS_ENDPOINT = os.environ.get("SAGEMAKER_RAG_MODELS_ENDPOINT")
+CROSS_ENCODER_CACHE_SIZE = int(os.environ.get("CROSS_ENCODER_CACHE_SIZE", "10000"))
+CROSS_ENCODER_CACHE_TTL = int(os.environ.get("CROSS_ENCODER_CACHE_TTL", "3600"))
+logger = Logger()
+
+# Scores by (provider, model, query hash, passage hash). The same passages are
+# ranked again for every query of a session and for the rephrased question.
+score_cache = LRUCache(maxsize=CROSS_ENCODER_CACHE_SIZE, ttl=CROSS_ENCODER_CACHE_TTL)
 
 
 def rank_passages(
@@ -16,10 +29,92 @@ def rank_passages(
     passages = passages[:1000]
     passages = list(map(lambda x: x[:10000], passages))
 
-    if model.provider == "sagemaker":
-        return _rank_passages_sagemaker(model, input, passages)
+    if model.provider not in ["sagemaker", "local"]:
+        raise genai_core.types.CommonError("Unknown provider")
+
+    query_hash = _hash(normalize_query(input))
+    keys = [
+        (model.provider, model.name, query_hash, _hash(passage)) for passage in passages
+    ]
+
+    scores = {}
+    missing = {}
+    for key, passage in zip(keys, passages):
+        score = score_cache.get(key)
+        if score is not None:
+            scores[key] = score
+        else:
+            missing[key] = passage
+
+    # Only the passages missing from the cache are sent, once each
+    if missing:
+        if model.provider == "local":
+            missing_scores = genai_core.local_models.rank(
+                model.name, input, list(missing.values())
+            )
+        else:
+            missing_scores = _rank_passages_sagemaker(
+                model, input, list(missing.values())
+            )
+        for key, score in zip(missing.keys(), missing_scores):
+            score_cache.put(key, score)
+            scores[key] = score
+
+    return [scores[key] for key in keys]
+
+
+def rerank_items(
+    model: genai_core.types.CrossEncoderModel,
+    query: str,
+    hits: List[Hit],
+    top_n: Optional[int] = None,
+    skip_gap: Optional[float] = None,
+) -> Tuple[List[Hit], bool]:
+    """Set the cross-encoder score of the hits and sort them by score.
+
+    The hits are in fused order (genai_core.fusion.fuse). With top_n (cascade
+    mode) only the first top_n hits are reranked, the others follow in fused
+    order without a score. With skip_gap, with or without top_n, reranking is
+    skipped when the fused score of the first hit leads the second one by at
+    least skip_gap, relative to the first score.
+
+    Returns the sorted hits and whether they were reranked.
+    """
+    if skip_gap is not None and _is_decisive(hits, float(skip_gap)):
+        logger.info("Reranking skipped, decisive first stage", items=len(hits))
+        return hits, False
+
+    candidates = hits
+    rest = []
+    if top_n:
+        candidates = hits[: int(top_n)]
+        rest = hits[int(top_n) :]
+
+    if len(candidates) > 0:
+        passages = [hit.record["content"] for hit in candidates]
+        passage_scores = rank_passages(model, query, passages)
 
-    raise genai_core.typesCommonError("Unknown provider")
+        for hit, score in zip(candidates, passage_scores):
+            hit.score = score
+
+    logger.info("Reranked", items=len(hits), reranked=len(candidates))
+    candidates = sorted(candidates, key=lambda x: x.score, reverse=True)
+
+    return candidates + rest, True
+
+
+def _is_decisive(hits: List[Hit], gap: float):
+    if len(hits) < 2:
+        return False
+
+    first = hits[0].fused_score or 0
+    second = hits[1].fused_score or 0
+
+    return first > 0 and (first - second) / first >= gap
+
+
+def normalize_query(value: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", value).split())
 
 
 def get_cross_encoder_models():
@@ -28,6 +123,8 @@ def get_cross_encoder_models():
 
     if not SAGEMAKER_RAG_MODELS_ENDPOINT:
         models = list(filter(lambda x: x["provider"] != "sagemaker", models))
+    if not genai_core.local_models.is_enabled():
+        models = list(filter(lambda x: x["provider"] != "local", models))
 
     return models
 
@@ -45,12 +142,18 @@ def get_cross_encoder_model(
     return None
 
 
+def _hash(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
 def _rank_passages_sagemaker(
     model: genai_core.types.CrossEncoderModel, input: str, passages: List[str]
 ):
     client = genai_core.clients.get_sagemaker_client()
 
-    response = client.invoke_endpoint(
+    response = genai_core.clients.call_endpoint(
+        f"sagemaker:{SAGEMAKER_RAG_MODELS_ENDPOINT}",
+        client.invoke_endpoint,
         EndpointName=SAGEMAKER_RAG_MODELS_ENDPOINT,
         ContentType="application/json",
         Body=json.dumps(
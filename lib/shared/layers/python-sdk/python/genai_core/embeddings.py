@@ -1,38 +1,100 @@
 import os
 import json
-import time
-import random
+import math
 from aws_lambda_powertools import Logger
-import botocore
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from genai_core.types import EmbeddingsModel, CommonError, Provider, Task
 import genai_core.clients
 import genai_core.parameters
-from typing import List, Optional
+import genai_core.embeddings_cache
+import genai_core.local_models
+from typing import Callable, List, Optional, Union
 
 SAGEMAKER_RAG_MODELS_ENDPOINT = os.environ.get("SAGEMAKER_RAG_MODELS_ENDPOINT")
 logger = Logger()
 
+# Providers that only accept one text per request are fanned out on a thread
+# pool, the requests in flight are further limited by the adaptive limit of the
+# endpoint (genai_core.clients). The pool size can be overridden per provider
+# with EMBEDDINGS_MAX_CONCURRENCY_<PROVIDER> (e.g. EMBEDDINGS_MAX_CONCURRENCY_AMAZON).
+DEFAULT_MAX_CONCURRENCY = {
+    Provider.AMAZON.value: 8,
+}
+# Request limits of the embeddings APIs: texts per request, estimated tokens per
+# request and JSON payload bytes per request. None means no limit, per-item
+# providers (Amazon Titan) are not batched at all.
+REQUEST_LIMITS = {
+    Provider.OPENAI.value: {"items": 2048, "tokens": 300000, "bytes": None},
+    Provider.COHERE.value: {"items": 96, "tokens": None, "bytes": None},
+    Provider.SAGEMAKER.value: {"items": 64, "tokens": 32768, "bytes": 5 * 1024**2},
+    Provider.AMAZON.value: {"items": None, "tokens": None, "bytes": None},
+    Provider.LOCAL.value: {
+        "items": genai_core.local_models.LOCAL_MODELS_BATCH_SIZE,
+        "tokens": None,
+        "bytes": None,
+    },
+}
+# Fixed batch size used before requests were packed, kept to report savings
+LEGACY_BATCH_SIZE = 50
+
 
 def generate_embeddings(
-    model: EmbeddingsModel, input: List[str], task: str = "store", batch_size: int = 50
-) -> List[List[float]]:
+    model: EmbeddingsModel,
+    input: List[str],
+    task: str = "store",
+    batch_size: Optional[int] = None,
+    as_array: bool = False,
+) -> Union[List[List[float]], np.ndarray]:
+    """Embed the texts, in order.
+
+    With as_array=True the embeddings are returned as a contiguous float32
+    matrix of shape (len(input), dimensions) instead of lists of floats.
+    """
     input = list(map(lambda x: x[:10000], input))
+    task = Task(task)
+
+    # Only the texts missing from the cache are sent to the provider, once each
+    cache_keys = [
+        genai_core.embeddings_cache.get_cache_key(model, task, value) for value in input
+    ]
+    embeddings = genai_core.embeddings_cache.get_embeddings(cache_keys)
+    missing = dict(
+        (key, value) for key, value in zip(cache_keys, input) if key not in embeddings
+    )
 
-    ret_value = []
-    batch_split = [input[i : i + batch_size] for i in range(0, len(input), batch_size)]
+    missing_embeddings = None
+    if missing:
+        missing_embeddings = _generate_embeddings(
+            model, list(missing.values()), task, batch_size
+        )
+        # Cached rows are copies, a view would keep the whole generated matrix
+        # alive and share its buffer with the returned matrix
+        generated = dict(
+            (key, row.copy()) for key, row in zip(missing.keys(), missing_embeddings)
+        )
 
-    for batch in batch_split:
-        if model.provider == Provider.OPENAI.value:
-            ret_value.extend(_generate_embeddings_openai(model, batch))
-        elif model.provider == Provider.BEDROCK.value:
-            ret_value.extend(_generate_embeddings_bedrock(model, batch, task))
-        elif model.provider == Provider.SAGEMAKER.value:
-            ret_value.extend(_generate_embeddings_sagemaker(model, batch))
-        else:
-            raise CommonError(f"Unknown provider: {model.provider}")
+        genai_core.embeddings_cache.put_embeddings(generated)
+        embeddings.update(generated)
 
-    return ret_value
+    logger.info(
+        "Embeddings generated",
+        count=len(input),
+        cache_misses=len(missing),
+        endpoints=genai_core.clients.get_concurrency_metrics(),
+    )
+
+    if not as_array:
+        return [embeddings[key].tolist() for key in cache_keys]
+
+    if len(missing) == len(cache_keys) and len(cache_keys) > 0:
+        # Nothing came from the cache and every text is distinct, the generated
+        # matrix is already in the input order.
+        return missing_embeddings
+    if len(cache_keys) == 0:
+        return np.empty((0, model.dimensions), dtype=np.float32)
+
+    return np.stack([embeddings[key] for key in cache_keys])
 
 
 def get_embeddings_models():
@@ -41,6 +103,8 @@ def get_embeddings_models():
 
     if not SAGEMAKER_RAG_MODELS_ENDPOINT:
         models = list(filter(lambda x: x["provider"] != "sagemaker", models))
+    if not genai_core.local_models.is_enabled():
+        models = list(filter(lambda x: x["provider"] != "local", models))
 
     return models
 
@@ -56,6 +120,102 @@ def get_embeddings_model(provider: Provider, name: str) -> Optional[EmbeddingsMo
     return None
 
 
+def plan_batches(
+    model: EmbeddingsModel, input: List[str], batch_size: Optional[int] = None
+) -> List[List[str]]:
+    """Pack the texts, in order, into the fewest requests allowed by the
+    provider limits. batch_size further caps the number of texts per request.
+    """
+    limits = _get_request_limits(model)
+    max_items = min(filter(None, [limits["items"], batch_size]), default=None)
+    max_tokens = limits["tokens"]
+    max_bytes = limits["bytes"]
+
+    batches = []
+    batch = []
+    batch_tokens = 0
+    batch_bytes = 0
+    for value in input:
+        tokens = estimate_tokens(value) if max_tokens else 0
+        # json.dumps gives the exact size of the string in the request body
+        size = len(json.dumps(value)) + 2 if max_bytes else 0
+
+        if batch and (
+            (max_items and len(batch) + 1 > max_items)
+            or (max_tokens and batch_tokens + tokens > max_tokens)
+            or (max_bytes and batch_bytes + size > max_bytes)
+        ):
+            batches.append(batch)
+            batch = []
+            batch_tokens = 0
+            batch_bytes = 0
+
+        batch.append(value)
+        batch_tokens += tokens
+        batch_bytes += size
+
+    if batch:
+        batches.append(batch)
+
+    return batches
+
+
+def estimate_tokens(value: str) -> int:
+    # Fast upper bound of the token count: English averages about 4 bytes
+    # per token and CJK text about 3 bytes (one character) per token.
+    return len(value.encode("utf-8")) // 3 + 1
+
+
+def _get_request_limits(model: EmbeddingsModel) -> dict:
+    provider = model.provider
+    if provider == Provider.BEDROCK.value:
+        provider = model.name.split(".")[0]
+
+    return REQUEST_LIMITS.get(
+        provider, {"items": LEGACY_BATCH_SIZE, "tokens": None, "bytes": None}
+    )
+
+
+def _generate_embeddings(
+    model: EmbeddingsModel, input: List[str], task: Task, batch_size: Optional[int]
+):
+    if model.provider not in [
+        Provider.OPENAI.value,
+        Provider.BEDROCK.value,
+        Provider.SAGEMAKER.value,
+        Provider.LOCAL.value,
+    ]:
+        raise CommonError(f"Unknown provider: {model.provider}")
+
+    batches = plan_batches(model, input, batch_size)
+    if _get_request_limits(model)["items"] is not None:
+        logger.info(
+            "Embeddings batch plan",
+            texts=len(input),
+            requests=len(batches),
+            saved_requests=math.ceil(len(input) / LEGACY_BATCH_SIZE) - len(batches),
+        )
+
+    ret_value = []
+    for batch in batches:
+        if model.provider == Provider.OPENAI.value:
+            embeddings = _generate_embeddings_openai(model, batch)
+        elif model.provider == Provider.BEDROCK.value:
+            embeddings = _generate_embeddings_bedrock(model, batch, task)
+        elif model.provider == Provider.SAGEMAKER.value:
+            embeddings = _generate_embeddings_sagemaker(model, batch)
+        elif model.provider == Provider.LOCAL.value:
+            embeddings = genai_core.local_models.embed(model.name, batch)
+
+        # Lists of Python floats only live for the duration of one batch
+        ret_value.append(np.asarray(embeddings, dtype=np.float32))
+
+    if len(ret_value) == 1:
+        return ret_value[0]
+
+    return np.concatenate(ret_value)
+
+
 def _generate_embeddings_openai(model: EmbeddingsModel, input: List[str]):
     openai = genai_core.clients.get_openai_client()
 
@@ -69,7 +229,7 @@ def _generate_embeddings_openai(model: EmbeddingsModel, input: List[str]):
 
 
 def _generate_embeddings_bedrock(model: EmbeddingsModel, input: List[str], task: Task):
-    bedrock = genai_core.clients.get_bedrock_client()
+    bedrock = genai_core.clients.get_bedrock_client(retries=False)
 
     if not bedrock:
         raise CommonError("Bedrock is not enabled.")
@@ -84,23 +244,25 @@ def _generate_embeddings_bedrock(model: EmbeddingsModel, input: List[str], task:
 
 
 def _generate_embeddings_amazon(model: EmbeddingsModel, input: List[str], bedrock):
-    ret_value = []
-    for value in input:
+    def invoke(value: str):
         body = json.dumps({"inputText": value})
-        response = bedrock.invoke_model(
+        response = genai_core.clients.call_endpoint(
+            f"bedrock:{model.name}",
+            bedrock.invoke_model,
             body=body,
             modelId=model.name,
             accept="application/json",
             contentType="application/json",
         )
         response_body = json.loads(response.get("body").read())
-        embedding = response_body.get("embedding")
 
-        ret_value.append(embedding)
+        return response_body.get("embedding")
+
+    ret_value = _map_concurrently(Provider.AMAZON.value, invoke, input)
+
+    ret_value = np.array(ret_value, dtype=np.float32)
+    ret_value /= np.linalg.norm(ret_value, axis=1, keepdims=True)
 
-    ret_value = np.array(ret_value)
-    ret_value = ret_value / np.linalg.norm(ret_value, axis=1, keepdims=True)
-    ret_value = ret_value.tolist()
     return ret_value
 
 
@@ -111,7 +273,9 @@ def _generate_embeddings_cohere(
         Task.SEARCH_QUERY.value if task == Task.RETRIEVE else Task.SEARCH_DOCUMENT.value
     )
     body = json.dumps({"texts": input, "input_type": input_type})
-    response = bedrock.invoke_model(
+    response = genai_core.clients.call_endpoint(
+        f"bedrock:{model.name}",
+        bedrock.invoke_model,
         body=body,
         modelId=model.name,
         accept="application/json",
@@ -126,34 +290,33 @@ def _generate_embeddings_cohere(
 def _generate_embeddings_sagemaker(model: EmbeddingsModel, input: List[str]):
     client = genai_core.clients.get_sagemaker_client()
 
-    max_retries = 5
-    for attempt in range(max_retries):
-        try:
-            response = client.invoke_endpoint(
-                EndpointName=SAGEMAKER_RAG_MODELS_ENDPOINT,
-                ContentType="application/json",
-                Body=json.dumps(
-                    {"type": "embeddings", "model": model.name, "input": input}
-                ),
-            )
-
-            ret_value = json.loads(response["Body"].read().decode())
-
-            return ret_value
-        except botocore.exceptions.ClientError as error:
-            # Check if the error is due to a 500 server error
-            error_code = error.response.get("Error", {}).get("Code")
-            if (
-                error_code == "ServiceUnavailableException"
-                or error_code == "InternalServerError"
-            ):
-                logger.info(f"Attempt {attempt + 1} failed with a 500 error.")
-                time.sleep(
-                    random.uniform(
-                        0.3, 1.5
-                    )  # nosec B311 Random value not used for cyptographic purposes
-                )
-                continue
-            else:
-                # If the exception was due to another reason, raise it.
-                raise error
+    response = genai_core.clients.call_endpoint(
+        f"sagemaker:{SAGEMAKER_RAG_MODELS_ENDPOINT}",
+        client.invoke_endpoint,
+        EndpointName=SAGEMAKER_RAG_MODELS_ENDPOINT,
+        ContentType="application/json",
+        Body=json.dumps({"type": "embeddings", "model": model.name, "input": input}),
+    )
+
+    ret_value = json.loads(response["Body"].read().decode())
+
+    return ret_value
+
+
+def get_max_concurrency(provider: str) -> int:
+    env_name = f"EMBEDDINGS_MAX_CONCURRENCY_{provider.upper()}"
+    value = os.environ.get(env_name)
+    if value:
+        return max(1, int(value))
+
+    return DEFAULT_MAX_CONCURRENCY.get(provider, 1)
+
+
+def _map_concurrently(provider: str, fn: Callable, items: list) -> list:
+    max_concurrency = min(get_max_concurrency(provider), len(items))
+    if max_concurrency <= 1:
+        return [fn(item) for item in items]
+
+    # executor.map yields results in input order, whatever the completion order
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        return list(executor.map(fn, items))
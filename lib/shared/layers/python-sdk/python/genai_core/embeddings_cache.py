@@ -0,0 +1,117 @@
+import os
+import time
+import hashlib
+import boto3
+import numpy as np
+from aws_lambda_powertools import Logger
+from genai_core.types import EmbeddingsModel, Task
+from genai_core.utils.cache import LRUCache
+from typing import Dict, List
+
+EMBEDDINGS_CACHE_SIZE = int(os.environ.get("EMBEDDINGS_CACHE_SIZE", "4096"))
+EMBEDDINGS_CACHE_TABLE_NAME = os.environ.get("EMBEDDINGS_CACHE_TABLE_NAME")
+EMBEDDINGS_CACHE_TTL_DAYS = int(os.environ.get("EMBEDDINGS_CACHE_TTL_DAYS", "30"))
+
+dynamodb = boto3.resource("dynamodb")
+logger = Logger()
+
+# In-process tier, shared by every warm invocation of the execution environment
+memory_cache = LRUCache(maxsize=EMBEDDINGS_CACHE_SIZE)
+persistent_stats = {"hits": 0, "misses": 0}
+
+
+def get_cache_key(model: EmbeddingsModel, task: Task, text: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    return f"{model.provider}#{model.name}#{task.value}#{digest}"
+
+
+def get_embeddings(keys: List[str]) -> Dict[str, np.ndarray]:
+    ret_value = {}
+    missing = []
+    for key in dict.fromkeys(keys):
+        embedding = memory_cache.get(key)
+        if embedding is not None:
+            ret_value[key] = embedding
+        else:
+            missing.append(key)
+
+    if missing and EMBEDDINGS_CACHE_TABLE_NAME:
+        found = _get_persistent_embeddings(missing)
+        persistent_stats["hits"] += len(found)
+        persistent_stats["misses"] += len(missing) - len(found)
+
+        for key, embedding in found.items():
+            memory_cache.put(key, embedding)
+            ret_value[key] = embedding
+
+    return ret_value
+
+
+def put_embeddings(embeddings: Dict[str, np.ndarray]):
+    for key, embedding in embeddings.items():
+        memory_cache.put(key, embedding)
+
+    if embeddings and EMBEDDINGS_CACHE_TABLE_NAME:
+        _put_persistent_embeddings(embeddings)
+
+
+def get_cache_stats():
+    return {
+        "memory": memory_cache.stats(),
+        "persistent": {
+            "enabled": EMBEDDINGS_CACHE_TABLE_NAME is not None,
+            **persistent_stats,
+        },
+    }
+
+
+def _get_persistent_embeddings(keys: List[str]) -> Dict[str, np.ndarray]:
+    ret_value = {}
+    now = int(time.time())
+
+    try:
+        # BatchGetItem accepts up to 100 keys per request
+        for i in range(0, len(keys), 100):
+            request_items = {
+                EMBEDDINGS_CACHE_TABLE_NAME: {
+                    "Keys": [{"cache_key": key} for key in keys[i : i + 100]],
+                    "ProjectionExpression": "cache_key, embedding, expires_at",
+                }
+            }
+
+            while request_items:
+                response = dynamodb.batch_get_item(RequestItems=request_items)
+                for item in response["Responses"].get(EMBEDDINGS_CACHE_TABLE_NAME, []):
+                    # Expired items can still be returned until DynamoDB removes them
+                    if int(item.get("expires_at", now + 1)) <= now:
+                        continue
+
+                    ret_value[item["cache_key"]] = np.frombuffer(
+                        item["embedding"].value, dtype=np.float32
+                    )
+
+                request_items = response.get("UnprocessedKeys")
+    except Exception as error:
+        # The cache is an optimisation, a failure must not fail the ingestion
+        logger.warning(f"Failed to read the embeddings cache: {error}")
+
+    return ret_value
+
+
+def _put_persistent_embeddings(embeddings: Dict[str, np.ndarray]):
+    table = dynamodb.Table(EMBEDDINGS_CACHE_TABLE_NAME)
+    expires_at = int(time.time()) + EMBEDDINGS_CACHE_TTL_DAYS * 24 * 60 * 60
+
+    try:
+        with table.batch_writer(overwrite_by_pkeys=["cache_key"]) as batch:
+            for key, embedding in embeddings.items():
+                batch.put_item(
+                    Item={
+                        "cache_key": key,
+                        "embedding": np.asarray(embedding, dtype=np.float32).tobytes(),
+                        "expires_at": expires_at,
+                    }
+                )
+    except Exception as error:
+        logger.warning(f"Failed to write the embeddings cache: {error}")
@@ -0,0 +1,223 @@
+"""Fusion of the vector and keyword search results of a hybrid search.
+
+Both engines convert their results to Hit records, merged by chunk id, and
+rank the merged hits with a fused score computed over the whole candidate
+set: reciprocal rank fusion ("rrf") or a weighted sum of the min-max
+normalised scores ("linear").
+"""
+
+import os
+import numpy as np
+from genai_core.types import CommonError
+from typing import List, Optional, Tuple
+
+HYBRID_SEARCH_FUSION = os.environ.get("HYBRID_SEARCH_FUSION", "rrf")
+HYBRID_SEARCH_VECTOR_WEIGHT = float(
+    os.environ.get("HYBRID_SEARCH_VECTOR_WEIGHT", "0.5")
+)
+# Rank constant of the reciprocal rank fusion
+RRF_K = 60
+
+
+class Hit(object):
+    """A search result merged across the vector and keyword searches.
+
+    record holds the chunk fields (content, path, metadata, ...) as returned
+    by the engine, the ranks are 1-based positions in each result list.
+    """
+
+    __slots__ = (
+        "chunk_id",
+        "record",
+        "vector_search_score",
+        "keyword_search_score",
+        "vector_rank",
+        "keyword_rank",
+        "fused_score",
+        "score",
+    )
+
+    def __init__(self, chunk_id: str, record: dict):
+        self.chunk_id = chunk_id
+        self.record = record
+        self.vector_search_score = None
+        self.keyword_search_score = None
+        self.vector_rank = None
+        self.keyword_rank = None
+        self.fused_score = None
+        self.score = None
+
+    @property
+    def sources(self) -> List[str]:
+        sources = []
+        if self.keyword_rank is not None:
+            sources.append("keyword_search")
+        if self.vector_rank is not None:
+            sources.append("vector_search")
+
+        return sources
+
+    def to_dict(self) -> dict:
+        return {
+            **self.record,
+            "chunk_id": self.chunk_id,
+            "sources": self.sources,
+            "vector_search_score": self.vector_search_score,
+            "keyword_search_score": self.keyword_search_score,
+            "score": self.score,
+        }
+
+
+def merge(
+    vector_search_results: List[Tuple[dict, float]],
+    keyword_search_results: List[Tuple[dict, float]],
+) -> List[Hit]:
+    """Merge the (record, score) results of both searches, ordered from best
+    to worst, into one hit per chunk id in order of first appearance."""
+    hits = {}
+
+    for rank, (record, score) in enumerate(vector_search_results, start=1):
+        hit = hits.get(record["chunk_id"])
+        if hit is None:
+            hit = hits[record["chunk_id"]] = Hit(record["chunk_id"], record)
+        if hit.vector_rank is None:
+            hit.vector_rank = rank
+            hit.vector_search_score = score
+
+    for rank, (record, score) in enumerate(keyword_search_results, start=1):
+        hit = hits.get(record["chunk_id"])
+        if hit is None:
+            hit = hits[record["chunk_id"]] = Hit(record["chunk_id"], record)
+        if hit.keyword_rank is None:
+            hit.keyword_rank = rank
+            hit.keyword_search_score = score
+
+    return list(hits.values())
+
+
+def fuse(
+    hits: List[Hit],
+    method: Optional[str] = None,
+    vector_higher_is_better: bool = True,
+) -> List[Hit]:
+    """Set the fused score of the hits and return them sorted by it.
+
+    vector_higher_is_better is False for distances (Aurora), keyword scores
+    are always higher for better matches.
+    """
+    method = method or HYBRID_SEARCH_FUSION
+    if len(hits) == 0:
+        return hits
+
+    if method == "rrf":
+        scores = rrf_scores(hits)
+    elif method == "linear":
+        scores = linear_scores(
+            hits, HYBRID_SEARCH_VECTOR_WEIGHT, vector_higher_is_better
+        )
+    else:
+        raise CommonError(f"Unknown fusion method {method}")
+
+    # Stable, ties keep the order of appearance
+    order = np.argsort(-scores, kind="stable")
+    for hit, score in zip(hits, scores.tolist()):
+        hit.fused_score = score
+
+    return [hits[idx] for idx in order]
+
+
+def rrf_scores(hits: List[Hit], k: int = RRF_K) -> np.ndarray:
+    vector_ranks = _to_array([hit.vector_rank for hit in hits])
+    keyword_ranks = _to_array([hit.keyword_rank for hit in hits])
+
+    # Missing ranks are NaN and contribute nothing
+    scores = np.nan_to_num(1.0 / (k + vector_ranks)) + np.nan_to_num(
+        1.0 / (k + keyword_ranks)
+    )
+
+    return scores
+
+
+def linear_scores(
+    hits: List[Hit], vector_weight: float, vector_higher_is_better: bool = True
+) -> np.ndarray:
+    vector_scores = _normalize(
+        _to_array([hit.vector_search_score for hit in hits]), vector_higher_is_better
+    )
+    keyword_scores = _normalize(
+        _to_array([hit.keyword_search_score for hit in hits]), True
+    )
+
+    return vector_weight * vector_scores + (1 - vector_weight) * keyword_scores
+
+
+def select(
+    hits: List[Hit],
+    limit: int,
+    threshold: float,
+    reranked: bool,
+    vector_sign: int = 1,
+    min_vector_score: float = 0.5,
+) -> List[Hit]:
+    """Select the hits returned to the chatbot.
+
+    Reranked hits must score above threshold. When fewer than limit hits are
+    left, the remaining hits with a vector score (times vector_sign) above
+    min_vector_score fill the list, best vector score first.
+    """
+    if reranked:
+        selected = [
+            hit for hit in hits if hit.score is not None and hit.score > threshold
+        ][:limit]
+    else:
+        selected = hits[:limit]
+
+    if len(selected) >= limit or len(selected) == len(hits):
+        return selected
+
+    selected_ids = {hit.chunk_id for hit in selected}
+    remaining = [hit for hit in hits if hit.chunk_id not in selected_ids]
+
+    vector_scores = np.nan_to_num(
+        vector_sign * _to_array([hit.vector_search_score for hit in remaining]),
+        nan=-1.0,
+    )
+    order = np.argsort(-vector_scores, kind="stable")
+    order = order[vector_scores[order] > min_vector_score][: limit - len(selected)]
+
+    return selected + [remaining[idx] for idx in order]
+
+
+def get_source_hits(hits: List[Hit], source: str) -> List[Hit]:
+    """The hits of one search, in the order of its results."""
+    if source == "vector_search":
+        source_hits = [hit for hit in hits if hit.vector_rank is not None]
+        return sorted(source_hits, key=lambda hit: hit.vector_rank)
+    elif source == "keyword_search":
+        source_hits = [hit for hit in hits if hit.keyword_rank is not None]
+        return sorted(source_hits, key=lambda hit: hit.keyword_rank)
+
+    raise CommonError("Unknown source")
+
+
+def _to_array(values: list) -> np.ndarray:
+    return np.array(
+        [np.nan if value is None else value for value in values], dtype=np.float64
+    )
+
+
+def _normalize(values: np.ndarray, higher_is_better: bool) -> np.ndarray:
+    present = ~np.isnan(values)
+    if not present.any():
+        return np.zeros(len(values))
+
+    low = values[present].min()
+    high = values[present].max()
+    if high == low:
+        normalized = np.ones(len(values))
+    elif higher_is_better:
+        normalized = (values - low) / (high - low)
+    else:
+        normalized = (high - values) / (high - low)
+
+    return np.where(present, normalized, 0.0)
@@ -0,0 +1,176 @@
+"""In-process CPU inference of the models served by the SageMaker RAG models
+endpoint (lib/rag-engines/sagemaker-rag-models/model/inference.py).
+
+Each model is an ONNX export in LOCAL_MODELS_PATH/<model name>/ with its
+tokenizer.json, e.g. LOCAL_MODELS_PATH/multilingual-e5-large/model.onnx.
+An int8 model_quantized.onnx (onnxruntime.quantization.quantize_dynamic) is
+used when present. onnxruntime and tokenizers are optional dependencies, they
+are only imported when a local model is used.
+"""
+
+import os
+import threading
+import numpy as np
+from aws_lambda_powertools import Logger
+from genai_core.types import CommonError
+from typing import List, Optional
+
+LOCAL_MODELS_PATH = os.environ.get("LOCAL_MODELS_PATH")
+LOCAL_MODELS_BATCH_SIZE = int(os.environ.get("LOCAL_MODELS_BATCH_SIZE", "32"))
+LOCAL_MODELS_THREADS = int(os.environ.get("LOCAL_MODELS_THREADS", "0"))
+MAX_SEQUENCE_LENGTH = 512
+MODEL_FILES = ["model_quantized.onnx", "model.onnx"]
+PAD_TOKENS = ["[PAD]", "<pad>"]
+
+logger = Logger()
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return bool(LOCAL_MODELS_PATH)
+
+
+def embed(model_name: str, input: List[str]) -> np.ndarray:
+    """Normalised mean pooled embeddings, as float32 (len(input), dimensions)."""
+    session, tokenizer = _get_model(model_name)
+
+    # Same prefix as the SageMaker endpoint, the embeddings must be identical
+    if _get_model_id(model_name) == "multilingual-e5-large":
+        input = ["query: " + value for value in input]
+
+    ret_value = []
+    for i in range(0, len(input), LOCAL_MODELS_BATCH_SIZE):
+        batch = tokenizer.encode_batch(input[i : i + LOCAL_MODELS_BATCH_SIZE])
+        features = _get_features(session, tokenizer, batch)
+        token_embeddings = session.run(None, features)[0]
+
+        embeddings = mean_pooling(token_embeddings, features["attention_mask"])
+        ret_value.append(normalize(embeddings))
+
+    if len(ret_value) == 0:
+        return np.empty((0, 0), dtype=np.float32)
+
+    return np.concatenate(ret_value)
+
+
+def rank(model_name: str, query: str, passages: List[str]) -> List[float]:
+    session, tokenizer = _get_model(model_name)
+
+    ret_value = []
+    for i in range(0, len(passages), LOCAL_MODELS_BATCH_SIZE):
+        pairs = [
+            (query, passage) for passage in passages[i : i + LOCAL_MODELS_BATCH_SIZE]
+        ]
+        features = _get_features(session, tokenizer, tokenizer.encode_batch(pairs))
+        logits = session.run(None, features)[0]
+
+        ret_value.extend(logits.reshape(len(pairs), -1)[:, -1].tolist())
+
+    return ret_value
+
+
+def mean_pooling(token_embeddings: np.ndarray, attention_mask: np.ndarray):
+    mask = attention_mask[..., np.newaxis].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+
+    return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    return (embeddings / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+
+def _get_features(session, tokenizer, encodings) -> dict:
+    length = max(len(encoding.ids) for encoding in encodings)
+    pad_id = _get_pad_id(tokenizer)
+
+    input_ids = np.full((len(encodings), length), pad_id, dtype=np.int64)
+    attention_mask = np.zeros((len(encodings), length), dtype=np.int64)
+    token_type_ids = np.zeros((len(encodings), length), dtype=np.int64)
+    for idx, encoding in enumerate(encodings):
+        size = len(encoding.ids)
+        input_ids[idx, :size] = encoding.ids
+        attention_mask[idx, :size] = 1
+        token_type_ids[idx, :size] = encoding.type_ids
+
+    features = {
+        "input_ids": input_ids,
+        "attention_mask": attention_mask,
+        "token_type_ids": token_type_ids,
+    }
+    input_names = [value.name for value in session.get_inputs()]
+
+    return {name: features[name] for name in input_names if name in features}
+
+
+def _get_pad_id(tokenizer) -> int:
+    for token in PAD_TOKENS:
+        token_id = tokenizer.token_to_id(token)
+        if token_id is not None:
+            return token_id
+
+    return 0
+
+
+def _get_model_id(model_name: str) -> str:
+    return model_name.split("/")[-1]
+
+
+def _get_model(model_name: str):
+    model_id = _get_model_id(model_name)
+
+    with _models_lock:
+        model = _models.get(model_id)
+        if model is None:
+            model = _load_model(model_id)
+            _models[model_id] = model
+
+        return model
+
+
+def _load_model(model_id: str):
+    if not LOCAL_MODELS_PATH:
+        raise CommonError("Local models are not enabled. Please set LOCAL_MODELS_PATH.")
+
+    try:
+        import onnxruntime
+        from tokenizers import Tokenizer
+    except ImportError:
+        raise CommonError(
+            "Local models require the onnxruntime and tokenizers packages"
+        )
+
+    model_dir = os.path.join(LOCAL_MODELS_PATH, model_id)
+    model_path = _get_model_path(model_dir)
+    if model_path is None:
+        raise CommonError(f"Local model {model_id} not found")
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if LOCAL_MODELS_THREADS > 0:
+        options.intra_op_num_threads = LOCAL_MODELS_THREADS
+
+    session = onnxruntime.InferenceSession(
+        model_path, sess_options=options, providers=["CPUExecutionProvider"]
+    )
+
+    tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+    tokenizer.no_padding()
+    tokenizer.enable_truncation(max_length=MAX_SEQUENCE_LENGTH)
+
+    logger.info("Local model loaded", model_id=model_id, model_path=model_path)
+
+    return session, tokenizer
+
+
+def _get_model_path(model_dir: str) -> Optional[str]:
+    for file_name in MODEL_FILES:
+        path = os.path.join(model_dir, file_name)
+        if os.path.exists(path):
+            return path
+
+    return None
@@ -0,0 +1,149 @@
+"""_bulk requests for the chunks of a document.
+
+The actions are split in batches bounded by count and by size and sent by a
+few threads (multiprocessing pools are not available in Lambda). Items
+rejected with a retryable status are sent again with a backoff, the other
+failures are reported to the caller.
+"""
+
+import os
+import time
+import random
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from aws_lambda_powertools import Logger
+from opensearchpy.exceptions import ConnectionError as OpenSearchConnectionError
+from opensearchpy.exceptions import TransportError
+from typing import Iterable, List, Tuple
+
+OPEN_SEARCH_BULK_SIZE = int(os.environ.get("OPEN_SEARCH_BULK_SIZE", "500"))
+OPEN_SEARCH_BULK_MAX_BYTES = int(
+    os.environ.get("OPEN_SEARCH_BULK_MAX_BYTES", str(10 * 1024 * 1024))
+)
+OPEN_SEARCH_BULK_WORKERS = int(os.environ.get("OPEN_SEARCH_BULK_WORKERS", "4"))
+OPEN_SEARCH_BULK_MAX_RETRIES = int(os.environ.get("OPEN_SEARCH_BULK_MAX_RETRIES", "5"))
+OPEN_SEARCH_BULK_BACKOFF = float(os.environ.get("OPEN_SEARCH_BULK_BACKOFF", "0.5"))
+RETRYABLE_STATUS = [429, 502, 503, 504]
+
+logger = Logger()
+
+
+class BulkResult(object):
+    def __init__(self):
+        self.succeeded = 0
+        self.failed = 0
+        # Deletes of documents that do not exist
+        self.not_found = 0
+        self.errors = []
+
+    def add(self, other: "BulkResult"):
+        self.succeeded += other.succeeded
+        self.failed += other.failed
+        self.not_found += other.not_found
+        self.errors.extend(other.errors[: 10 - len(self.errors)])
+
+
+def bulk(client, index_name: str, actions: Iterable[Tuple[dict, dict]]) -> BulkResult:
+    """Send (action, source) pairs, source is None for deletes.
+
+    Returns the number of items that succeeded and failed after retries.
+    """
+    result = BulkResult()
+    serializer = client.transport.serializer
+    batches = _get_batches(serializer, actions)
+
+    # At most two batches per worker are serialized ahead of the requests
+    with ThreadPoolExecutor(max_workers=OPEN_SEARCH_BULK_WORKERS) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(_send_batch, client, index_name, batch))
+            if len(pending) >= 2 * OPEN_SEARCH_BULK_WORKERS:
+                result.add(pending.popleft().result())
+
+        while pending:
+            result.add(pending.popleft().result())
+
+    if result.failed > 0:
+        logger.error(
+            "Bulk items failed",
+            index_name=index_name,
+            succeeded=result.succeeded,
+            failed=result.failed,
+            errors=result.errors,
+        )
+
+    return result
+
+
+def _get_batches(serializer, actions: Iterable[Tuple[dict, dict]]):
+    batch = []
+    batch_bytes = 0
+
+    for action, source in actions:
+        lines = serializer.dumps(action)
+        if source is not None:
+            lines += "\n" + serializer.dumps(source)
+        size = len(lines.encode("utf-8")) + 1
+
+        if batch and (
+            len(batch) >= OPEN_SEARCH_BULK_SIZE
+            or batch_bytes + size > OPEN_SEARCH_BULK_MAX_BYTES
+        ):
+            yield batch
+            batch = []
+            batch_bytes = 0
+
+        batch.append(lines)
+        batch_bytes += size
+
+    if batch:
+        yield batch
+
+
+def _send_batch(client, index_name: str, batch: List[str]) -> BulkResult:
+    result = BulkResult()
+
+    for attempt in range(OPEN_SEARCH_BULK_MAX_RETRIES + 1):
+        if attempt > 0:
+            time.sleep(_get_backoff(attempt))
+
+        try:
+            response = client.bulk(index=index_name, body="\n".join(batch) + "\n")
+        except TransportError as error:
+            status = getattr(error, "status_code", None)
+            retryable = (
+                isinstance(error, OpenSearchConnectionError)
+                or status in RETRYABLE_STATUS
+            )
+            if retryable and attempt < OPEN_SEARCH_BULK_MAX_RETRIES:
+                continue
+
+            raise
+
+        retry = []
+        for lines, item in zip(batch, response["items"]):
+            operation = next(iter(item.values()))
+            status = operation.get("status", 500)
+
+            if status < 300:
+                result.succeeded += 1
+            elif status == 404 and "delete" in item:
+                result.not_found += 1
+            elif status in RETRYABLE_STATUS and attempt < OPEN_SEARCH_BULK_MAX_RETRIES:
+                retry.append(lines)
+            else:
+                result.failed += 1
+                if len(result.errors) < 10:
+                    result.errors.append(operation.get("error"))
+
+        if not retry:
+            break
+
+        batch = retry
+
+    return result
+
+
+def _get_backoff(attempt: int) -> float:
+    # Full jitter, the workers must not retry in lockstep
+    return random.uniform(0, OPEN_SEARCH_BULK_BACKOFF * 2 ** (attempt - 1))  # nosec
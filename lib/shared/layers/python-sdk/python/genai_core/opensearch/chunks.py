@@ -1,5 +1,12 @@
-from typing import List, Optional
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+from .bulk import bulk
 from .client import get_open_search_client
+from genai_core.types import CommonError
+from .utils import LEGACY_BYTE_VECTOR_SCALE, to_byte_vectors
+
+SEARCH_PAGE_SIZE = 1000
 
 
 def add_chunks_open_search(
@@ -11,64 +18,156 @@ def add_chunks_open_search(
     path: Optional[str],
     title: Optional[str],
     chunk_ids: List[str],
-    chunk_embeddings: List[int],
+    chunk_embeddings: Union[np.ndarray, List[List[float]]],
     chunks: List[str],
     chunk_complements: List[str],
     replace: bool,
+    chunk_hashes: Optional[List[str]] = None,
+    chunk_languages: Optional[List[str]] = None,
+    vector_quantization: Optional[str] = None,
+    byte_vector_scale: float = LEGACY_BYTE_VECTOR_SCALE,
 ):
     index_name = workspace_id.replace("-", "")
     complements_len = len(chunk_complements) if chunk_complements else 0
     removed_vectors = 0
 
+    index_embeddings = chunk_embeddings
+    if vector_quantization == "byte":
+        index_embeddings = to_byte_vectors(chunk_embeddings, byte_vector_scale)
+
     client = get_open_search_client()
 
     if replace:
         removed_vectors = clean_chunks_open_search(workspace_id, document_id)
 
-    for idx in range(len(chunk_ids)):
-        chunk_id = chunk_ids[idx]
-        content = chunks[idx]
-        content_complement = chunk_complements[idx] if idx < complements_len else None
+    created_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+    def get_actions():
+        for idx in range(len(chunk_ids)):
+            chunk_id = chunk_ids[idx]
+            content = chunks[idx]
+            content_complement = (
+                chunk_complements[idx] if idx < complements_len else None
+            )
+
+            add_body = {
+                "chunk_id": chunk_id,
+                "workspace_id": workspace_id,
+                "document_id": document_id,
+                "document_sub_id": document_sub_id,
+                "document_type": document_type,
+                "document_sub_type": document_sub_type,
+                "path": path,
+                "language": chunk_languages[idx] if chunk_languages else None,
+                "title": title,
+                "content": content,
+                "content_complement": content_complement,
+                "content_embeddings": index_embeddings[idx],
+                "created_at": created_at,
+            }
+
+            if vector_quantization == "byte":
+                add_body["content_embeddings_full"] = chunk_embeddings[idx]
+
+            if chunk_hashes:
+                add_body["metadata"] = {"content_hash": chunk_hashes[idx]}
+
+            # Serverless vector collections generate the document ids
+            yield {"index": {}}, add_body
+
+    result = bulk(client, index_name, get_actions())
+
+    return {
+        "removed_vectors": removed_vectors,
+        "added_vectors": result.succeeded,
+        "failed_vectors": result.failed,
+    }
+
+
+def clean_chunks_open_search(workspace_id: str, document_id: str) -> int:
+    """Delete every chunk of the document, returns the number deleted."""
+    index_name = workspace_id.replace("-", "")
+    client = get_open_search_client()
+
+    # All the pages are read before deleting, the deletes would otherwise
+    # race with the search_after cursor.
+    ids = [
+        hit["_id"]
+        for hit in _search_document_chunks(
+            client, index_name, workspace_id, document_id, source=False
+        )
+    ]
+
+    return _delete_ids(client, index_name, ids)
 
-        add_body = {
-            "chunk_id": chunk_id,
-            "workspace_id": workspace_id,
-            "document_id": document_id,
-            "document_sub_id": document_sub_id,
-            "document_type": document_type,
-            "document_sub_type": document_sub_type,
-            "path": path,
-            "title": title,
-            "content": content,
-            "content_complement": content_complement,
-            "content_embeddings": chunk_embeddings[idx],
-        }
 
-        client.index(index=index_name, body=add_body)
+def get_chunk_hashes_open_search(workspace_id: str, document_id: str) -> Dict[str, str]:
+    index_name = workspace_id.replace("-", "")
+    client = get_open_search_client()
+
+    hits = _search_document_chunks(
+        client,
+        index_name,
+        workspace_id,
+        document_id,
+        source=["metadata.content_hash"],
+    )
 
-    return {"removed_vectors": removed_vectors, "added_vectors": len(chunk_ids)}
+    return {
+        hit["_id"]: (hit["_source"].get("metadata") or {}).get("content_hash")
+        for hit in hits
+    }
 
 
-def clean_chunks_open_search(workspace_id: str, document_id: str):
+def delete_chunks_open_search(workspace_id: str, ids: List[str]) -> int:
     index_name = workspace_id.replace("-", "")
     client = get_open_search_client()
 
+    return _delete_ids(client, index_name, ids)
+
+
+def _delete_ids(client, index_name: str, ids: List[str]) -> int:
+    if not ids:
+        return 0
+
+    result = bulk(client, index_name, (({"delete": {"_id": id}}, None) for id in ids))
+    if result.failed > 0:
+        raise CommonError(
+            f"{result.failed} of {len(ids)} chunks of {index_name} were not deleted"
+        )
+
+    return result.succeeded
+
+
+def _search_document_chunks(
+    client,
+    index_name: str,
+    workspace_id: str,
+    document_id: str,
+    source: Union[List[str], bool],
+):
+    # Serverless collections do not support scroll, pages are read with
+    # search_after on the chunk_id keyword instead.
     query = {
+        "size": SEARCH_PAGE_SIZE,
         "query": {
             "bool": {
-                "must": [
+                "filter": [
                     {"term": {"workspace_id": workspace_id}},
                     {"term": {"document_id": document_id}},
                 ]
             }
-        }
+        },
+        "sort": [{"chunk_id": "asc"}],
+        "_source": source,
     }
 
-    response = client.search(index=index_name, body=query)
-    docs = response["hits"]["hits"]
-    removed_vectors = len(docs)
+    while True:
+        response = client.search(index=index_name, body=query)
+        hits = response["hits"]["hits"]
+        yield from hits
 
-    for doc in docs:
-        client.delete(index=index_name, id=doc["_id"], ignore=[400, 404])
+        if len(hits) < SEARCH_PAGE_SIZE:
+            break
 
-    return removed_vectors
+        query["search_after"] = hits[-1]["sort"]
@@ -1,36 +1,52 @@
 import os
 import boto3
+import threading
 import urllib.parse
-from opensearchpy import OpenSearch, RequestsHttpConnection
-from requests_aws4auth import AWS4Auth
+from opensearchpy import AWSV4SignerAuth, OpenSearch, RequestsHttpConnection
 
 
 OPEN_SEARCH_COLLECTION_ENDPOINT = os.environ.get("OPEN_SEARCH_COLLECTION_ENDPOINT")
+# HTTP connections kept open to the collection, shared by the threads
+OPEN_SEARCH_POOL_SIZE = int(os.environ.get("OPEN_SEARCH_POOL_SIZE", "10"))
 
 port = 443
 timeout = 300
 
+_clients = {}
+_clients_lock = threading.Lock()
+
 
 def get_open_search_client():
+    """The client of the collection, created once per process.
+
+    Requests are signed with the credentials of the boto3 session, botocore
+    refreshes them when they expire (Batch and ECS task roles).
+    """
+    endpoint = OPEN_SEARCH_COLLECTION_ENDPOINT
+
+    with _clients_lock:
+        opensearch = _clients.get(endpoint)
+        if opensearch is None:
+            opensearch = _create_open_search_client(endpoint)
+            _clients[endpoint] = opensearch
+
+        return opensearch
+
+
+def _create_open_search_client(endpoint: str):
     service = "aoss"
     session = boto3.Session()
-    credentials = session.get_credentials()
-    host = urllib.parse.urlparse(OPEN_SEARCH_COLLECTION_ENDPOINT).hostname
-
-    awsauth = AWS4Auth(
-        credentials.access_key,
-        credentials.secret_key,
-        session.region_name,
-        service,
-        session_token=credentials.token,
-    )
+    url = urllib.parse.urlparse(endpoint)
+
+    awsauth = AWSV4SignerAuth(session.get_credentials(), session.region_name, service)
 
     opensearch = OpenSearch(
-        hosts=[{"host": host, "port": port}],
+        hosts=[{"host": url.hostname, "port": url.port or port}],
         http_auth=awsauth,
-        use_ssl=True,
+        use_ssl=url.scheme != "http",
         verify_certs=True,
         connection_class=RequestsHttpConnection,
+        pool_maxsize=OPEN_SEARCH_POOL_SIZE,
         timeout=timeout,
     )
 
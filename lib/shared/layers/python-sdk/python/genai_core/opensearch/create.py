@@ -3,11 +3,20 @@ from .client import get_open_search_client
 
 logger = Logger()
 
+# k-NN engine used for each vector quantization. fp16 relies on the faiss
+# scalar quantizer, byte vectors are only supported by lucene.
+KNN_ENGINES = {"none": "nmslib", "fp16": "faiss", "byte": "lucene"}
+
+
+def get_knn_engine(vector_quantization: str) -> str:
+    return KNN_ENGINES[vector_quantization or "none"]
+
 
 def create_workspace_index(workspace: dict):
     workspace_id = workspace["workspace_id"]
     index_name = workspace_id.replace("-", "")
     embeddings_model_dimensions = workspace["embeddings_model_dimensions"]
+    vector_quantization = workspace.get("vector_quantization", "none")
 
     client = get_open_search_client()
 
@@ -21,23 +30,20 @@ def create_workspace_index(workspace: dict):
         },
         "mappings": {
             "properties": {
-                "content_embeddings": {
-                    "type": "knn_vector",
-                    "dimension": int(embeddings_model_dimensions),
-                    "method": {
-                        "name": "hnsw",
-                        "space_type": "l2",
-                        "engine": "nmslib",
-                        "parameters": {"ef_construction": 512, "m": 16},
-                    },
-                },
+                "content_embeddings": _get_knn_vector_mapping(
+                    int(embeddings_model_dimensions), vector_quantization
+                ),
                 "chunk_id": {"type": "keyword"},
                 "workspace_id": {"type": "keyword"},
                 "document_id": {"type": "keyword"},
                 "document_sub_id": {"type": "keyword"},
                 "document_type": {"type": "keyword"},
                 "document_sub_type": {"type": "keyword"},
-                "path": {"type": "text"},
+                "path": {
+                    "type": "text",
+                    # Exact path prefixes of the search filters
+                    "fields": {"keyword": {"type": "keyword", "ignore_above": 2048}},
+                },
                 "language": {"type": "keyword"},
                 "title": {"type": "text"},
                 "content": {"type": "text"},
@@ -51,6 +57,36 @@ def create_workspace_index(workspace: dict):
         },
     }
 
+    if vector_quantization == "byte":
+        # Full precision vectors are kept in the source, without being
+        # indexed, to rescore the shortlist of byte vector hits.
+        index_body["mappings"]["properties"]["content_embeddings_full"] = {
+            "type": "float",
+            "index": False,
+            "doc_values": False,
+        }
+
     response = client.indices.create(index_name, body=index_body)
 
     logger.info("Response for create_workspace_index", response=response)
+
+
+def _get_knn_vector_mapping(dimensions: int, vector_quantization: str):
+    parameters = {"ef_construction": 512, "m": 16}
+    mapping = {
+        "type": "knn_vector",
+        "dimension": dimensions,
+        "method": {
+            "name": "hnsw",
+            "space_type": "l2",
+            "engine": get_knn_engine(vector_quantization),
+            "parameters": parameters,
+        },
+    }
+
+    if vector_quantization == "fp16":
+        parameters["encoder"] = {"name": "sq", "parameters": {"type": "fp16"}}
+    elif vector_quantization == "byte":
+        mapping["data_type"] = "byte"
+
+    return mapping
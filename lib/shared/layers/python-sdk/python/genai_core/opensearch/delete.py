@@ -6,6 +6,7 @@ from .client import get_open_search_client
 import genai_core.utils.delete_files_with_prefix
 import genai_core.utils.delete_files_with_object_key
 import genai_core.types
+import genai_core.opensearch.chunks
 from datetime import datetime
 
 
@@ -79,7 +80,6 @@ def delete_workspace(workspace: dict):
 
 
 def delete_open_search_document(workspace_id: str, document: dict):
-    index_name = workspace_id.replace("-", "")
     document_id = document["document_id"]
     document_vectors = document["vectors"]
     documents_diff = 1
@@ -98,7 +98,14 @@ def delete_open_search_document(workspace_id: str, document: dict):
         PROCESSING_BUCKET_NAME, processing_bucket_key
     )
 
-    deleteOpenSearchDocument(document_id, index_name)
+    removed_vectors = deleteOpenSearchDocument(workspace_id, document_id)
+    if removed_vectors != document_vectors:
+        logger.warning(
+            "Removed vectors differ from the document vectors",
+            document_id=document_id,
+            removed_vectors=removed_vectors,
+            document_vectors=document_vectors,
+        )
 
     documents_table = dynamodb.Table(DOCUMENTS_TABLE_NAME)
     workspaces_table = dynamodb.Table(WORKSPACES_TABLE_NAME)
@@ -131,24 +138,15 @@ def delete_open_search_document(workspace_id: str, document: dict):
         logger.error(f"An error occurred: {error}")
 
 
-def deleteOpenSearchDocument(document_id, index_name):
+def deleteOpenSearchDocument(workspace_id: str, document_id: str) -> int:
+    index_name = workspace_id.replace("-", "")
     client = get_open_search_client()
-    if client.indices.exists(index_name):
-        search_query = {"query": {"match": {"document_id": document_id}}}
-        from_ = 0
-        batch_size = 100
-        while True:
-            search_response = client.search(
-                index=index_name, body=search_query, from_=from_, size=batch_size
-            )
-
-            hits = search_response["hits"]["hits"]
-            if not hits:
-                break
+    if not client.indices.exists(index_name):
+        return 0
 
-            for hit in hits:
-                client.delete(index=index_name, id=hit["_id"])
-
-            from_ += batch_size
+    removed_vectors = genai_core.opensearch.chunks.clean_chunks_open_search(
+        workspace_id, document_id
+    )
+    logger.info(f"Record {document_id} deleted.", removed_vectors=removed_vectors)
 
-        logger.info(f"Record {document_id} deleted.")
+    return removed_vectors
@@ -1,12 +1,32 @@
+import time
 import genai_core.embeddings
 import genai_core.cross_encoder
-from typing import List
+import genai_core.fusion
+from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from .client import get_open_search_client
+from .create import get_knn_engine
+from .utils import (
+    LEGACY_BYTE_VECTOR_SCALE,
+    get_byte_vector_scale,
+    get_filter_clauses,
+    l2_scores,
+    to_byte_vectors,
+)
 from aws_lambda_powertools import Logger
-from genai_core.types import CommonError, Task
+from genai_core.types import CommonError, SearchFilter, Task
+from genai_core.utils.timing import timed
 
 logger = Logger()
 
+# Quantized k-NN searches return a larger shortlist, rescored with the full
+# precision vectors stored in the source of each hit.
+QUANTIZATION_OVERSAMPLE = {"fp16": 2, "byte": 4}
+FULL_PRECISION_FIELDS = {
+    "fp16": "content_embeddings",
+    "byte": "content_embeddings_full",
+}
+
 
 def query_workspace_open_search(
     workspace_id: str,
@@ -15,6 +35,7 @@ def query_workspace_open_search(
     limit: int,
     full_response: bool,
     threshold: float = 0.0,
+    filter: Optional[SearchFilter] = None,
 ):
     index_name = workspace_id.replace("-", "")
 
@@ -24,9 +45,17 @@ def query_workspace_open_search(
     cross_encoder_model_name = workspace["cross_encoder_model_name"]
     hybrid_search = workspace["hybrid_search"]
     languages = workspace["languages"]
+    vector_quantization = workspace.get("vector_quantization")
     vector_search_limit = 25
     keyword_search_limit = 25
 
+    # Indexes created before path.keyword was mapped would match nothing
+    path_prefix = filter.path_prefix if filter is not None else None
+    if path_prefix is not None and not workspace.get("path_keyword"):
+        raise CommonError("Path prefix filters are not supported for this workspace")
+
+    filter_clauses = get_filter_clauses(filter)
+
     vector_search_records = []
     keyword_search_records = []
 
@@ -37,59 +66,61 @@ def query_workspace_open_search(
     if selected_model is None:
         raise CommonError("Embeddings model not found")
 
-    query_embeddings = genai_core.embeddings.generate_embeddings(
-        selected_model, [query], Task.RETRIEVE
-    )[0]
-
-    items = []
-
     client = get_open_search_client()
-    vector_search_records = vector_query(
-        client, index_name, query_embeddings, vector_search_limit
-    )
-    vector_search_records = _convert_records("vector_search", vector_search_records)
-    items.extend(vector_search_records)
 
-    if hybrid_search:
-        keyword_search_records = keyword_query(
-            client, index_name, query, keyword_search_limit
+    def vector_search_stage():
+        query_embeddings = timed(
+            timings,
+            "embeddings",
+            genai_core.embeddings.generate_embeddings,
+            selected_model,
+            [query],
+            Task.RETRIEVE,
+        )[0]
+
+        records = timed(
+            timings,
+            "vector_search",
+            vector_query,
+            client,
+            index_name,
+            query_embeddings,
+            vector_search_limit,
+            vector_quantization=vector_quantization,
+            filter_clauses=filter_clauses,
+            byte_vector_scale=get_byte_vector_scale(workspace),
         )
 
-        keyword_search_records = _convert_records(
-            "keyword_search", keyword_search_records
+        return _convert_records(records)
+
+    def keyword_search_stage():
+        records = timed(
+            timings,
+            "keyword_search",
+            keyword_query,
+            client,
+            index_name,
+            query,
+            keyword_search_limit,
+            filter_clauses=filter_clauses,
         )
-        items.extend(keyword_search_records)
-
-    unique_items = dict({})
-    for item in items:
-        chunk_id = item["chunk_id"]
-
-        if chunk_id not in unique_items:
-            unique_items[chunk_id] = item
-        else:
-            current = unique_items[chunk_id]
-            for source in item["sources"]:
-                if source not in current["sources"]:
-                    current["sources"].append(source)
-            current["sources"] = sorted(current["sources"])
-
-            for source in current["sources"]:
-                if source not in item["sources"]:
-                    item["sources"].append(source)
-            item["sources"] = sorted(item["sources"])
-
-            if current["vector_search_score"] is None:
-                current["vector_search_score"] = item["vector_search_score"]
-            if current["keyword_search_score"] is None:
-                current["keyword_search_score"] = item["keyword_search_score"]
-
-            if item["vector_search_score"] is None:
-                item["vector_search_score"] = current["vector_search_score"]
-            if item["keyword_search_score"] is None:
-                item["keyword_search_score"] = current["keyword_search_score"]
-
-    unique_items = list(unique_items.values())
 
+        return _convert_records(records)
+
+    # The keyword search does not need the query embeddings, it runs
+    # concurrently with the embeddings and the vector search.
+    timings = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        vector_search_future = executor.submit(vector_search_stage)
+        if hybrid_search:
+            keyword_search_records = keyword_search_stage()
+        vector_search_records = vector_search_future.result()
+
+    hits = genai_core.fusion.merge(vector_search_records, keyword_search_records)
+    hits = genai_core.fusion.fuse(hits)
+
+    reranked = False
     if cross_encoder_model_name is not None:
         cross_encoder_model = genai_core.cross_encoder.get_cross_encoder_model(
             cross_encoder_model_provider, cross_encoder_model_name
@@ -98,66 +129,44 @@ def query_workspace_open_search(
         if cross_encoder_model is None:
             raise genai_core.types.CommonError("Cross encoder model not found")
 
-        score_dict = dict({})
-        if len(unique_items) > 0:
-            passages = [record["content"] for record in unique_items]
-            passage_scores = genai_core.cross_encoder.rank_passages(
-                cross_encoder_model, query, passages
-            )
-
-            for i in range(len(unique_items)):
-                score = passage_scores[i]
-                unique_items[i]["score"] = score
-                score_dict[unique_items[i]["chunk_id"]] = score
-        unique_items = sorted(unique_items, key=lambda x: x["score"], reverse=True)
+        hits, reranked = timed(
+            timings,
+            "rerank",
+            genai_core.cross_encoder.rerank_items,
+            cross_encoder_model,
+            query,
+            hits,
+            top_n=workspace.get("rerank_top_n"),
+            skip_gap=workspace.get("rerank_skip_gap"),
+        )
 
-        for record in vector_search_records:
-            record["score"] = score_dict[record["chunk_id"]]
-        for record in keyword_search_records:
-            record["score"] = score_dict[record["chunk_id"]]
+    timings["total"] = round((time.perf_counter() - start) * 1000, 2)
+    logger.info("Retrieval timings", timings=timings)
 
     if full_response:
-        unique_items = unique_items[:limit]
         ret_value = {
             "engine": "opensearch",
             "supported_languages": languages,
-            "items": unique_items,
+            "items": [hit.to_dict() for hit in hits[:limit]],
             "vector_search_metric": "l2",
-            "vector_search_items": vector_search_records,
-            "keyword_search_items": keyword_search_records,
+            "vector_search_items": [
+                hit.to_dict()
+                for hit in genai_core.fusion.get_source_hits(hits, "vector_search")
+            ],
+            "keyword_search_items": [
+                hit.to_dict()
+                for hit in genai_core.fusion.get_source_hits(hits, "keyword_search")
+            ],
+            "timings": timings,
         }
     else:
-        if cross_encoder_model_name is not None:
-            ret_items = list(
-                filter(lambda val: val["score"] > threshold, unique_items)
-            )[:limit]
-        else:
-            ret_items = unique_items[:limit]
-
-        if len(ret_items) < limit and len(unique_items) > len(ret_items):
-            unique_items = list(
-                filter(
-                    lambda record: record["chunk_id"]
-                    not in [r["chunk_id"] for r in ret_items],
-                    unique_items,
-                )
-            )
-            unique_items = sorted(
-                unique_items, key=lambda x: x["vector_search_score"] or -1, reverse=True
-            )
-            ret_items = ret_items + (
-                list(
-                    filter(
-                        lambda val: (val["vector_search_score"] or -1) > 0.5,
-                        unique_items,
-                    )
-                )[: (limit - len(ret_items))]
-            )
+        ret_items = genai_core.fusion.select(hits, limit, threshold, reranked)
 
         ret_value = {
             "engine": "opensearch",
             "supported_languages": languages,
-            "items": ret_items,
+            "items": [hit.to_dict() for hit in ret_items],
+            "timings": timings,
         }
 
     logger.info(ret_value)
@@ -165,12 +174,11 @@ def query_workspace_open_search(
     return ret_value
 
 
-def _convert_records(source: str, records: List[dict]):
+def _convert_records(records: List[dict]) -> List[Tuple[dict, float]]:
     converted_records = []
 
     for record in records:
         current = record["_source"]
-        current_score = record["_score"]
 
         converted = {
             "chunk_id": current.get("chunk_id"),
@@ -185,26 +193,38 @@ def _convert_records(source: str, records: List[dict]):
             "content": current.get("content"),
             "content_complement": current.get("content_complement"),
             "metadata": current.get("metadata"),
-            "sources": [source],
-            "score": None,
         }
 
-        if source == "vector_search":
-            converted["vector_search_score"] = current_score
-            converted["keyword_search_score"] = None
-        elif source == "keyword_search":
-            converted["keyword_search_score"] = current_score
-            converted["vector_search_score"] = None
-        else:
-            raise CommonError("Unknown source")
-
-        converted_records.append(converted)
+        converted_records.append((converted, record["_score"]))
 
     return converted_records
 
 
-def vector_query(client, index_name: str, vector: List[float], size: int = 25):
-    query = {"query": {"knn": {"content_embeddings": {"vector": vector, "k": 5}}}}
+def vector_query(
+    client,
+    index_name: str,
+    vector: List[float],
+    size: int = 25,
+    vector_quantization: Optional[str] = None,
+    filter_clauses: Optional[List[dict]] = None,
+    byte_vector_scale: float = LEGACY_BYTE_VECTOR_SCALE,
+):
+    if vector_quantization in QUANTIZATION_OVERSAMPLE:
+        return _quantized_vector_query(
+            client,
+            index_name,
+            vector,
+            size,
+            vector_quantization,
+            filter_clauses,
+            byte_vector_scale,
+        )
+
+    query = {
+        "query": _knn_query(
+            {"vector": vector, "k": 5}, vector_quantization, filter_clauses
+        )
+    }
 
     response = client.search(index=index_name, body=query, size=size)
 
@@ -214,8 +234,80 @@ def vector_query(client, index_name: str, vector: List[float], size: int = 25):
     return ret_value
 
 
-def keyword_query(client, index_name: str, text: str, size: int = 25):
+def _quantized_vector_query(
+    client,
+    index_name: str,
+    vector: List[float],
+    size: int,
+    vector_quantization: str,
+    filter_clauses: Optional[List[dict]] = None,
+    byte_vector_scale: float = LEGACY_BYTE_VECTOR_SCALE,
+):
+    shortlist_size = size * QUANTIZATION_OVERSAMPLE[vector_quantization]
+    full_precision_field = FULL_PRECISION_FIELDS[vector_quantization]
+
+    query_vector = vector
+    if vector_quantization == "byte":
+        query_vector = to_byte_vectors([vector], byte_vector_scale)[0]
+
+    query = {
+        "query": _knn_query(
+            {"vector": query_vector, "k": shortlist_size},
+            vector_quantization,
+            filter_clauses,
+        )
+    }
+
+    response = client.search(index=index_name, body=query, size=shortlist_size)
+    hits = response["hits"]["hits"] or []
+    hits = [hit for hit in hits if hit["_source"].get(full_precision_field)]
+    if len(hits) == 0:
+        return []
+
+    scores = l2_scores(vector, [hit["_source"][full_precision_field] for hit in hits])
+    for hit, score in zip(hits, scores):
+        hit["_score"] = float(score)
+
+    return sorted(hits, key=lambda hit: hit["_score"], reverse=True)[:size]
+
+
+def _knn_query(
+    knn: dict, vector_quantization: Optional[str], filter_clauses: Optional[List[dict]]
+) -> dict:
+    """The lucene and faiss engines filter during the k-NN search, nmslib
+    hits are filtered after the search and can be fewer than k."""
+    if not filter_clauses:
+        return {"knn": {"content_embeddings": knn}}
+
+    if get_knn_engine(vector_quantization) in ["lucene", "faiss"]:
+        knn = {**knn, "filter": {"bool": {"filter": filter_clauses}}}
+        return {"knn": {"content_embeddings": knn}}
+
+    return {
+        "bool": {
+            "must": [{"knn": {"content_embeddings": knn}}],
+            "filter": filter_clauses,
+        }
+    }
+
+
+def keyword_query(
+    client,
+    index_name: str,
+    text: str,
+    size: int = 25,
+    filter_clauses: Optional[List[dict]] = None,
+):
     query = {"query": {"match": {"content": text}}}
+    if filter_clauses:
+        query = {
+            "query": {
+                "bool": {
+                    "must": [{"match": {"content": text}}],
+                    "filter": filter_clauses,
+                }
+            }
+        }
 
     response = client.search(index=index_name, body=query, size=size)
 
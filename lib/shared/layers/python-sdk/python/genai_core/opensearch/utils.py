@@ -0,0 +1,77 @@
+import math
+import numpy as np
+from datetime import datetime, timezone
+from typing import List, Optional
+from genai_core.types import SearchFilter
+
+# The components of normalised embeddings of d dimensions have a standard
+# deviation of about 1/sqrt(d). Byte vectors map this many standard deviations
+# to the signed byte range of lucene byte vectors, larger components are
+# clipped.
+BYTE_VECTOR_CLIP_STDS = 4
+# Scale of the byte vector indexes created before the calibrated scale
+LEGACY_BYTE_VECTOR_SCALE = 127
+
+
+def calibrate_byte_vector_scale(dimensions: int) -> float:
+    return 127 * math.sqrt(dimensions) / BYTE_VECTOR_CLIP_STDS
+
+
+def get_byte_vector_scale(workspace: dict) -> float:
+    """The same scale is used for the indexed and the query vectors, the l2
+    ranking of the byte vectors is that of the scaled embeddings."""
+    scale = workspace.get("byte_vector_scale")
+    if scale is None:
+        return LEGACY_BYTE_VECTOR_SCALE
+
+    return float(scale)
+
+
+def to_byte_vectors(embeddings, scale: float) -> np.ndarray:
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    scaled = np.rint(embeddings * scale)
+
+    return np.clip(scaled, -128, 127).astype(np.int8)
+
+
+def l2_scores(vector, candidates) -> np.ndarray:
+    """Exact l2 scores, computed the way OpenSearch scores l2 k-NN hits."""
+    vector = np.asarray(vector, dtype=np.float32)
+    candidates = np.asarray(candidates, dtype=np.float32)
+    distances = np.sum(np.square(candidates - vector), axis=1)
+
+    return 1 / (1 + distances)
+
+
+def get_filter_clauses(filter: Optional[SearchFilter]) -> List[dict]:
+    """Filter context clauses of a search filter, the path prefix is matched
+    on the path.keyword field of the workspace index."""
+    if filter is None:
+        return []
+
+    clauses = []
+    for field in ["document_id", "document_sub_id", "document_type"]:
+        value = getattr(filter, field)
+        if value is not None:
+            clauses.append({"term": {field: value}})
+
+    if filter.path_prefix is not None:
+        clauses.append({"prefix": {"path.keyword": filter.path_prefix}})
+
+    created_at = {}
+    if filter.created_after is not None:
+        created_at["gte"] = _to_epoch_millis(filter.created_after)
+    if filter.created_before is not None:
+        created_at["lt"] = _to_epoch_millis(filter.created_before)
+    if created_at:
+        clauses.append({"range": {"created_at": created_at}})
+
+    return clauses
+
+
+def _to_epoch_millis(value: datetime) -> int:
+    # Dates without a time zone are UTC, as the chunk creation dates
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+
+    return int(value.timestamp() * 1000)
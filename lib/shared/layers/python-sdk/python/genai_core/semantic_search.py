@@ -1,15 +1,61 @@
+import os
+import copy
+import time
+from datetime import datetime
+from typing import Optional, Union
+from aws_lambda_powertools import Logger
 import genai_core.types
 import genai_core.workspaces
 import genai_core.embeddings
+from genai_core.cross_encoder import normalize_query
+from genai_core.utils.cache import LRUCache
 from genai_core.aurora import query_workspace_aurora
 from genai_core.opensearch import query_workspace_open_search
 from genai_core.kendra import query_workspace_kendra
 from genai_core.bedrock_kb import query_workspace_bedrock_kb
 
+# The result cache is disabled by default
+SEMANTIC_SEARCH_CACHE_SIZE = int(os.environ.get("SEMANTIC_SEARCH_CACHE_SIZE", "0"))
+SEMANTIC_SEARCH_CACHE_TTL = int(os.environ.get("SEMANTIC_SEARCH_CACHE_TTL", "600"))
+# Results are only cached once the workspace has not changed for this long.
+# Aurora searches read from the reader endpoint, which can lag behind the
+# ingest, and the lagging results would be cached under the new version.
+SEMANTIC_SEARCH_CACHE_SETTLE_SECONDS = int(
+    os.environ.get("SEMANTIC_SEARCH_CACHE_SETTLE_SECONDS", "60")
+)
+# Engines whose chunks only change through set_document_vectors and the
+# document deletes, which update the workspace version
+CACHED_ENGINES = ["aurora", "opensearch"]
+
+logger = Logger()
+
+# Results by workspace version and search arguments, repeated questions skip
+# the embeddings, the searches and the rerank.
+result_cache = LRUCache(
+    maxsize=SEMANTIC_SEARCH_CACHE_SIZE, ttl=SEMANTIC_SEARCH_CACHE_TTL
+)
+
 
 def semantic_search(
-    workspace_id: str, query: str, limit: int = 5, full_response: bool = False
+    workspace_id: str,
+    query: str,
+    limit: int = 5,
+    full_response: bool = False,
+    probes: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    filter: Optional[Union[genai_core.types.SearchFilter, dict]] = None,
 ):
+    """probes and ef_search tune the vector index search of Aurora
+    workspaces, see genai_core.aurora.index.get_search_settings.
+
+    The filter is applied by the Aurora and OpenSearch engines within the
+    vector and keyword searches, before the results are limited.
+    """
+    if isinstance(filter, dict):
+        filter = genai_core.types.SearchFilter(**filter)
+    if filter is not None and filter.is_empty():
+        filter = None
+
     workspace = genai_core.workspaces.get_workspace(workspace_id)
 
     if not workspace:
@@ -18,15 +64,101 @@ def semantic_search(
     if workspace["status"] != "ready":
         raise genai_core.types.CommonError("Workspace is not ready")
 
+    if SEMANTIC_SEARCH_CACHE_SIZE <= 0 or workspace["engine"] not in CACHED_ENGINES:
+        return _search(
+            workspace, query, limit, full_response, probes, ef_search, filter
+        )
+
+    start = time.perf_counter()
+    key = get_cache_key(
+        workspace, query, limit, full_response, probes, ef_search, filter
+    )
+    result = result_cache.get(key)
+    if result is not None:
+        logger.info("Semantic search cache hit", workspace_id=workspace_id)
+        result = copy.deepcopy(result)
+        # The stage timings are those of the cached search
+        elapsed = round((time.perf_counter() - start) * 1000, 2)
+        result["timings"] = {"cache_hit": elapsed, "total": elapsed}
+
+        return result
+
+    result = _search(workspace, query, limit, full_response, probes, ef_search, filter)
+    if _is_settled(workspace):
+        result_cache.put(key, copy.deepcopy(result))
+
+    return result
+
+
+def get_cache_key(
+    workspace: dict,
+    query: str,
+    limit: int,
+    full_response: bool,
+    probes: Optional[int],
+    ef_search: Optional[int],
+    filter: Optional[genai_core.types.SearchFilter],
+) -> tuple:
+    """The workspace version changes when chunks are added or deleted, the
+    cached results of the previous version are not read again."""
+    version = (workspace.get("updated_at"), int(workspace.get("vectors") or 0))
+
+    return (
+        workspace["workspace_id"],
+        version,
+        normalize_query(query),
+        limit,
+        full_response,
+        probes,
+        ef_search,
+        filter.model_dump_json() if filter is not None else None,
+    )
+
+
+def _is_settled(workspace: dict) -> bool:
+    try:
+        updated_at = datetime.strptime(workspace["updated_at"], "%Y-%m-%dT%H:%M:%S.%fZ")
+    except (KeyError, TypeError, ValueError):
+        return False
+
+    age = (datetime.utcnow() - updated_at).total_seconds()
+
+    return age >= SEMANTIC_SEARCH_CACHE_SETTLE_SECONDS
+
+
+def _search(
+    workspace: dict,
+    query: str,
+    limit: int,
+    full_response: bool,
+    probes: Optional[int],
+    ef_search: Optional[int],
+    filter: Optional[genai_core.types.SearchFilter],
+):
+    workspace_id = workspace["workspace_id"]
+
     if workspace["engine"] == "aurora":
         return query_workspace_aurora(
-            workspace_id, workspace, query, limit, full_response
+            workspace_id,
+            workspace,
+            query,
+            limit,
+            full_response,
+            probes=probes,
+            ef_search=ef_search,
+            filter=filter,
         )
     elif workspace["engine"] == "opensearch":
         return query_workspace_open_search(
-            workspace_id, workspace, query, limit, full_response
+            workspace_id, workspace, query, limit, full_response, filter=filter
         )
-    elif workspace["engine"] == "kendra":
+
+    if filter is not None:
+        raise genai_core.types.CommonError(
+            "Search filters are not supported for this workspace"
+        )
+
+    if workspace["engine"] == "kendra":
         return query_workspace_kendra(
             workspace_id, workspace, query, limit, full_response
         )
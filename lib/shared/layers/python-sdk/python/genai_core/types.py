@@ -1,4 +1,5 @@
 from enum import Enum
+from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel
@@ -21,6 +22,21 @@ class CrossEncoderModel(BaseModel):
     default: Optional[bool] = None
 
 
+class SearchFilter(BaseModel):
+    """Restricts a semantic search to the matching chunks, the conditions
+    are combined with AND."""
+
+    document_id: Optional[str] = None
+    document_sub_id: Optional[str] = None
+    document_type: Optional[str] = None
+    path_prefix: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+    def is_empty(self) -> bool:
+        return all(value is None for value in self.__dict__.values())
+
+
 class Workspace(BaseModel):
     id: str
     name: str
@@ -40,6 +56,7 @@ class Provider(Enum):
     SAGEMAKER = "sagemaker"
     AMAZON = "amazon"
     COHERE = "cohere"
+    LOCAL = "local"
 
 
 class Modality(Enum):
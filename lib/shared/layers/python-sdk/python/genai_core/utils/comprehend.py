@@ -1,8 +1,21 @@
+import os
 import boto3
 from typing import Optional, List
+from genai_core.utils.cache import LRUCache
+from genai_core.utils.language import detect_language
+
+# Offline detections below this confidence are sent to Comprehend
+QUERY_LANGUAGE_MIN_CONFIDENCE = float(
+    os.environ.get("QUERY_LANGUAGE_MIN_CONFIDENCE", "0.8")
+)
+QUERY_LANGUAGE_CACHE_SIZE = int(os.environ.get("QUERY_LANGUAGE_CACHE_SIZE", "10000"))
 
 comprehend = boto3.client("comprehend")
 
+# Languages by (query, workspace languages), the same questions are asked
+# again across sessions and for the rephrased question.
+language_cache = LRUCache(maxsize=QUERY_LANGUAGE_CACHE_SIZE)
+
 aws_to_pg = {
     # Afrikaans closely related to Dutch. Might not be accurate. Better than nothing.
     "af": "dutch",
@@ -34,6 +47,12 @@ aws_to_pg = {
     "zh": "chinese",
     "zh-TW": "chinese",
 }
+# Comprehend codes of the PostgreSQL languages, without the approximations
+pg_to_aws = {
+    language_name: code
+    for code, language_name in aws_to_pg.items()
+    if code not in ["af", "bn", "zh-TW"]
+}
 
 
 def comprehend_language_code_to_postgres(language_code: str) -> Optional[str]:
@@ -41,6 +60,33 @@ def comprehend_language_code_to_postgres(language_code: str) -> Optional[str]:
 
 
 def get_query_language(query: str, languages: List[str]):
+    """The language of the query among the workspace languages, english by
+    default, and the detected languages with their scores.
+
+    The language is detected offline and only sent to Comprehend when the
+    offline detection is not confident enough.
+    """
+    # Case and spacing do not change the language
+    key = (" ".join(query.casefold().split()), tuple(languages))
+    cached = language_cache.get(key)
+    if cached is not None:
+        language_name, detected_languages = cached
+        return [language_name, list(detected_languages)]
+
+    language_name, score = detect_language(query, languages)
+    if language_name is not None and score >= QUERY_LANGUAGE_MIN_CONFIDENCE:
+        detected_languages = [
+            {"code": pg_to_aws.get(language_name, language_name), "score": score}
+        ]
+    else:
+        language_name, detected_languages = _detect_dominant_language(query, languages)
+
+    language_cache.put(key, (language_name, tuple(detected_languages)))
+
+    return [language_name, detected_languages]
+
+
+def _detect_dominant_language(query: str, languages: List[str]):
     language_name = "english"
     comprehend_response = comprehend.detect_dominant_language(Text=query)
     comprehend_languages = comprehend_response["Languages"]
@@ -57,4 +103,4 @@ def get_query_language(query: str, languages: List[str]):
         if postgres_language_name is not None and postgres_language_name in languages:
             language_name = postgres_language_name
 
-    return [language_name, detected_languages]
+    return language_name, detected_languages
@@ -0,0 +1,173 @@
+"""Offline language detection of chunks and queries.
+
+Only the languages of the workspace are candidates. Languages written in
+their own script are recognized by the script, Latin script languages by
+their most frequent stopwords. The language names are the PostgreSQL text
+search configurations, as in genai_core.utils.comprehend.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+# Characters of the text sampled, the head of a chunk is enough
+SAMPLE_SIZE = 2000
+# Stopwords, or characters of a script, needed for a full confidence
+MIN_EVIDENCE = 3
+
+STOPWORDS = {
+    "english": frozenset(
+        "the and of to in is that it for was with as on be at by this are from "
+        "or an which have not but they has were their been what how when where "
+        "who you can does".split()
+    ),
+    "german": frozenset(
+        "der die und das ist nicht mit den ein eine sich auf für von dem des zu "
+        "im auch es sie ich wir wie oder aber wird sind noch nach bei einer was "
+        "wer wo kann werden".split()
+    ),
+    "french": frozenset(
+        "le la les des et est une un du dans que qui pour pas sur au avec ce il "
+        "elle sont par plus ou mais nous vous ils cette aux été comment quel "
+        "quelle être où".split()
+    ),
+    "spanish": frozenset(
+        "el la los las de que y en un una es por con para del se no su al lo "
+        "como más pero sus le ya fue este está son qué cómo dónde cuál muy "
+        "también".split()
+    ),
+    "italian": frozenset(
+        "il di che e la per un una non sono del della gli le con si da nel alla "
+        "dei ha come più anche questo questa ma è delle nella cosa quale dove "
+        "perché essere lo".split()
+    ),
+    "portuguese": frozenset(
+        "o a os as de que e do da em um uma para com não no na por mais dos das "
+        "se como mas foi ao ele ela são está é também quando onde qual isso".split()
+    ),
+    "dutch": frozenset(
+        "de het een en van is dat op te in voor niet met zijn er maar om ook "
+        "als aan bij nog wordt door worden naar dit deze wat hoe waar wie kan "
+        "hij zij ik".split()
+    ),
+    "danish": frozenset(
+        "og i at det er en til på den af med for ikke de som har et der var jeg "
+        "men om fra kan skal også efter hvad hvor hvordan hun han vi være blev "
+        "eller".split()
+    ),
+    "norwegian": frozenset(
+        "og i det er en til på som at med for av ikke den har de et var jeg men "
+        "om fra kan skal også etter hva hvor hvordan hun han vi være ble eller "
+        "ikkje".split()
+    ),
+    "swedish": frozenset(
+        "och i att det som en på är av för med till den har de inte om ett var "
+        "jag men från kan ska också efter vad hur hon han vi vara blev eller "
+        "när".split()
+    ),
+    "finnish": frozenset(
+        "ja on ei se että oli hän ovat mutta kun tai niin myös joka sen ole voi "
+        "kuin mitä miten missä kuka tämä nämä ne me te he jos vain sitä hänen "
+        "olla kanssa mukaan".split()
+    ),
+    "hungarian": frozenset(
+        "a az és hogy nem is egy van meg de már csak mint még volt vagy ez azt "
+        "el kell lesz mi hol hogyan miért ki ezt olyan nagyon pedig után között "
+        "szerint így minden".split()
+    ),
+    "czech": frozenset(
+        "a je se na v že to s z do o jsou by jak ale pro tak jako po od jsem "
+        "byl být také nebo který která které co kde proč už jen této tento mezi".split()
+    ),
+    "polish": frozenset(
+        "i w na nie się z do to że jest o jak ale co po tak za od czy być przez "
+        "jego ich oraz który która które gdzie dlaczego też tylko jednak są "
+        "może tego ten".split()
+    ),
+    "romanian": frozenset(
+        "și în de la cu nu pe că este din o un mai sunt se ce care pentru fost "
+        "sau dar lui ei acest această cum unde când cine foarte doar şi fi au "
+        "al".split()
+    ),
+    "turkish": frozenset(
+        "ve bir bu da de için ile ne çok daha gibi olan ama var mi mı ben sen o "
+        "biz en kadar olarak değil nasıl nerede neden kim her sonra şey veya ya "
+        "ki diye göre".split()
+    ),
+    "indonesian": frozenset(
+        "yang dan di ini itu dengan untuk tidak dari dalam akan pada juga ke "
+        "karena ada bisa atau oleh saya kami mereka apa bagaimana dimana siapa "
+        "sudah lebih seperti adalah telah tersebut harus hanya jika kita".split()
+    ),
+    "vietnamese": frozenset(
+        "và của là có không được trong cho những các một với này người đã để "
+        "khi từ như thì cũng nhưng ra về đến nào gì sao đâu ai rất làm tôi "
+        "chúng bạn nhiều".split()
+    ),
+}
+
+SCRIPTS = {
+    "russian": re.compile("[\u0400-\u04ff]"),
+    "greek": re.compile("[\u0370-\u03ff]"),
+    "hebrew": re.compile("[\u0590-\u05ff]"),
+    "arabic": re.compile("[\u0600-\u06ff\u0750-\u077f]"),
+    # Devanagari and Bengali, mapped to hindi as by Comprehend
+    "hindi": re.compile("[\u0900-\u09ff]"),
+    "chinese": re.compile("[\u3400-\u4dbf\u4e00-\u9fff]"),
+}
+# Letters of the Persian alphabet missing from the Arabic alphabet
+PERSIAN_LETTERS = re.compile("[\u067e\u0686\u0698\u06af]")
+LATIN_LETTERS = re.compile("[a-zA-Z\u00c0-\u024f\u1e00-\u1eff]")
+WORDS = re.compile(r"\w+")
+
+
+def detect_language(text: str, languages: List[str]) -> Tuple[Optional[str], float]:
+    """The most likely of the languages and a confidence between 0 and 1,
+    its share of the evidence lowered when there is little evidence.
+    (None, 0) when the text matches none of them."""
+    sample = text[:SAMPLE_SIZE]
+
+    latin = len(LATIN_LETTERS.findall(sample))
+    script, script_chars = None, 0
+    for name, pattern in SCRIPTS.items():
+        chars = len(pattern.findall(sample))
+        if chars > script_chars:
+            script, script_chars = name, chars
+
+    if script_chars > latin:
+        if script == "arabic" and PERSIAN_LETTERS.search(sample):
+            script = "persian"
+        if script not in languages:
+            return None, 0
+
+        return script, _confidence(script_chars, script_chars + latin)
+
+    hits = {}
+    for word in WORDS.findall(sample.lower()):
+        for language in languages:
+            if word in STOPWORDS.get(language, ()):
+                hits[language] = hits.get(language, 0) + 1
+
+    if not hits:
+        return None, 0
+
+    # Ties go to the first language of the workspace
+    language = max(languages, key=lambda language: hits.get(language, 0))
+
+    return language, _confidence(hits[language], sum(hits.values()))
+
+
+def get_chunk_language(chunk: str, languages: List[str]) -> Optional[str]:
+    """The language of a chunk, the first language of the workspace when the
+    chunk matches none of them."""
+    if not languages:
+        return None
+    if len(languages) == 1:
+        return languages[0]
+
+    language, _ = detect_language(chunk, languages)
+
+    return language or languages[0]
+
+
+def _confidence(evidence: int, total: int) -> float:
+    return evidence / total * min(1.0, evidence / MIN_EVIDENCE)
@@ -0,0 +1,11 @@
+import time
+from typing import Callable
+
+
+def timed(timings: dict, name: str, fn: Callable, *args, **kwargs):
+    """Call fn and record its duration in milliseconds as timings[name]."""
+    start = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        timings[name] = round((time.perf_counter() - start) * 1000, 2)
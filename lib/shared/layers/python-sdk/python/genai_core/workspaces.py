@@ -4,7 +4,11 @@ import uuid
 from aws_lambda_powertools import Logger
 import boto3
 import genai_core.embeddings
+import genai_core.opensearch
+import genai_core.opensearch.utils
 from datetime import datetime
+from decimal import Decimal
+from typing import Optional
 from .types import WorkspaceStatus
 from genai_core.types import Task
 
@@ -92,6 +96,41 @@ def set_status(workspace_id: str, status: str):
     return response
 
 
+def set_index_state(workspace_id: str, rows: int, lists: Optional[int]):
+    """Record the vector index built by the Aurora index rebuild."""
+    timestamp = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+    response = table.update_item(
+        Key={"workspace_id": workspace_id, "object_type": WORKSPACE_OBJECT_TYPE},
+        UpdateExpression="SET index_rows=:rows, ivfflat_lists=:lists, "
+        + "index_built_at=:timestampValue",
+        ExpressionAttributeValues={
+            ":rows": rows,
+            ":lists": lists,
+            ":timestampValue": timestamp,
+        },
+    )
+
+    return response
+
+
+def set_keyword_columns(workspace_id: str):
+    """Record the stored tsvector columns added by the Aurora migration."""
+    timestamp = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+    response = table.update_item(
+        Key={"workspace_id": workspace_id, "object_type": WORKSPACE_OBJECT_TYPE},
+        UpdateExpression="SET keyword_columns=:keywordColumns, "
+        + "updated_at=:timestampValue",
+        ExpressionAttributeValues={
+            ":keywordColumns": True,
+            ":timestampValue": timestamp,
+        },
+    )
+
+    return response
+
+
 def create_workspace_aurora(
     workspace_name: str,
     embeddings_model_provider: str,
@@ -106,6 +145,14 @@ def create_workspace_aurora(
     chunking_strategy: str,
     chunk_size: int,
     chunk_overlap: int,
+    vector_quantization: str = "none",
+    index_type: str = "ivfflat",
+    hnsw_m: Optional[int] = None,
+    hnsw_ef_construction: Optional[int] = None,
+    hnsw_ef_search: Optional[int] = None,
+    ivfflat_probes: Optional[int] = None,
+    rerank_top_n: Optional[int] = None,
+    rerank_skip_gap: Optional[float] = None,
 ):
     workspace_id = str(uuid.uuid4())
     timestamp = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
@@ -137,6 +184,20 @@ def create_workspace_aurora(
         "chunking_strategy": chunking_strategy,
         "chunk_size": chunk_size,
         "chunk_overlap": chunk_overlap,
+        "vector_quantization": vector_quantization,
+        # The keyword search reads the stored tsvector columns of the chunks
+        # tagged with the query language
+        "keyword_columns": True,
+        "chunk_languages": True,
+        "index_type": index_type,
+        "hnsw_m": hnsw_m,
+        "hnsw_ef_construction": hnsw_ef_construction,
+        "hnsw_ef_search": hnsw_ef_search,
+        "ivfflat_probes": ivfflat_probes,
+        "rerank_top_n": rerank_top_n,
+        "rerank_skip_gap": (
+            Decimal(str(rerank_skip_gap)) if rerank_skip_gap is not None else None
+        ),
         "documents": 0,
         "vectors": 0,
         "size_in_bytes": 0,
@@ -176,6 +237,9 @@ def create_workspace_open_search(
     chunking_strategy: str,
     chunk_size: int,
     chunk_overlap: int,
+    vector_quantization: str = "none",
+    rerank_top_n: Optional[int] = None,
+    rerank_skip_gap: Optional[float] = None,
 ):
     workspace_id = str(uuid.uuid4())
     timestamp = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
@@ -202,11 +266,18 @@ def create_workspace_open_search(
         "cross_encoder_model_name": cross_encoder_model_name,
         "languages": languages,
         "metric": "l2",
-        "aoss_engine": "nmslib",
+        "aoss_engine": genai_core.opensearch.get_knn_engine(vector_quantization),
+        # The index maps path.keyword for the path prefix filters
+        "path_keyword": True,
         "hybrid_search": hybrid_search,
         "chunking_strategy": chunking_strategy,
         "chunk_size": chunk_size,
         "chunk_overlap": chunk_overlap,
+        "vector_quantization": vector_quantization,
+        "rerank_top_n": rerank_top_n,
+        "rerank_skip_gap": (
+            Decimal(str(rerank_skip_gap)) if rerank_skip_gap is not None else None
+        ),
         "documents": 0,
         "vectors": 0,
         "size_in_bytes": 0,
@@ -214,6 +285,12 @@ def create_workspace_open_search(
         "updated_at": timestamp,
     }
 
+    if vector_quantization == "byte":
+        scale = genai_core.opensearch.utils.calibrate_byte_vector_scale(
+            int(embeddings_model_dimensions)
+        )
+        item["byte_vector_scale"] = Decimal(str(round(scale, 4)))
+
     ddb_response = table.put_item(Item=item)
 
     response = sfn_client.start_execution(
@@ -30,6 +30,7 @@ def test_semantic_search(mocker):
         "vector_search_metric": "l2",
         "vector_search_items": [dummy_item.copy()],
         "keyword_search_items": [dummy_item.copy()],
+        "timings": {"embeddings": 10.5, "vector_search": 5, "total": 20},
     }
     mock = mocker.patch(
         "genai_core.semantic_search.semantic_search", return_value=search_response
@@ -41,6 +42,9 @@ def test_semantic_search(mocker):
         limit=25,
         query=input.get("query"),
         full_response=True,
+        probes=None,
+        ef_search=None,
+        filter=None,
     )
 
     assert response.get("engine") == search_response.get("engine")
@@ -54,6 +58,41 @@ def test_semantic_search(mocker):
     assert len(response.get("items")) == 1
     assert len(response.get("vectorSearchItems")) == 1
     assert len(response.get("keywordSearchItems")) == 1
+    assert response.get("timings") == {
+        "embeddings": 10.5,
+        "languageDetection": None,
+        "vectorSearch": 5,
+        "keywordSearch": None,
+        "hybridSearch": None,
+        "rerank": None,
+        "cacheHit": None,
+        "total": 20,
+    }
+
+
+def test_semantic_search_filter(mocker):
+    mock = mocker.patch(
+        "genai_core.semantic_search.semantic_search",
+        return_value={"engine": "aurora", "items": []},
+    )
+
+    semantic_search(
+        {
+            "query": "query",
+            "workspaceId": "id",
+            "filter": {
+                "documentType": "website",
+                "pathPrefix": "https://example.com/docs/",
+                "createdAfter": "2024-01-01T00:00:00Z",
+            },
+        }
+    )
+
+    filter = mock.call_args.kwargs["filter"]
+    assert filter.document_type == "website"
+    assert filter.path_prefix == "https://example.com/docs/"
+    assert filter.created_after.year == 2024
+    assert filter.document_id is None
 
 
 def test_semantic_search_invalid_input(mocker):
@@ -63,3 +102,7 @@ def test_semantic_search_invalid_input(mocker):
         semantic_search({"query": "<", "workspaceId": "<"})
     with pytest.raises(ValidationError, match="2 validation error"):
         semantic_search({"query": "<", "workspaceId": "<"})
+    with pytest.raises(ValidationError, match="1 validation error"):
+        semantic_search(
+            {"query": "query", "workspaceId": "id", "filter": {"pathPrefix": "<"}}
+        )
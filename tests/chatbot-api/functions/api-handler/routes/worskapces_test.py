@@ -130,6 +130,19 @@ def test_create_aurora_workspace_invalid_input(mocker):
     input["metric"] = "invalid"
     with pytest.raises(CommonError, match="Invalid metric"):
         create_aurora_workspace(input)
+    input = create_base_input.copy()
+    input["vectorQuantization"] = "fp16"
+    with pytest.raises(CommonError, match="Invalid vector quantization"):
+        create_aurora_workspace(input)
+    input = create_base_input.copy()
+    input["indexType"] = "diskann"
+    with pytest.raises(CommonError, match="Invalid index type"):
+        create_aurora_workspace(input)
+    input = create_base_input.copy()
+    input["indexType"] = "hnsw"
+    input["hnswM"] = 48
+    with pytest.raises(CommonError, match="Invalid HNSW parameters"):
+        create_aurora_workspace(input)
     verifiy_common_invalid_inputs(create_aurora_workspace)
 
 
@@ -145,6 +158,18 @@ def test_create_open_search_workspace(mocker):
 
 def test_create_open_search_workspace_invalid_input(mocker):
     mocker.patch("genai_core.parameters.get_config", return_value=config)
+    input = create_base_input.copy()
+    input["vectorQuantization"] = "binary"
+    with pytest.raises(CommonError, match="Invalid vector quantization"):
+        create_open_search_workspace(input)
+    input = create_base_input.copy()
+    input["rerankTopN"] = 0
+    with pytest.raises(ValidationError, match="rerankTopN"):
+        create_open_search_workspace(input)
+    input = create_base_input.copy()
+    input["rerankSkipGap"] = 2
+    with pytest.raises(ValidationError, match="rerankSkipGap"):
+        create_open_search_workspace(input)
     verifiy_common_invalid_inputs(create_open_search_workspace)
 
 
@@ -0,0 +1,103 @@
+import json
+import uuid
+import struct
+import pytest
+import numpy as np
+from genai_core.aurora.chunks import add_chunks_aurora
+from genai_core.aurora.copy import HEADER
+
+workspace_id = "6f6e5d4c-3b2a-4190-8f7e-6d5c4b3a2910"
+document_id = "0a1b2c3d-4e5f-4a6b-8c7d-9e0f1a2b3c4d"
+
+
+def _parse_copy(data: bytes):
+    assert data.startswith(HEADER)
+    offset = len(HEADER)
+    rows = []
+    while True:
+        (count,) = struct.unpack_from("!h", data, offset)
+        offset += 2
+        if count == -1:
+            assert offset == len(data)
+            return rows
+
+        row = []
+        for _ in range(count):
+            (length,) = struct.unpack_from("!i", data, offset)
+            offset += 4
+            row.append(None if length == -1 else data[offset : offset + length])
+            offset += max(length, 0)
+        rows.append(row)
+
+
+@pytest.fixture
+def cursor(mocker):
+    cursor = mocker.MagicMock()
+    cursor.payloads = []
+    cursor.copy_expert.side_effect = lambda statement, file: cursor.payloads.append(
+        file.read()
+    )
+    connection = mocker.patch("genai_core.aurora.chunks.AuroraConnection")
+    connection.return_value.__enter__.return_value = cursor
+
+    return cursor
+
+
+def _add_chunks(count: int):
+    return add_chunks_aurora(
+        workspace_id=workspace_id,
+        document_id=document_id,
+        document_sub_id=None,
+        document_type="file",
+        document_sub_type=None,
+        path="file.txt",
+        title="título",
+        chunk_ids=[uuid.UUID(int=idx) for idx in range(count)],
+        chunk_embeddings=np.arange(count * 2, dtype=np.float32).reshape(count, 2),
+        chunks=[f"chunk {idx}" for idx in range(count)],
+        chunk_complements=["complement"],
+        replace=False,
+        chunk_hashes=[f"hash {idx}" for idx in range(count)],
+        chunk_languages=["english"] * count,
+    )
+
+
+def test_add_chunks_aurora_binary_copy(cursor):
+    result = _add_chunks(2)
+
+    assert result == {"removed_vectors": 0, "added_vectors": 2}
+    cursor.connection.commit.assert_called_once()
+    assert len(cursor.payloads) == 1
+
+    rows = _parse_copy(cursor.payloads[0])
+    assert len(rows) == 2
+    row = rows[1]
+    assert len(row) == 13
+    assert uuid.UUID(bytes=row[0]) == uuid.UUID(int=1)
+    assert uuid.UUID(bytes=row[1]) == uuid.UUID(workspace_id)
+    assert row[3] is None
+    assert row[7] == b"english"
+    assert row[8].decode("utf-8") == "título"
+    assert row[9] == b"chunk 1"
+    # Only the first chunk has a complement
+    assert rows[0][10] == b"complement" and row[10] is None
+    # pgvector: dimensions, unused, float4 values
+    assert struct.unpack("!hhff", row[11]) == (2, 0, 2.0, 3.0)
+    assert row[12][0] == 1
+    assert json.loads(row[12][1:]) == {"content_hash": "hash 1"}
+
+
+def test_add_chunks_aurora_copy_batches(cursor, mocker):
+    mocker.patch("genai_core.aurora.chunks.AURORA_COPY_BATCH_SIZE", 2)
+    _add_chunks(5)
+
+    assert [len(_parse_copy(payload)) for payload in cursor.payloads] == [2, 2, 1]
+
+    cursor.payloads.clear()
+    mocker.patch("genai_core.aurora.chunks.AURORA_COPY_BATCH_SIZE", 1000)
+    mocker.patch("genai_core.aurora.chunks.AURORA_COPY_MAX_BYTES", 300)
+    _add_chunks(5)
+
+    assert len(cursor.payloads) > 1
+    assert all(len(payload) < 300 + 200 for payload in cursor.payloads)
+    assert sum(len(_parse_copy(payload)) for payload in cursor.payloads) == 5
@@ -0,0 +1,160 @@
+import pytest
+import psycopg2
+import psycopg2.extensions
+import genai_core.aurora.connection
+from genai_core.aurora.connection import AuroraConnection
+
+
+class FakeCursor(object):
+    def __init__(self, connection):
+        self.connection = connection
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def execute(self, query, params=None):
+        if self.connection.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+        self.connection.queries.append(query)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection(object):
+    def __init__(self, host):
+        self.host = host
+        self.closed = 0
+        self.broken = False
+        self.autocommit = None
+        self.queries = []
+        self.rollbacks = 0
+
+    def set_session(self, autocommit, readonly):
+        self.autocommit = autocommit
+        self.readonly = readonly
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connect(mocker):
+    genai_core.aurora.connection._pools.clear()
+    genai_core.aurora.connection._tokens.clear()
+    mocker.patch("genai_core.aurora.connection.AURORA_DB_HOST", "writer")
+    mocker.patch("genai_core.aurora.connection.register_vector")
+    mocker.patch.object(
+        genai_core.aurora.connection.client,
+        "generate_db_auth_token",
+        side_effect=lambda DBHostname, **kwargs: f"token-{DBHostname}",
+    )
+
+    return mocker.patch(
+        "genai_core.aurora.connection._connect",
+        side_effect=lambda host, token: FakeConnection(host),
+    )
+
+
+def test_connections_are_reused(connect):
+    with AuroraConnection() as cursor:
+        first = cursor.connection
+    with AuroraConnection(autocommit=False) as cursor:
+        second = cursor.connection
+
+    assert first is second
+    assert second.autocommit is False
+    # Uncommitted transactions are not left open in the pool
+    assert second.rollbacks == 1
+    assert connect.call_count == 1
+    genai_core.aurora.connection.client.generate_db_auth_token.assert_called_once()
+
+
+def test_broken_connections_are_replaced(connect, mocker):
+    mocker.patch("genai_core.aurora.connection.AURORA_DB_POOL_CHECK_INTERVAL", -1)
+    with AuroraConnection() as cursor:
+        first = cursor.connection
+    first.broken = True
+
+    with AuroraConnection() as cursor:
+        second = cursor.connection
+
+    assert first is not second
+    assert first.closed
+    assert connect.call_count == 2
+
+
+def test_pool_size(connect, mocker):
+    mocker.patch("genai_core.aurora.connection.AURORA_DB_POOL_SIZE", 1)
+    first = AuroraConnection()
+    second = AuroraConnection()
+
+    first.__enter__()
+    second.__enter__()
+    first.__exit__(None, None, None)
+    second.__exit__(None, None, None)
+
+    assert not first.connection.closed
+    assert second.connection.closed
+
+
+def test_set_session_failure_releases_the_connection(connect, mocker):
+    def set_session(autocommit, readonly):
+        raise psycopg2.OperationalError("server closed the connection")
+
+    connection = FakeConnection("writer")
+    connection.set_session = set_session
+    connect.side_effect = [connection]
+
+    with pytest.raises(psycopg2.OperationalError):
+        with AuroraConnection():
+            pass
+
+    pool = genai_core.aurora.connection.get_pool("writer")
+    assert connection.closed
+    # The pool no longer counts the discarded connection
+    assert pool.created == {}
+    assert pool.idle == []
+
+
+def test_readonly_connections_use_the_reader(connect, mocker):
+    mocker.patch("genai_core.aurora.connection.AURORA_DB_READER_HOST", "reader")
+
+    with AuroraConnection(readonly=True) as cursor:
+        assert cursor.connection.host == "reader"
+        assert cursor.connection.readonly is True
+    with AuroraConnection() as cursor:
+        assert cursor.connection.host == "writer"
+
+    connect.assert_any_call("reader", "token-reader")
+
+
+def test_token_is_refreshed_on_authentication_failure(connect):
+    tokens = []
+
+    def _connect(host, token):
+        tokens.append(token)
+        if len(tokens) == 1:
+            raise psycopg2.OperationalError("PAM authentication failed for user")
+        return FakeConnection(host)
+
+    connect.side_effect = _connect
+
+    with AuroraConnection():
+        pass
+
+    assert len(tokens) == 2
+    assert genai_core.aurora.connection.client.generate_db_auth_token.call_count == 2
@@ -0,0 +1,179 @@
+import pytest
+from psycopg2 import sql
+from genai_core.aurora import index
+from genai_core.aurora.index import (
+    create_vector_index,
+    get_ivfflat_lists,
+    get_search_settings,
+    needs_rebuild,
+    rebuild_index,
+    request_rebuild,
+)
+
+workspace = {
+    "workspace_id": "6f6e5d4c-3b2a-4190-8f7e-6d5c4b3a2910",
+    "metric": "cosine",
+    "embeddings_model_dimensions": 2,
+    "has_index": True,
+}
+table_name = "6f6e5d4c3b2a41908f7e6d5c4b3a2910"
+
+
+def _render(query) -> str:
+    if isinstance(query, sql.Composed):
+        return "".join(_render(part) for part in query.seq)
+    elif isinstance(query, sql.Identifier):
+        return ".".join(f'"{string}"' for string in query.strings)
+    elif isinstance(query, sql.Literal):
+        return repr(query.wrapped)
+    elif isinstance(query, sql.SQL):
+        return query.string
+
+    return query
+
+
+def _state(rows, index_type="ivfflat", lists=None, index_name="index"):
+    return {
+        "rows": rows,
+        "index_name": index_name,
+        "index_type": index_type,
+        "lists": lists,
+    }
+
+
+@pytest.fixture
+def cursor(mocker):
+    cursor = mocker.MagicMock()
+    connection = mocker.patch("genai_core.aurora.index.AuroraConnection")
+    connection.return_value.__enter__.return_value = cursor
+
+    return cursor
+
+
+def test_get_ivfflat_lists():
+    assert get_ivfflat_lists(0) == 1
+    assert get_ivfflat_lists(50_000) == 50
+    assert get_ivfflat_lists(1_000_000) == 1000
+    assert get_ivfflat_lists(4_000_000) == 2000
+
+
+def test_get_search_settings():
+    assert get_search_settings({**workspace, "has_index": False}, 25) == {}
+    # Lists unknown, the Postgres default is used
+    assert get_search_settings(workspace, 25) == {}
+    assert get_search_settings({**workspace, "ivfflat_lists": 400}, 25) == {
+        "ivfflat.probes": 20
+    }
+    assert get_search_settings(workspace, 25, probes=5) == {"ivfflat.probes": 5}
+
+    hnsw = {**workspace, "index_type": "hnsw", "hnsw_ef_search": 100}
+    assert get_search_settings(hnsw, 25) == {"hnsw.ef_search": 100}
+    assert get_search_settings(hnsw, 25, ef_search=60) == {"hnsw.ef_search": 60}
+    # A quantized shortlist larger than ef_search
+    assert get_search_settings(hnsw, 200) == {"hnsw.ef_search": 200}
+
+
+def test_create_vector_index(mocker):
+    cursor = mocker.MagicMock()
+
+    create_vector_index(cursor, workspace, rows=50_000)
+    create_vector_index(
+        cursor,
+        {**workspace, "index_type": "hnsw", "hnsw_m": 32},
+        name="new",
+        concurrently=True,
+    )
+
+    ivfflat, hnsw = [_render(call.args[0]) for call in cursor.execute.call_args_list]
+    assert ivfflat == (
+        f'CREATE INDEX "{table_name}_embeddings_idx" ON "{table_name}" '
+        + 'USING ivfflat ("content_embeddings" vector_cosine_ops) WITH (lists = 50);'
+    )
+    assert hnsw == (
+        f'CREATE INDEX CONCURRENTLY "new" ON "{table_name}" USING hnsw '
+        + '("content_embeddings" vector_cosine_ops) '
+        + "WITH (m = 32, ef_construction = 64);"
+    )
+
+
+def test_needs_rebuild():
+    assert not needs_rebuild(workspace, _state(1500, lists=1))
+    assert needs_rebuild(workspace, _state(2000, lists=1))
+    # Tables indexed with the former fixed lists
+    assert needs_rebuild(workspace, _state(10_000, lists=100))
+    assert not needs_rebuild(workspace, _state(150_000, lists=100))
+    assert needs_rebuild(workspace, _state(0, index_type=None))
+    assert not needs_rebuild(
+        {**workspace, "index_type": "hnsw"}, _state(10_000_000, "hnsw")
+    )
+    assert not needs_rebuild({**workspace, "has_index": False}, _state(10_000))
+
+
+def test_request_rebuild(mocker, cursor):
+    mocker.patch.object(index, "AURORA_INDEX_REBUILD_FUNCTION_NAME", "rebuild")
+    invoke = mocker.patch.object(index.lambda_client, "invoke")
+
+    cursor.fetchone.return_value = (1500, "index", "ivfflat", ["lists=1"])
+    assert not request_rebuild(workspace)
+    invoke.assert_not_called()
+
+    cursor.fetchone.return_value = (5000, "index", "ivfflat", ["lists=1"])
+    assert request_rebuild(workspace)
+    assert invoke.call_args.kwargs["FunctionName"] == "rebuild"
+    assert invoke.call_args.kwargs["InvocationType"] == "Event"
+
+
+def test_rebuild_index(cursor):
+    cursor.fetchone.side_effect = [
+        (True,),
+        (250_000, "legacy_index", "ivfflat", ["lists=100"]),
+        (250_000, f"{table_name}_embeddings_idx", "ivfflat", ["lists=250"]),
+    ]
+
+    state = rebuild_index(workspace)
+
+    statements = [_render(call.args[0]) for call in cursor.execute.call_args_list]
+    assert statements[1].startswith("SELECT t.reltuples")
+    assert statements[4].startswith(
+        f'CREATE INDEX CONCURRENTLY "{table_name}_embeddings_new"'
+    )
+    assert "WITH (lists = 250)" in statements[4]
+    assert statements[5] == (
+        'DROP INDEX "legacy_index"; '
+        + f'ALTER INDEX "{table_name}_embeddings_new" '
+        + f'RENAME TO "{table_name}_embeddings_idx";'
+    )
+    assert statements[-1].startswith("SELECT pg_advisory_unlock")
+    assert state["lists"] == 250
+
+
+def test_rebuild_index_in_progress(cursor):
+    cursor.fetchone.side_effect = [(False,)]
+
+    assert rebuild_index(workspace) is None
+    assert cursor.execute.call_count == 1
+
+
+def test_request_rebuild_keyword_migration(mocker, cursor):
+    mocker.patch.object(index, "AURORA_INDEX_REBUILD_FUNCTION_NAME", "rebuild")
+    invoke = mocker.patch.object(index.lambda_client, "invoke")
+    hnsw = {**workspace, "index_type": "hnsw", "hybrid_search": True}
+
+    assert not request_rebuild({**hnsw, "keyword_columns": True})
+    # Hybrid workspaces created before the stored tsvector columns
+    assert request_rebuild(hnsw)
+    invoke.assert_called_once()
+    cursor.execute.assert_not_called()
+
+
+def test_request_rebuild_without_function(mocker, cursor):
+    mocker.patch.object(index, "AURORA_INDEX_REBUILD_FUNCTION_NAME", None)
+
+    assert not request_rebuild({**workspace, "hybrid_search": True})
+    # The table is not checked by processes that cannot start the rebuild
+    cursor.execute.assert_not_called()
+
+
+def test_rebuild_index_without_index(cursor):
+    assert rebuild_index({**workspace, "has_index": False}, force=True) is None
+    cursor.execute.assert_not_called()
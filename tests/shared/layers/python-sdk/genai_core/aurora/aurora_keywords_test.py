@@ -0,0 +1,129 @@
+import pytest
+from psycopg2 import sql
+from genai_core.aurora.keywords import (
+    create_keyword_columns,
+    drop_expression_indexes,
+    migrate_keyword_columns,
+)
+
+workspace = {
+    "workspace_id": "6f6e5d4c-3b2a-4190-8f7e-6d5c4b3a2910",
+    "languages": ["english", "german"],
+    "hybrid_search": True,
+    "chunk_languages": True,
+}
+table_name = "6f6e5d4c3b2a41908f7e6d5c4b3a2910"
+
+
+def _render(query) -> str:
+    if isinstance(query, sql.Composed):
+        return "".join(_render(part) for part in query.seq)
+    elif isinstance(query, sql.Identifier):
+        return ".".join(f'"{string}"' for string in query.strings)
+    elif isinstance(query, sql.Literal):
+        return repr(query.wrapped)
+    elif isinstance(query, sql.SQL):
+        return query.string
+
+    return query
+
+
+@pytest.fixture
+def cursor(mocker):
+    cursor = mocker.MagicMock()
+    connection = mocker.patch("genai_core.aurora.keywords.AuroraConnection")
+    connection.return_value.__enter__.return_value = cursor
+
+    return cursor
+
+
+def test_create_keyword_columns(mocker):
+    cursor = mocker.MagicMock()
+
+    create_keyword_columns(cursor, workspace)
+
+    statements = [_render(call.args[0]) for call in cursor.execute.call_args_list]
+    assert len(statements) == 4
+    assert statements[0] == (
+        f'ALTER TABLE "{table_name}" ADD COLUMN IF NOT EXISTS '
+        + '"content_tsv_english" tsvector GENERATED ALWAYS AS '
+        + "(to_tsvector('\"english\"', content)) STORED;"
+    )
+    assert statements[1] == (
+        f'CREATE INDEX IF NOT EXISTS "{table_name}_content_tsv_english_idx" '
+        + f'ON "{table_name}" USING GIN ("content_tsv_english") '
+        + "WHERE language = 'english';"
+    )
+    assert '"content_tsv_german"' in statements[2]
+
+
+def test_migrate_keyword_columns(mocker, cursor):
+    mocker.patch("genai_core.aurora.keywords.AURORA_KEYWORD_BACKFILL_BATCH_SIZE", 2)
+    cursor.fetchone.side_effect = [(True,), None, (True,)]
+    # Two batches, the second one is the last
+    cursor.fetchall.side_effect = [[("a",), ("b",)], [("c",)]]
+
+    assert migrate_keyword_columns(workspace)
+
+    statements = [_render(call.args[0]) for call in cursor.execute.call_args_list]
+    assert statements[0].startswith("SELECT pg_try_advisory_lock")
+    assert statements[1] == "SET lock_timeout = %s;"
+    # Plain columns, no table rewrite
+    assert statements[2] == (
+        f'ALTER TABLE "{table_name}" ADD COLUMN IF NOT EXISTS '
+        + '"content_tsv_english" tsvector;'
+    )
+    assert "CREATE OR REPLACE TRIGGER" in statements[4]
+    assert "BEFORE INSERT OR UPDATE OF content" in statements[4]
+    assert 'NEW."content_tsv_german" := to_tsvector' in statements[4]
+
+    backfill = [statement for statement in statements if "IS NULL" in statement]
+    assert "chunk_id > %s" not in backfill[0]
+    assert "chunk_id > %s" in backfill[1]
+    assert cursor.execute.call_args_list[statements.index(backfill[1])].args[1] == [
+        "b",
+        2,
+    ]
+    updates = [statement for statement in statements if statement.startswith("UPDATE")]
+    assert len(updates) == 2
+
+    # The invalid index left by an interrupted build is dropped first
+    assert any(
+        statement.startswith("DROP INDEX CONCURRENTLY") for statement in statements
+    )
+    assert (
+        sum(
+            statement.startswith("CREATE INDEX CONCURRENTLY IF NOT EXISTS")
+            for statement in statements
+        )
+        == 2
+    )
+    assert statements[-1].startswith("SELECT pg_advisory_unlock")
+
+
+def test_migrate_keyword_columns_deadline(cursor):
+    cursor.fetchone.return_value = (True,)
+
+    # Paused before the first batch, resumed by the next rebuild request
+    assert not migrate_keyword_columns(workspace, deadline=0)
+
+    statements = [_render(call.args[0]) for call in cursor.execute.call_args_list]
+    assert not any(statement.startswith("UPDATE") for statement in statements)
+    assert not any("CREATE INDEX" in statement for statement in statements)
+    assert statements[-1].startswith("SELECT pg_advisory_unlock")
+
+
+def test_migrate_keyword_columns_in_progress(cursor):
+    cursor.fetchone.return_value = (False,)
+
+    assert not migrate_keyword_columns(workspace)
+    assert cursor.execute.call_count == 1
+
+
+def test_drop_expression_indexes(cursor):
+    cursor.fetchall.return_value = [("expression_idx",)]
+
+    drop_expression_indexes(workspace)
+
+    statement = _render(cursor.execute.call_args.args[0])
+    assert statement == 'DROP INDEX CONCURRENTLY IF EXISTS "expression_idx";'
@@ -0,0 +1,165 @@
+import pytest
+import numpy as np
+from genai_core.aurora.query import query_workspace_aurora
+from genai_core.types import EmbeddingsModel, SearchFilter
+
+workspace = {
+    "embeddings_model_provider": "bedrock",
+    "embeddings_model_name": "amazon.titan-embed-text-v1",
+    "embeddings_model_dimensions": 2,
+    "cross_encoder_model_provider": None,
+    "cross_encoder_model_name": None,
+    "metric": "cosine",
+    "has_index": True,
+    "hybrid_search": True,
+    "languages": ["english"],
+    "keyword_columns": True,
+    "chunk_languages": True,
+}
+
+
+def _row(chunk_id, vector, keyword, vector_rank, keyword_rank, fused):
+    chunk = (chunk_id, "w", "d", None, "text", None, "p", "english", "t", chunk_id)
+
+    return chunk + (None, {}, vector, keyword, vector_rank, keyword_rank, fused)
+
+
+@pytest.fixture
+def execute_prepared(mocker):
+    mocker.patch(
+        "genai_core.embeddings.get_embeddings_model",
+        return_value=EmbeddingsModel(
+            provider="bedrock", name="amazon.titan-embed-text-v1", dimensions=2
+        ),
+    )
+    mocker.patch("genai_core.embeddings.generate_embeddings", return_value=[[0.6, 0.8]])
+    mocker.patch(
+        "genai_core.utils.comprehend.get_query_language",
+        return_value=["english", [{"code": "en", "score": 0.99}]],
+    )
+
+    return mocker.patch("genai_core.aurora.query.execute_prepared")
+
+
+def _set_rows(mocker, rows):
+    cursor = mocker.MagicMock()
+    cursor.fetchall.return_value = rows
+    connection = mocker.patch("genai_core.aurora.query.AuroraConnection")
+    connection.return_value.__enter__.return_value = cursor
+
+
+def test_query_workspace_aurora_hybrid(mocker, execute_prepared):
+    _set_rows(
+        mocker,
+        [
+            _row("b", 0.2, 0.5, 2, 1, 1 / 62 + 1 / 61),
+            _row("a", 0.1, None, 1, None, 1 / 61),
+        ],
+    )
+
+    response = query_workspace_aurora(
+        "workspace-id", workspace, "query", 10, full_response=True
+    )
+
+    # One statement for both searches
+    execute_prepared.assert_called_once()
+    params = execute_prepared.call_args.args[2]
+    assert np.array_equal(params[0], [0.6, 0.8])
+    assert params[1:] == [25, "query", 25]
+
+    # Keyword search on the stored tsvector column
+    statement = repr(execute_prepared.call_args.args[1])
+    assert "Identifier('content_tsv_english')" in statement
+    assert "to_tsvector" not in statement
+    # Only the chunks in the query language, matching the partial index
+    assert "SQL(' AND language = '), Literal('english')" in statement
+
+    assert [item["chunk_id"] for item in response["items"]] == ["b", "a"]
+    assert response["items"][0]["sources"] == ["keyword_search", "vector_search"]
+    assert response["items"][0]["keyword_search_score"] == 0.5
+    assert [item["chunk_id"] for item in response["vector_search_items"]] == [
+        "a",
+        "b",
+    ]
+    assert response["query_language"] == "english"
+    assert set(response["timings"].keys()) == {
+        "embeddings",
+        "language_detection",
+        "hybrid_search",
+        "total",
+    }
+
+
+def test_query_workspace_aurora_vector_only_quantized(mocker, execute_prepared):
+    _set_rows(mocker, [_row("a", 0.1, None, 1, None, 1 / 61)])
+
+    response = query_workspace_aurora(
+        "workspace-id",
+        {**workspace, "hybrid_search": False, "vector_quantization": "binary"},
+        "query",
+        10,
+        full_response=False,
+    )
+
+    # The vector, the shortlist size and the limit
+    params = execute_prepared.call_args.args[2]
+    assert params[1:] == [200, 25]
+    assert [item["chunk_id"] for item in response["items"]] == ["a"]
+    assert "vector_search" in response["timings"]
+
+
+def test_query_workspace_aurora_hybrid_expression(mocker, execute_prepared):
+    _set_rows(mocker, [_row("a", 0.1, 0.5, 1, 1, 2 / 61)])
+
+    query_workspace_aurora(
+        "workspace-id",
+        {**workspace, "keyword_columns": False, "chunk_languages": False},
+        "query",
+        10,
+        full_response=False,
+    )
+
+    # Tables created before the stored columns
+    statement = repr(execute_prepared.call_args.args[1])
+    assert "to_tsvector(" in statement
+    assert "content_tsv_english" not in statement
+    assert "AND language" not in statement
+
+
+def test_query_workspace_aurora_filter(mocker, execute_prepared):
+    _set_rows(mocker, [_row("a", 0.1, 0.5, 1, 1, 2 / 61)])
+
+    query_workspace_aurora(
+        "workspace-id",
+        workspace,
+        "query",
+        10,
+        full_response=False,
+        filter=SearchFilter(document_type="website"),
+    )
+
+    # One parameter used by both searches
+    statement = repr(execute_prepared.call_args.args[1])
+    params = execute_prepared.call_args.args[2]
+    assert params[1:] == ["website", 25, "query", 25]
+    assert statement.count("SQL('document_type = '), SQL('$2')") == 2
+    assert "SQL(' WHERE '), Composed([Composed([SQL('document_type = ')" in statement
+
+
+def test_query_workspace_aurora_language_outside_workspace(mocker, execute_prepared):
+    _set_rows(mocker, [_row("a", 0.1, 0.5, 1, 1, 2 / 61)])
+
+    response = query_workspace_aurora(
+        "workspace-id",
+        {**workspace, "languages": ["french", "german"]},
+        "query",
+        10,
+        full_response=True,
+    )
+
+    # Detected as english, a language without a keyword column
+    statement = repr(execute_prepared.call_args.args[1])
+    assert "Identifier('content_tsv_french')" in statement
+    assert "content_tsv_english" not in statement
+    assert "Literal('french')" in statement
+    assert response["query_language"] == "french"
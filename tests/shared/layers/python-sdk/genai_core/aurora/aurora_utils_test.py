@@ -0,0 +1,105 @@
+import pytest
+import psycopg2.errors
+from datetime import datetime
+from psycopg2 import sql
+from genai_core.aurora.utils import (
+    StatementParameters,
+    execute_prepared,
+    get_filter_conditions,
+)
+from genai_core.types import CommonError, SearchFilter
+
+
+class FakeConnection(object):
+    pass
+
+
+class FakeCursor(object):
+    def __init__(self, connection, error=None):
+        self.connection = connection
+        self.error = error
+        self.queries = []
+
+    def execute(self, query, params):
+        # The first keyword of the statement
+        while isinstance(query, sql.Composed):
+            query = query.seq[0]
+        self.queries.append((query, params))
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+
+def test_statement_parameters():
+    params = StatementParameters()
+
+    assert params.add("a") == sql.SQL("$1")
+    assert params.add(2) == sql.SQL("$2")
+    assert params.values == ["a", 2]
+
+
+def test_execute_prepared_once_per_connection():
+    connection = FakeConnection()
+    statement = sql.SQL("SELECT $1")
+
+    execute_prepared(FakeCursor(connection), statement, [1])
+    cursor = FakeCursor(connection)
+    execute_prepared(cursor, statement, [2])
+    other_cursor = FakeCursor(FakeConnection())
+    execute_prepared(other_cursor, statement, [3])
+
+    assert cursor.queries == [(sql.SQL("EXECUTE "), [2])]
+    assert other_cursor.queries == [(sql.SQL("PREPARE "), [3])]
+
+
+def test_execute_prepared_already_prepared():
+    cursor = FakeCursor(
+        FakeConnection(), error=psycopg2.errors.DuplicatePreparedStatement()
+    )
+
+    execute_prepared(cursor, sql.SQL("SELECT 1"), [])
+
+    assert [query for query, _ in cursor.queries] == [
+        sql.SQL("PREPARE "),
+        sql.SQL("EXECUTE "),
+    ]
+
+
+def test_execute_prepared_settings():
+    cursor = FakeCursor(FakeConnection())
+    statement = sql.SQL("SELECT $1")
+
+    execute_prepared(cursor, statement, [1], settings={"hnsw.ef_search": 200})
+    execute_prepared(cursor, statement, [2])
+
+    # SET LOCAL only applies to the query string it is sent with
+    assert cursor.queries == [(sql.SQL("SET LOCAL "), [1]), (sql.SQL("EXECUTE "), [2])]
+
+
+def test_get_filter_conditions():
+    params = StatementParameters()
+    params.add("vector")
+
+    conditions = get_filter_conditions(
+        SearchFilter(
+            document_id="1E2D3C4B-5A69-4788-9A0B-1C2D3E4F5A6B",
+            path_prefix="https://example.com/100%_docs/",
+            created_before=datetime(2024, 6, 1),
+        ),
+        params,
+    )
+
+    assert [repr(condition) for condition in conditions] == [
+        "Composed([Identifier('document_id'), SQL(' = '), SQL('$2')])",
+        "Composed([SQL('path LIKE '), SQL('$3')])",
+        "Composed([SQL('created_at < '), SQL('$4')])",
+    ]
+    assert params.values[1:] == [
+        "1e2d3c4b-5a69-4788-9a0b-1c2d3e4f5a6b",
+        "https://example.com/100\\%\\_docs/%",
+        datetime(2024, 6, 1),
+    ]
+    assert get_filter_conditions(None, params) == []
+
+    with pytest.raises(CommonError, match="Invalid document_sub_id"):
+        get_filter_conditions(SearchFilter(document_sub_id="sub"), params)
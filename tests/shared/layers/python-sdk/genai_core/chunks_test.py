@@ -0,0 +1,167 @@
+import pytest
+import numpy as np
+from genai_core.chunks import add_chunks, get_chunk_hash
+from genai_core.types import CommonError
+
+workspace = {
+    "workspace_id": "workspace_id",
+    "engine": "aurora",
+    "embeddings_model_provider": "provider",
+    "embeddings_model_name": "name",
+}
+document = {
+    "document_id": "document_id",
+    "document_type": "file",
+    "document_sub_type": None,
+    "path": "file.txt",
+    "title": "title",
+}
+
+
+def _mock_engine(mocker, stored_hashes):
+    mocker.patch("genai_core.embeddings.get_embeddings_model")
+    mocker.patch("genai_core.chunks.store_chunks_on_s3")
+    mocker.patch(
+        "genai_core.embeddings.generate_embeddings",
+        side_effect=lambda model, input, task, as_array: np.ones(
+            (len(input), 1), dtype=np.float32
+        ),
+    )
+    mocker.patch(
+        "genai_core.aurora.chunks.get_chunk_hashes_aurora",
+        return_value=stored_hashes,
+    )
+    add = mocker.patch(
+        "genai_core.aurora.chunks.add_chunks_aurora",
+        side_effect=lambda **kwargs: {
+            "removed_vectors": 0,
+            "added_vectors": len(kwargs["chunk_ids"]),
+        },
+    )
+    delete = mocker.patch("genai_core.aurora.chunks.delete_chunks_aurora")
+    set_vectors = mocker.patch("genai_core.documents.set_document_vectors")
+    mocker.patch("genai_core.aurora.index.request_rebuild")
+
+    return add, delete, set_vectors
+
+
+def _hash(content):
+    return get_chunk_hash(None, "file.txt", "title", content, None)
+
+
+def test_add_chunks_delta_only_adds_changed_chunks(mocker):
+    stored_hashes = {"id-a": _hash("a"), "id-b": _hash("b"), "id-old": _hash("old")}
+    add, delete, set_vectors = _mock_engine(mocker, stored_hashes)
+
+    add_chunks(
+        replace=True,
+        workspace=workspace,
+        document=document,
+        document_sub_id=None,
+        chunks=["a", "b", "new"],
+        chunk_complements=None,
+        delta=True,
+    )
+
+    kwargs = add.call_args.kwargs
+    assert kwargs["chunks"] == ["new"]
+    assert kwargs["chunk_hashes"] == [_hash("new")]
+    assert kwargs["replace"] is False
+    delete.assert_called_once_with("workspace_id", ["id-old"])
+    # The document keeps the 2 unchanged chunks
+    set_vectors.assert_called_once_with("workspace_id", "document_id", 3, replace=True)
+
+
+def test_add_chunks_delta_keeps_duplicates(mocker):
+    add, delete, set_vectors = _mock_engine(mocker, {"id-a": _hash("a")})
+
+    add_chunks(
+        replace=True,
+        workspace=workspace,
+        document=document,
+        document_sub_id=None,
+        chunks=["a", "a"],
+        chunk_complements=None,
+        delta=True,
+    )
+
+    assert add.call_args.kwargs["chunks"] == ["a"]
+    delete.assert_called_once_with("workspace_id", [])
+    set_vectors.assert_called_once_with("workspace_id", "document_id", 2, replace=True)
+
+
+def test_add_chunks_replace_without_delta(mocker):
+    add, delete, set_vectors = _mock_engine(mocker, {"id-a": _hash("a")})
+
+    add_chunks(
+        replace=True,
+        workspace=workspace,
+        document=document,
+        document_sub_id=None,
+        chunks=["a", "b"],
+        chunk_complements=None,
+    )
+
+    kwargs = add.call_args.kwargs
+    assert kwargs["chunks"] == ["a", "b"]
+    assert kwargs["replace"] is True
+    delete.assert_not_called()
+    set_vectors.assert_called_once_with("workspace_id", "document_id", 2, replace=True)
+
+
+def test_add_chunks_languages(mocker):
+    add, _, _ = _mock_engine(mocker, {})
+
+    add_chunks(
+        replace=True,
+        workspace={**workspace, "languages": ["english", "german"]},
+        document=document,
+        document_sub_id=None,
+        chunks=["Where is the station?", "Wo ist der Bahnhof?", "42"],
+        chunk_complements=None,
+    )
+
+    # Chunks without any evidence get the first language of the workspace
+    assert add.call_args.kwargs["chunk_languages"] == ["english", "german", "english"]
+
+
+def test_add_chunks_requests_index_rebuild(mocker):
+    _mock_engine(mocker, {})
+    request_rebuild = mocker.patch(
+        "genai_core.aurora.index.request_rebuild", side_effect=Exception("error")
+    )
+
+    # The chunks are stored even if the rebuild cannot be requested
+    add_chunks(
+        replace=True,
+        workspace=workspace,
+        document=document,
+        document_sub_id=None,
+        chunks=["a"],
+        chunk_complements=None,
+    )
+
+    request_rebuild.assert_called_once_with(workspace)
+
+
+def test_add_chunks_failed_vectors(mocker):
+    add, delete, set_vectors = _mock_engine(mocker, {"id-a": _hash("a")})
+    add.side_effect = lambda **kwargs: {
+        "removed_vectors": 0,
+        "added_vectors": len(kwargs["chunk_ids"]) - 1,
+        "failed_vectors": 1,
+    }
+
+    with pytest.raises(CommonError, match="1 chunks"):
+        add_chunks(
+            replace=True,
+            workspace=workspace,
+            document=document,
+            document_sub_id=None,
+            chunks=["a", "b", "c"],
+            chunk_complements=None,
+            delta=True,
+        )
+
+    # Only the chunks actually stored are counted
+    set_vectors.assert_called_once_with("workspace_id", "document_id", 2, replace=True)
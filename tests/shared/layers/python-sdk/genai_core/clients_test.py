@@ -0,0 +1,143 @@
+import json
+import boto3
+import botocore
+import botocore.config
+import botocore.awsrequest
+import pytest
+import genai_core.clients
+from genai_core.clients import ConcurrencyLimiter, call_endpoint
+
+
+def _error(code: str):
+    return botocore.exceptions.ClientError({"Error": {"Code": code}}, "InvokeModel")
+
+
+@pytest.fixture(autouse=True)
+def clear_limiters():
+    genai_core.clients._limiters.clear()
+
+
+def test_limiter_additive_increase():
+    limiter = ConcurrencyLimiter("endpoint", initial_limit=2, max_limit=3)
+
+    for _ in range(3):
+        limiter.on_success()
+    assert limiter.get_metrics()["limit"] == 3
+
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.get_metrics()["limit"] == 3
+
+
+def test_limiter_decreases_once_per_round_trip():
+    limiter = ConcurrencyLimiter("endpoint", initial_limit=8, max_limit=16)
+
+    started_at = [limiter.acquire() for _ in range(4)]
+    for value in started_at:
+        limiter.release()
+        limiter.on_throttle(value)
+
+    # The four requests were in flight together, the limit is only halved once
+    metrics = limiter.get_metrics()
+    assert metrics["limit"] == 4
+    assert metrics["throttles"] == 4
+    assert metrics["in_flight"] == 0
+
+    limiter.on_throttle(limiter.acquire())
+    assert limiter.get_metrics()["limit"] == 2
+
+
+def test_call_endpoint_retries_when_throttled(mocker):
+    sleep = mocker.patch("genai_core.clients.time.sleep")
+    fn = mocker.Mock(side_effect=[_error("ThrottlingException"), "response"])
+
+    assert call_endpoint("endpoint", fn, body="body") == "response"
+    assert fn.call_count == 2
+    sleep.assert_called_once()
+
+    metrics = genai_core.clients.get_concurrency_metrics()
+    assert metrics == [
+        {
+            "endpoint": "endpoint",
+            "limit": 2,
+            "in_flight": 0,
+            "successes": 1,
+            "throttles": 1,
+        }
+    ]
+
+
+def test_call_endpoint_raises_after_max_attempts(mocker):
+    mocker.patch("genai_core.clients.time.sleep")
+    fn = mocker.Mock(side_effect=_error("ServiceUnavailableException"))
+
+    with pytest.raises(botocore.exceptions.ClientError):
+        call_endpoint("endpoint", fn)
+    assert fn.call_count == genai_core.clients.ENDPOINTS_MAX_ATTEMPTS
+
+
+def test_call_endpoint_raises_other_errors(mocker):
+    fn = mocker.Mock(side_effect=_error("ValidationException"))
+
+    with pytest.raises(botocore.exceptions.ClientError):
+        call_endpoint("endpoint", fn)
+    assert fn.call_count == 1
+
+
+class _RawResponse(object):
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+def test_register_concurrency_control():
+    client = boto3.client(
+        "bedrock-runtime",
+        region_name="us-east-1",
+        aws_access_key_id="key",
+        aws_secret_access_key="secret",  # nosec B106
+        config=botocore.config.Config(retries={"total_max_attempts": 1}),
+    )
+    genai_core.clients.register_concurrency_control(client, "bedrock:model")
+
+    responses = [
+        (200, b"{}"),
+        (429, json.dumps({"message": "Too many requests"}).encode()),
+    ]
+
+    def send(request, **kwargs):
+        status_code, body = responses.pop(0)
+        headers = {"x-amzn-ErrorType": "ThrottlingException"}
+        return botocore.awsrequest.AWSResponse(
+            request.url,
+            status_code,
+            headers if status_code != 200 else {},
+            _RawResponse(body),
+        )
+
+    client.meta.events.register("before-send", send)
+    client.invoke_model(modelId="model", body="{}")
+    with pytest.raises(botocore.exceptions.ClientError):
+        client.invoke_model(modelId="model", body="{}")
+
+    limiter = genai_core.clients.get_concurrency_limiter("bedrock:model")
+    metrics = limiter.get_metrics()
+    assert metrics["in_flight"] == 0
+    assert metrics["successes"] == 1
+    assert metrics["throttles"] == 1
+
+
+def test_get_bedrock_client_retries(mocker):
+    mocker.patch(
+        "genai_core.parameters.get_config",
+        return_value={"bedrock": {"enabled": True, "region": "us-east-1"}},
+    )
+
+    # Throttling of call_endpoint requests reaches the endpoint limiter
+    client = genai_core.clients.get_bedrock_client(retries=False)
+    assert client.meta.config.retries["total_max_attempts"] == 1
+
+    client = genai_core.clients.get_bedrock_client()
+    assert "total_max_attempts" not in (client.meta.config.retries or {})
@@ -0,0 +1,121 @@
+import io
+import json
+import pytest
+import genai_core.cross_encoder
+import genai_core.fusion
+from genai_core.cross_encoder import rank_passages, rerank_items
+from genai_core.types import CommonError, CrossEncoderModel
+
+model = CrossEncoderModel(**{"provider": "sagemaker", "name": "model"})
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    genai_core.cross_encoder.score_cache.clear()
+
+
+@pytest.fixture
+def client(mocker):
+    client = mocker.Mock()
+
+    def invoke_endpoint(Body, **kwargs):
+        request = json.loads(Body)
+        scores = [float(len(passage)) for passage in request["passages"]]
+
+        return {"Body": io.BytesIO(json.dumps(scores).encode())}
+
+    client.invoke_endpoint.side_effect = invoke_endpoint
+    mocker.patch("genai_core.clients.get_sagemaker_client", return_value=client)
+
+    return client
+
+
+def _sent_passages(client):
+    return json.loads(client.invoke_endpoint.call_args.kwargs["Body"])["passages"]
+
+
+def test_rank_passages_only_sends_uncached_passages(client):
+    assert rank_passages(model, "query", ["a", "bb"]) == [1.0, 2.0]
+    assert rank_passages(model, " query\n", ["ccc", "bb", "a", "ccc"]) == [
+        3.0,
+        2.0,
+        1.0,
+        3.0,
+    ]
+
+    assert client.invoke_endpoint.call_count == 2
+    assert _sent_passages(client) == ["ccc"]
+
+
+def test_rank_passages_cache_depends_on_query(client):
+    rank_passages(model, "query", ["a"])
+    rank_passages(model, "other query", ["a"])
+
+    assert client.invoke_endpoint.call_count == 2
+
+
+def test_rank_passages_full_hit(client):
+    rank_passages(model, "query", ["a", "bb"])
+    assert rank_passages(model, "query", ["bb", "a"]) == [2.0, 1.0]
+
+    assert client.invoke_endpoint.call_count == 1
+
+
+def test_rank_passages_unknown_provider():
+    with pytest.raises(CommonError):
+        rank_passages(
+            CrossEncoderModel(**{"provider": "other", "name": "model"}), "q", ["a"]
+        )
+
+
+def _hits(vector, keyword=()):
+    records = [({"chunk_id": id, "content": id}, None) for id in vector]
+    keyword_records = [({"chunk_id": id, "content": id}, None) for id in keyword]
+
+    return genai_core.fusion.fuse(genai_core.fusion.merge(records, keyword_records))
+
+
+def _chunk_ids(hits):
+    return [hit.chunk_id for hit in hits]
+
+
+def test_rerank_items_all(client):
+    hits, reranked = rerank_items(model, "query", _hits(["a", "ccc", "bb"]))
+
+    assert reranked is True
+    assert _chunk_ids(hits) == ["ccc", "bb", "a"]
+    assert _sent_passages(client) == ["a", "ccc", "bb"]
+
+
+def test_rerank_items_cascade_top_n(client):
+    hits = _hits(["a", "bb", "dddd"], ["ccc", "bb"])
+
+    hits, reranked = rerank_items(model, "query", hits, top_n=2, skip_gap=0.9)
+
+    # bb is in both lists, it is fused first; only the top 2 are reranked
+    assert reranked is True
+    assert _sent_passages(client) == ["bb", "a"]
+    assert _chunk_ids(hits) == ["bb", "a", "ccc", "dddd"]
+    assert [hit.score for hit in hits] == [2.0, 1.0, None, None]
+
+
+def test_rerank_items_cascade_skips_decisive_first_stage(client):
+    hits, reranked = rerank_items(
+        model, "query", _hits(["a", "bb"], ["a"]), top_n=2, skip_gap=0.3
+    )
+
+    assert reranked is False
+    assert _chunk_ids(hits) == ["a", "bb"]
+    client.invoke_endpoint.assert_not_called()
+
+
+def test_rerank_items_skip_gap_without_top_n(client):
+    hits, reranked = rerank_items(
+        model, "query", _hits(["a", "bb"], ["a"]), skip_gap=0.3
+    )
+
+    assert reranked is False
+    client.invoke_endpoint.assert_not_called()
+
+    hits, reranked = rerank_items(model, "query", _hits(["a", "bb"]), skip_gap=0.9)
+    assert reranked is True
@@ -0,0 +1,72 @@
+import pytest
+from genai_core.fusion import fuse, get_source_hits, merge, select
+from genai_core.types import CommonError
+
+
+def _records(*values):
+    return [
+        ({"chunk_id": chunk_id, "content": chunk_id}, score)
+        for chunk_id, score in values
+    ]
+
+
+def _chunk_ids(hits):
+    return [hit.chunk_id for hit in hits]
+
+
+def test_merge():
+    hits = merge(_records(("a", 0.9), ("b", 0.8)), _records(("b", 3.0), ("c", 2.0)))
+
+    assert _chunk_ids(hits) == ["a", "b", "c"]
+    assert hits[1].to_dict() == {
+        "chunk_id": "b",
+        "content": "b",
+        "sources": ["keyword_search", "vector_search"],
+        "vector_search_score": 0.8,
+        "keyword_search_score": 3.0,
+        "score": None,
+    }
+    assert _chunk_ids(get_source_hits(hits, "keyword_search")) == ["b", "c"]
+
+
+def test_fuse_rrf():
+    hits = merge(_records(("a", 0.9), ("b", 0.8)), _records(("b", 3.0), ("c", 2.0)))
+    hits = fuse(hits, "rrf")
+
+    assert _chunk_ids(hits) == ["b", "a", "c"]
+    assert hits[0].fused_score == pytest.approx(1 / 61 + 1 / 62)
+    assert hits[2].fused_score == pytest.approx(1 / 62)
+
+
+def test_fuse_linear_with_distances(mocker):
+    mocker.patch("genai_core.fusion.HYBRID_SEARCH_VECTOR_WEIGHT", 0.75)
+    hits = merge(
+        _records(("a", 0.1), ("b", 0.2), ("c", 0.5)), _records(("c", 1.0), ("b", 0.5))
+    )
+    hits = fuse(hits, "linear", vector_higher_is_better=False)
+
+    # a: 0.75 * 1, b: 0.75 * 0.75, c: 0.25 * 1
+    assert _chunk_ids(hits) == ["a", "b", "c"]
+    assert [hit.fused_score for hit in hits] == pytest.approx([0.75, 0.5625, 0.25])
+
+
+def test_fuse_unknown_method():
+    with pytest.raises(CommonError):
+        fuse(merge(_records(("a", 0.9)), []), "other")
+
+
+def test_select_fills_with_vector_hits():
+    hits = merge(_records(("a", 0.9), ("b", 0.4), ("c", 0.7)), _records(("d", 3.0)))
+    hits[0].score = 0.2
+    hits[1].score = -0.5
+
+    selected = select(hits, 3, 0, reranked=True)
+
+    # c has the best vector score above 0.5, b and d are left out
+    assert _chunk_ids(selected) == ["a", "c"]
+
+
+def test_select_inner_product():
+    hits = merge(_records(("a", -0.6), ("b", -0.9)), [])
+
+    assert _chunk_ids(select(hits, 2, 0, reranked=True, vector_sign=-1)) == ["b", "a"]
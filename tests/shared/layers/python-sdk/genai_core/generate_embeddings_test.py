@@ -0,0 +1,213 @@
+import io
+import json
+import time
+import random
+import botocore
+import pytest
+import numpy as np
+import genai_core.embeddings_cache
+from genai_core.embeddings import generate_embeddings, plan_batches
+from genai_core.types import EmbeddingsModel, Task
+
+titan_model = EmbeddingsModel(
+    **{"provider": "bedrock", "name": "amazon.titan-embed-text-v1", "dimensions": 2}
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    genai_core.embeddings_cache.memory_cache.clear()
+
+
+def _titan_response(text: str):
+    # Sleep a random amount so that completion order differs from input order
+    time.sleep(random.uniform(0, 0.01))  # nosec B311
+    body = json.dumps({"embedding": [float(len(text)), 1.0]})
+    return {"body": io.BytesIO(body.encode())}
+
+
+def test_generate_embeddings_amazon_keeps_order(mocker):
+    bedrock = mocker.Mock()
+    bedrock.invoke_model.side_effect = lambda body, **kwargs: _titan_response(
+        json.loads(body)["inputText"]
+    )
+    mocker.patch("genai_core.clients.get_bedrock_client", return_value=bedrock)
+
+    input = ["a" * (i + 1) for i in range(20)]
+    response = generate_embeddings(titan_model, input)
+
+    assert bedrock.invoke_model.call_count == 20
+    assert len(response) == 20
+    # Embeddings are normalised, the ratio between both axes is the text length
+    for idx, vector in enumerate(response):
+        assert vector[0] / vector[1] == pytest.approx(idx + 1)
+
+
+def test_generate_embeddings_amazon_concurrency_limit(mocker, monkeypatch):
+    monkeypatch.setenv("EMBEDDINGS_MAX_CONCURRENCY_AMAZON", "1")
+    bedrock = mocker.Mock()
+    bedrock.invoke_model.side_effect = lambda body, **kwargs: _titan_response("a")
+    mocker.patch("genai_core.clients.get_bedrock_client", return_value=bedrock)
+    executor = mocker.patch("genai_core.embeddings.ThreadPoolExecutor")
+
+    response = generate_embeddings(titan_model, ["a", "b", "c"])
+
+    assert len(response) == 3
+    executor.assert_not_called()
+
+
+def test_generate_embeddings_amazon_retries_when_throttled(mocker):
+    throttled = botocore.exceptions.ClientError(
+        {"Error": {"Code": "ThrottlingException"}}, "InvokeModel"
+    )
+    bedrock = mocker.Mock()
+    bedrock.invoke_model.side_effect = [throttled, _titan_response("a")]
+    mocker.patch("genai_core.clients.get_bedrock_client", return_value=bedrock)
+    sleep = mocker.patch("genai_core.clients.time.sleep")
+
+    response = generate_embeddings(titan_model, ["a"])
+
+    assert response == [pytest.approx([2**-0.5, 2**-0.5])]
+    assert bedrock.invoke_model.call_count == 2
+    sleep.assert_called_once()
+
+
+def test_generate_embeddings_amazon_raises_other_errors(mocker):
+    error = botocore.exceptions.ClientError(
+        {"Error": {"Code": "ValidationException"}}, "InvokeModel"
+    )
+    bedrock = mocker.Mock()
+    bedrock.invoke_model.side_effect = error
+    mocker.patch("genai_core.clients.get_bedrock_client", return_value=bedrock)
+
+    with pytest.raises(botocore.exceptions.ClientError):
+        generate_embeddings(titan_model, ["a"])
+    assert bedrock.invoke_model.call_count == 1
+
+
+def test_generate_embeddings_sagemaker_raises_when_unavailable(mocker):
+    error = botocore.exceptions.ClientError(
+        {"Error": {"Code": "ServiceUnavailableException"}}, "InvokeEndpoint"
+    )
+    client = mocker.Mock()
+    client.invoke_endpoint.side_effect = error
+    mocker.patch("genai_core.clients.get_sagemaker_client", return_value=client)
+    mocker.patch("genai_core.clients.time.sleep")
+    model = EmbeddingsModel(
+        **{"provider": "sagemaker", "name": "model", "dimensions": 2}
+    )
+
+    # The last error is raised instead of returning no embeddings
+    with pytest.raises(botocore.exceptions.ClientError):
+        generate_embeddings(model, ["a"])
+
+
+def test_generate_embeddings_uses_cache(mocker):
+    bedrock = mocker.Mock()
+    bedrock.invoke_model.side_effect = lambda body, **kwargs: _titan_response(
+        json.loads(body)["inputText"]
+    )
+    mocker.patch("genai_core.clients.get_bedrock_client", return_value=bedrock)
+
+    first = generate_embeddings(titan_model, ["a", "bb", "a"])
+    # Duplicated texts are only embedded once
+    assert bedrock.invoke_model.call_count == 2
+
+    second = generate_embeddings(titan_model, ["bb", "a", "ccc"])
+    assert bedrock.invoke_model.call_count == 3
+    assert second[0] == first[1]
+    assert second[1] == first[0]
+
+    stats = genai_core.embeddings_cache.get_cache_stats()
+    assert stats["memory"]["size"] == 3
+    assert stats["persistent"]["enabled"] is False
+
+
+def test_generate_embeddings_cache_key_depends_on_task():
+    query_key = genai_core.embeddings_cache.get_cache_key(
+        titan_model, Task.RETRIEVE, "text"
+    )
+    document_key = genai_core.embeddings_cache.get_cache_key(
+        titan_model, Task.STORE, "text"
+    )
+
+    assert query_key != document_key
+
+
+def test_plan_batches_uses_provider_item_limit():
+    cohere_model = EmbeddingsModel(
+        **{"provider": "bedrock", "name": "cohere.embed-english-v3", "dimensions": 2}
+    )
+    input = [str(i) for i in range(200)]
+
+    batches = plan_batches(cohere_model, input)
+
+    assert [len(batch) for batch in batches] == [96, 96, 8]
+    assert [value for batch in batches for value in batch] == input
+    assert len(plan_batches(cohere_model, input, batch_size=50)) == 4
+
+
+def test_plan_batches_uses_provider_token_and_byte_limits(mocker):
+    sagemaker_model = EmbeddingsModel(
+        **{"provider": "sagemaker", "name": "model", "dimensions": 2}
+    )
+    mocker.patch.dict(
+        "genai_core.embeddings.REQUEST_LIMITS",
+        {"sagemaker": {"items": 64, "tokens": 100, "bytes": 1000}},
+    )
+
+    # 90 bytes per text, 31 estimated tokens, 3 texts fit in 100 tokens
+    assert [len(batch) for batch in plan_batches(sagemaker_model, ["a" * 90] * 7)] == [
+        3,
+        3,
+        1,
+    ]
+    # 300 characters of json per text, 3 texts fit in 1000 bytes
+    assert [len(batch) for batch in plan_batches(sagemaker_model, ["é" * 49] * 4)] == [
+        3,
+        1,
+    ]
+
+
+def test_plan_batches_does_not_batch_per_item_providers():
+    batches = plan_batches(titan_model, ["a"] * 120)
+
+    assert len(batches) == 1
+
+
+def test_generate_embeddings_as_array(mocker):
+    bedrock = mocker.Mock()
+    bedrock.invoke_model.side_effect = lambda body, **kwargs: _titan_response(
+        json.loads(body)["inputText"]
+    )
+    mocker.patch("genai_core.clients.get_bedrock_client", return_value=bedrock)
+
+    first = generate_embeddings(titan_model, ["a", "bb"], as_array=True)
+    assert first.dtype == np.float32
+    assert first.shape == (2, 2)
+    assert first.flags["C_CONTIGUOUS"]
+
+    # Mix of cached and generated rows
+    second = generate_embeddings(titan_model, ["ccc", "a"], as_array=True)
+    assert second.shape == (2, 2)
+    assert np.array_equal(second[1], first[0])
+
+    empty = generate_embeddings(titan_model, [], as_array=True)
+    assert empty.shape == (0, 2)
+
+
+def test_generate_embeddings_caches_row_copies(mocker):
+    bedrock = mocker.Mock()
+    bedrock.invoke_model.side_effect = lambda body, **kwargs: _titan_response(
+        json.loads(body)["inputText"]
+    )
+    mocker.patch("genai_core.clients.get_bedrock_client", return_value=bedrock)
+
+    first = generate_embeddings(titan_model, ["a", "bb"], as_array=True)
+    expected = first[0].tolist()
+    first[0, 0] = 42.0
+
+    key = genai_core.embeddings_cache.get_cache_key(titan_model, Task.STORE, "a")
+    # Not a view on the returned matrix
+    assert genai_core.embeddings_cache.memory_cache.get(key).base is None
+    assert generate_embeddings(titan_model, ["a"]) == [expected]
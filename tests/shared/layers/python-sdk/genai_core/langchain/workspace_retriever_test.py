@@ -0,0 +1,41 @@
+from genai_core.langchain import WorkspaceRetriever
+
+
+def _item(chunk_id: str):
+    return {
+        "chunk_id": chunk_id,
+        "workspace_id": "workspace-id",
+        "document_id": "d",
+        "document_sub_id": None,
+        "document_type": "text",
+        "document_sub_type": None,
+        "path": "p",
+        "title": "t",
+        "content": chunk_id,
+        "score": 0.5,
+    }
+
+
+def test_workspace_retriever_search_filter(mocker):
+    search = mocker.patch(
+        "genai_core.semantic_search.semantic_search",
+        return_value={"items": [_item("a")]},
+    )
+    retriever = WorkspaceRetriever(
+        workspace_id="workspace-id", search_filter={"document_type": "website"}
+    )
+
+    documents = retriever.invoke("query")
+
+    assert search.call_args.kwargs["filter"] == {"document_type": "website"}
+    assert [document.page_content for document in documents] == ["a"]
+
+
+def test_workspace_retriever_without_filter(mocker):
+    search = mocker.patch(
+        "genai_core.semantic_search.semantic_search", return_value={"items": []}
+    )
+
+    WorkspaceRetriever(workspace_id="workspace-id").invoke("query")
+
+    assert search.call_args.kwargs["filter"] is None
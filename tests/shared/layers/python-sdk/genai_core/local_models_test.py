@@ -0,0 +1,110 @@
+import pytest
+import numpy as np
+import genai_core.local_models
+from types import SimpleNamespace
+from genai_core.embeddings import generate_embeddings
+from genai_core.cross_encoder import rank_passages
+from genai_core.types import CommonError, CrossEncoderModel, EmbeddingsModel
+
+
+class FakeTokenizer(object):
+    def __init__(self):
+        self.inputs = []
+
+    def encode_batch(self, values):
+        self.inputs.extend(values)
+        return [
+            SimpleNamespace(ids=[5] * len(str(value)), type_ids=[0] * len(str(value)))
+            for value in values
+        ]
+
+    def token_to_id(self, token):
+        return 1 if token == "<pad>" else None
+
+
+class FakeSession(object):
+    def __init__(self, output):
+        self.output = output
+        self.features = []
+
+    def get_inputs(self):
+        return [
+            SimpleNamespace(name="input_ids"),
+            SimpleNamespace(name="attention_mask"),
+        ]
+
+    def run(self, output_names, features):
+        self.features.append(features)
+        return [self.output(features)]
+
+
+@pytest.fixture
+def load_model(mocker):
+    return mocker.patch("genai_core.local_models._load_model")
+
+
+@pytest.fixture(autouse=True)
+def clear_models():
+    genai_core.local_models._models.clear()
+
+
+def test_embed_pools_the_tokens_of_each_text(load_model, mocker):
+    mocker.patch("genai_core.local_models.LOCAL_MODELS_BATCH_SIZE", 2)
+
+    def output(features):
+        # The padded tokens would point in another direction
+        mask = features["attention_mask"][..., np.newaxis]
+        return np.where(mask == 1, [3.0, 4.0], [100.0, 0.0])
+
+    session = FakeSession(output)
+    tokenizer = FakeTokenizer()
+    load_model.return_value = (session, tokenizer)
+
+    embeddings = genai_core.local_models.embed(
+        "intfloat/multilingual-e5-large", ["a", "bbb", "cc"]
+    )
+
+    assert embeddings.dtype == np.float32
+    assert embeddings.shape == (3, 2)
+    assert embeddings == pytest.approx(np.array([[0.6, 0.8]] * 3))
+    assert tokenizer.inputs == ["query: a", "query: bbb", "query: cc"]
+    assert len(session.features) == 2
+    # Padded with the pad token of the tokenizer, unknown inputs are not sent
+    assert session.features[0]["input_ids"][0][-1] == 1
+    assert "token_type_ids" not in session.features[0]
+    load_model.assert_called_once_with("multilingual-e5-large")
+
+
+def test_rank_returns_the_last_logit(load_model):
+    def output(features):
+        lengths = features["attention_mask"].sum(axis=1)
+        return np.stack([np.zeros(len(lengths)), lengths], axis=1)
+
+    load_model.return_value = (FakeSession(output), FakeTokenizer())
+
+    scores = genai_core.local_models.rank("model", "q", ["a", "bb"])
+
+    # Pairs are tokenized together, the fake tokenizer counts the tuple text
+    assert scores == [float(len(str(("q", "a")))), float(len(str(("q", "bb"))))]
+
+
+def test_local_provider_dispatch(mocker):
+    mocker.patch(
+        "genai_core.local_models.embed",
+        side_effect=lambda name, input: np.ones((len(input), 2), dtype=np.float32),
+    )
+    rank = mocker.patch("genai_core.local_models.rank", return_value=[0.5])
+    model = EmbeddingsModel(**{"provider": "local", "name": "m", "dimensions": 2})
+
+    assert generate_embeddings(model, ["local a", "local b"]) == [[1, 1], [1, 1]]
+    assert rank_passages(
+        CrossEncoderModel(**{"provider": "local", "name": "m"}), "q", ["local a"]
+    ) == [0.5]
+    rank.assert_called_once_with("m", "q", ["local a"])
+
+
+def test_local_models_not_enabled(mocker):
+    mocker.patch("genai_core.local_models.LOCAL_MODELS_PATH", None)
+
+    with pytest.raises(CommonError, match="not enabled"):
+        genai_core.local_models.embed("model", ["a"])
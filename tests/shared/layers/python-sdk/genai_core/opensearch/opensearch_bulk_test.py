@@ -0,0 +1,112 @@
+import json
+import pytest
+import numpy as np
+import genai_core.opensearch.bulk
+from opensearchpy.exceptions import TransportError
+from opensearchpy.serializer import JSONSerializer
+from genai_core.opensearch.chunks import add_chunks_open_search
+
+
+class FakeClient(object):
+    def __init__(self, statuses):
+        # One list of item statuses per request, the last one is repeated
+        self.statuses = statuses
+        self.requests = []
+        self.transport = type("Transport", (), {"serializer": JSONSerializer()})()
+
+    def bulk(self, index, body):
+        lines = body.strip().split("\n")
+        self.requests.append(lines)
+        statuses = self.statuses[min(len(self.requests), len(self.statuses)) - 1]
+        if isinstance(statuses, Exception):
+            raise statuses
+
+        items = [
+            json.loads(line) for line in lines if "index" in line or "delete" in line
+        ]
+        return {
+            "items": [
+                {next(iter(item.keys())): {"status": status}}
+                for item, status in zip(items, statuses + [201] * len(items))
+            ]
+        }
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(mocker):
+    mocker.patch("genai_core.opensearch.bulk.OPEN_SEARCH_BULK_BACKOFF", 0)
+
+
+def _actions(count):
+    return [({"index": {}}, {"content": str(idx)}) for idx in range(count)]
+
+
+def test_bulk_batches_by_count_and_size(mocker):
+    mocker.patch("genai_core.opensearch.bulk.OPEN_SEARCH_BULK_SIZE", 2)
+    client = FakeClient([[]])
+
+    result = genai_core.opensearch.bulk.bulk(client, "index", _actions(5))
+
+    assert result.succeeded == 5
+    assert sorted(len(lines) for lines in client.requests) == [2, 4, 4]
+
+    mocker.patch("genai_core.opensearch.bulk.OPEN_SEARCH_BULK_SIZE", 500)
+    mocker.patch("genai_core.opensearch.bulk.OPEN_SEARCH_BULK_MAX_BYTES", 40)
+    client = FakeClient([[]])
+    genai_core.opensearch.bulk.bulk(client, "index", _actions(3))
+
+    # One action is 31 bytes
+    assert len(client.requests) == 3
+
+
+def test_bulk_retries_failed_items(mocker):
+    mocker.patch("genai_core.opensearch.bulk.OPEN_SEARCH_BULK_MAX_RETRIES", 2)
+    client = FakeClient(
+        [
+            TransportError(503, "unavailable"),
+            [201, 429, 400, 503],
+            [429, 201],
+        ]
+    )
+
+    result = genai_core.opensearch.bulk.bulk(client, "index", _actions(4))
+
+    # The 400 is not retried, the 429 fails after the last retry
+    assert [len(lines) for lines in client.requests] == [8, 8, 4]
+    assert result.succeeded == 2
+    assert result.failed == 2
+
+
+def test_bulk_raises_non_retryable_errors():
+    client = FakeClient([TransportError(403, "forbidden")])
+
+    with pytest.raises(TransportError):
+        genai_core.opensearch.bulk.bulk(client, "index", _actions(1))
+
+
+def test_add_chunks_open_search_uses_bulk(mocker):
+    client = FakeClient([[201, 400]])
+    mocker.patch(
+        "genai_core.opensearch.chunks.get_open_search_client", return_value=client
+    )
+
+    result = add_chunks_open_search(
+        workspace_id="workspace-id",
+        document_id="document_id",
+        document_sub_id=None,
+        document_type="file",
+        document_sub_type=None,
+        path="file.txt",
+        title="title",
+        chunk_ids=["1", "2", "3"],
+        chunk_embeddings=np.ones((3, 2), dtype=np.float32),
+        chunks=["a", "b", "c"],
+        chunk_complements=None,
+        replace=False,
+        chunk_hashes=["h1", "h2", "h3"],
+    )
+
+    assert len(client.requests) == 1
+    assert json.loads(client.requests[0][1])["content_embeddings"] == [1.0, 1.0]
+    assert json.loads(client.requests[0][1])["metadata"] == {"content_hash": "h1"}
+    assert result == {"removed_vectors": 0, "added_vectors": 2, "failed_vectors": 1}
@@ -0,0 +1,69 @@
+import json
+import pytest
+from opensearchpy.serializer import JSONSerializer
+from genai_core.opensearch.chunks import (
+    clean_chunks_open_search,
+    delete_chunks_open_search,
+)
+from genai_core.types import CommonError
+
+
+class FakeClient(object):
+    def __init__(self, ids, statuses=None):
+        self.ids = ids
+        self.statuses = statuses or {}
+        self.searches = []
+        self.deleted = []
+        self.transport = type("Transport", (), {"serializer": JSONSerializer()})()
+
+    def search(self, index, body):
+        self.searches.append(json.loads(json.dumps(body)))
+        after = body.get("search_after", [""])[0]
+        ids = [id for id in sorted(self.ids) if id > after][: body["size"]]
+
+        return {"hits": {"hits": [{"_id": id, "sort": [id]} for id in ids]}}
+
+    def bulk(self, index, body):
+        ids = [json.loads(line)["delete"]["_id"] for line in body.strip().split("\n")]
+        self.deleted.extend(ids)
+
+        return {
+            "items": [{"delete": {"status": self.statuses.get(id, 200)}} for id in ids]
+        }
+
+
+@pytest.fixture
+def client(mocker):
+    mocker.patch("genai_core.opensearch.chunks.SEARCH_PAGE_SIZE", 2)
+    mocker.patch("genai_core.opensearch.bulk.OPEN_SEARCH_BULK_BACKOFF", 0)
+    client = FakeClient(["a", "b", "c", "d", "e"])
+    mocker.patch(
+        "genai_core.opensearch.chunks.get_open_search_client", return_value=client
+    )
+
+    return client
+
+
+def test_clean_chunks_open_search_deletes_every_page(client):
+    assert clean_chunks_open_search("workspace-id", "document_id") == 5
+
+    assert sorted(client.deleted) == ["a", "b", "c", "d", "e"]
+    assert len(client.searches) == 3
+    assert client.searches[0]["_source"] is False
+    assert client.searches[0]["query"]["bool"]["filter"] == [
+        {"term": {"workspace_id": "workspace-id"}},
+        {"term": {"document_id": "document_id"}},
+    ]
+
+
+def test_delete_chunks_open_search_counts_deleted_chunks(client):
+    client.statuses = {"b": 404}
+
+    assert delete_chunks_open_search("workspace-id", ["a", "b"]) == 1
+
+
+def test_delete_chunks_open_search_failure(client):
+    client.statuses = {"b": 400}
+
+    with pytest.raises(CommonError, match="1 of 2 chunks"):
+        delete_chunks_open_search("workspace-id", ["a", "b"])
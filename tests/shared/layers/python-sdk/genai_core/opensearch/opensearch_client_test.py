@@ -0,0 +1,29 @@
+import pytest
+import genai_core.opensearch.client
+from genai_core.opensearch.client import get_open_search_client
+
+
+@pytest.fixture(autouse=True)
+def clear_clients(mocker):
+    mocker.patch(
+        "genai_core.opensearch.client.OPEN_SEARCH_COLLECTION_ENDPOINT",
+        "https://collection.us-east-1.aoss.amazonaws.com",
+    )
+    genai_core.opensearch.client._clients.clear()
+
+
+def test_get_open_search_client_is_cached(mocker):
+    session = mocker.patch("genai_core.opensearch.client.boto3.Session")
+    session.return_value.region_name = "us-east-1"
+
+    client = get_open_search_client()
+
+    assert get_open_search_client() is client
+    session.assert_called_once()
+    connection = client.transport.connection_pool.connections[0]
+    assert connection.host == "https://collection.us-east-1.aoss.amazonaws.com:443"
+    # The signer keeps the refreshable credentials, not a frozen copy
+    assert (
+        connection.session.auth.signer.credentials
+        is session.return_value.get_credentials.return_value
+    )
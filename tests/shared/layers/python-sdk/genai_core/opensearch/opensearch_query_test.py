@@ -0,0 +1,137 @@
+import pytest
+import genai_core.embeddings_cache
+from genai_core.types import CommonError
+from genai_core.opensearch.query import query_workspace_open_search
+from genai_core.types import SearchFilter
+
+workspace = {
+    "embeddings_model_provider": "bedrock",
+    "embeddings_model_name": "amazon.titan-embed-text-v1",
+    "cross_encoder_model_provider": None,
+    "cross_encoder_model_name": None,
+    "hybrid_search": True,
+    "languages": ["english"],
+    "path_keyword": True,
+}
+
+
+def _hit(chunk_id: str, score: float):
+    return {"_score": score, "_source": {"chunk_id": chunk_id, "content": chunk_id}}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    genai_core.embeddings_cache.memory_cache.clear()
+
+
+@pytest.fixture
+def client(mocker):
+    client = mocker.Mock()
+
+    def search(index, body, size):
+        if "knn" in str(body["query"]):
+            return {"hits": {"hits": [_hit("a", 0.9), _hit("b", 0.8)]}}
+        return {"hits": {"hits": [_hit("b", 3.0), _hit("c", 2.0)]}}
+
+    client.search.side_effect = search
+    mocker.patch(
+        "genai_core.opensearch.query.get_open_search_client", return_value=client
+    )
+    mocker.patch(
+        "genai_core.embeddings.get_embeddings_model",
+        return_value=genai_core.embeddings.EmbeddingsModel(
+            provider="bedrock", name="amazon.titan-embed-text-v1", dimensions=2
+        ),
+    )
+    mocker.patch("genai_core.embeddings.generate_embeddings", return_value=[[0.6, 0.8]])
+
+    return client
+
+
+def test_query_workspace_open_search_hybrid(client):
+    response = query_workspace_open_search(
+        "workspace-id", workspace, "query", 10, full_response=True
+    )
+
+    assert client.search.call_count == 2
+    # b is found by both searches, it is fused first
+    assert [item["chunk_id"] for item in response["items"]] == ["b", "a", "c"]
+    assert response["items"][0]["sources"] == ["keyword_search", "vector_search"]
+    assert response["items"][0]["keyword_search_score"] == 3.0
+    assert [item["chunk_id"] for item in response["vector_search_items"]] == [
+        "a",
+        "b",
+    ]
+    assert set(response["timings"].keys()) == {
+        "embeddings",
+        "vector_search",
+        "keyword_search",
+        "total",
+    }
+
+
+def test_query_workspace_open_search_vector_only(client):
+    response = query_workspace_open_search(
+        "workspace-id",
+        {**workspace, "hybrid_search": False},
+        "query",
+        10,
+        full_response=False,
+    )
+
+    assert client.search.call_count == 1
+    assert [item["chunk_id"] for item in response["items"]] == ["a", "b"]
+    assert "keyword_search" not in response["timings"]
+
+
+def test_query_workspace_open_search_filter(client):
+    filter = SearchFilter(document_id="d", path_prefix="https://example.com/")
+    query_workspace_open_search(
+        "workspace-id", workspace, "query", 10, full_response=False, filter=filter
+    )
+
+    clauses = [
+        {"term": {"document_id": "d"}},
+        {"prefix": {"path.keyword": "https://example.com/"}},
+    ]
+    queries = [call.kwargs["body"]["query"] for call in client.search.call_args_list]
+    vector, keyword = sorted(queries, key=lambda query: "match" in str(query))
+    # nmslib hits are filtered after the k-NN search
+    assert vector["bool"]["filter"] == clauses
+    assert "knn" in vector["bool"]["must"][0]
+    assert keyword["bool"]["filter"] == clauses
+    assert keyword["bool"]["must"] == [{"match": {"content": "query"}}]
+
+
+def test_query_workspace_open_search_filter_efficient(client):
+    filter = SearchFilter(created_after="2024-01-01T00:00:00Z")
+    query_workspace_open_search(
+        "workspace-id",
+        {**workspace, "hybrid_search": False, "vector_quantization": "fp16"},
+        "query",
+        10,
+        full_response=False,
+        filter=filter,
+    )
+
+    # faiss applies the filter during the k-NN search
+    knn = client.search.call_args.kwargs["body"]["query"]["knn"]["content_embeddings"]
+    assert knn["filter"] == {
+        "bool": {"filter": [{"range": {"created_at": {"gte": 1704067200000}}}]}
+    }
+
+
+def test_query_workspace_open_search_path_filter_legacy_index(client):
+    filter = SearchFilter(path_prefix="https://example.com/")
+
+    # Indexes created before path.keyword was mapped
+    with pytest.raises(CommonError):
+        query_workspace_open_search(
+            "workspace-id",
+            {**workspace, "path_keyword": False},
+            "query",
+            10,
+            full_response=False,
+            filter=filter,
+        )
+    client.search.assert_not_called()
@@ -0,0 +1,59 @@
+import numpy as np
+from genai_core.opensearch.utils import (
+    LEGACY_BYTE_VECTOR_SCALE,
+    calibrate_byte_vector_scale,
+    get_byte_vector_scale,
+    to_byte_vectors,
+)
+
+
+def _normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _top(query, vectors, k):
+    distances = np.sum(np.square(vectors - query), axis=1)
+    return set(np.argsort(distances)[:k].tolist())
+
+
+def _recall(scale, dimensions=1024, k=10):
+    """Share of the exact top k found by the byte vector top k."""
+    rng = np.random.default_rng(0)
+    topics = _normalize(rng.standard_normal((20, dimensions)))
+    # Clusters of close documents and a query near each cluster
+    documents = _normalize(
+        np.repeat(topics, 100, axis=0)
+        + 0.7 * _normalize(rng.standard_normal((2000, dimensions)))
+    )
+    queries = _normalize(
+        topics + 0.7 * _normalize(rng.standard_normal((20, dimensions)))
+    )
+
+    byte_documents = to_byte_vectors(documents, scale).astype(np.float32)
+    byte_queries = to_byte_vectors(queries, scale).astype(np.float32)
+
+    found = 0
+    for query, byte_query in zip(queries, byte_queries):
+        found += len(_top(query, documents, k) & _top(byte_query, byte_documents, k))
+
+    return found / (len(queries) * k)
+
+
+def test_calibrated_byte_vectors_keep_ranking():
+    scale = calibrate_byte_vector_scale(1024)
+
+    assert _recall(scale) >= 0.95
+    # A fixed scale maps the components of 1024 dimensions on a few levels
+    assert _recall(LEGACY_BYTE_VECTOR_SCALE) < 0.9
+
+
+def test_to_byte_vectors_clips():
+    vectors = to_byte_vectors([[1.0, -1.0, 0.01]], calibrate_byte_vector_scale(1024))
+
+    assert vectors.dtype == np.int8
+    assert vectors.tolist() == [[127, -128, 10]]
+
+
+def test_get_byte_vector_scale():
+    assert get_byte_vector_scale({}) == LEGACY_BYTE_VECTOR_SCALE
+    assert get_byte_vector_scale({"byte_vector_scale": 1016}) == 1016.0
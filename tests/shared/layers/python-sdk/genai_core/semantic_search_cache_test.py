@@ -0,0 +1,114 @@
+import pytest
+import genai_core.semantic_search
+from datetime import datetime
+from genai_core.semantic_search import semantic_search
+from genai_core.utils.cache import LRUCache
+
+workspace = {
+    "workspace_id": "workspace-id",
+    "engine": "aurora",
+    "status": "ready",
+    "updated_at": "2024-01-01T00:00:00.000000Z",
+    "vectors": 10,
+}
+
+
+@pytest.fixture(autouse=True)
+def result_cache(mocker):
+    mocker.patch.object(genai_core.semantic_search, "SEMANTIC_SEARCH_CACHE_SIZE", 100)
+    mocker.patch.object(
+        genai_core.semantic_search, "result_cache", LRUCache(maxsize=100, ttl=600)
+    )
+
+
+@pytest.fixture
+def get_workspace(mocker):
+    return mocker.patch(
+        "genai_core.workspaces.get_workspace", return_value=dict(workspace)
+    )
+
+
+@pytest.fixture
+def query(mocker):
+    return mocker.patch(
+        "genai_core.semantic_search.query_workspace_aurora",
+        side_effect=lambda *args, **kwargs: {
+            "items": [{"content": args[2]}],
+            "timings": {"embeddings": 100.0, "total": 250.0},
+        },
+    )
+
+
+def test_semantic_search_cache_hit(get_workspace, query):
+    first = semantic_search("workspace-id", "What is  RAG?", limit=5)
+    # Same question once normalized
+    second = semantic_search("workspace-id", " What is RAG? ", limit=5)
+
+    assert query.call_count == 1
+    assert second["items"] == first["items"]
+    # No stage ran for the cached result
+    assert set(second["timings"].keys()) == {"cache_hit", "total"}
+    assert second["timings"]["total"] < 250.0
+    # Callers get their own copy
+    second["items"].append({"content": "other"})
+    assert semantic_search("workspace-id", "What is RAG?")["items"] == first["items"]
+
+
+def test_semantic_search_cache_arguments(get_workspace, query):
+    semantic_search("workspace-id", "query", limit=5)
+    semantic_search("workspace-id", "query", limit=10)
+    semantic_search("workspace-id", "query", limit=5, filter={"document_id": "d"})
+    semantic_search("workspace-id", "query", limit=5, filter={"document_id": "d"})
+    # An empty filter is no filter
+    semantic_search("workspace-id", "query", limit=5, filter={})
+
+    assert query.call_count == 3
+
+
+def test_semantic_search_cache_version(get_workspace, query):
+    semantic_search("workspace-id", "query")
+
+    get_workspace.return_value = {**workspace, "vectors": 12}
+    semantic_search("workspace-id", "query")
+    get_workspace.return_value = {
+        **workspace,
+        "vectors": 12,
+        "updated_at": "2024-01-02T00:00:00.000000Z",
+    }
+    semantic_search("workspace-id", "query")
+
+    assert query.call_count == 3
+
+
+def test_semantic_search_cache_engines(mocker, get_workspace):
+    get_workspace.return_value = {**workspace, "engine": "kendra"}
+    kendra = mocker.patch(
+        "genai_core.semantic_search.query_workspace_kendra",
+        return_value={"items": []},
+    )
+
+    semantic_search("workspace-id", "query")
+    semantic_search("workspace-id", "query")
+
+    # Kendra indexes change outside of the workspace version
+    assert kendra.call_count == 2
+
+
+def test_semantic_search_cache_disabled(mocker, get_workspace, query):
+    mocker.patch.object(genai_core.semantic_search, "SEMANTIC_SEARCH_CACHE_SIZE", 0)
+
+    semantic_search("workspace-id", "query")
+    semantic_search("workspace-id", "query")
+
+    assert query.call_count == 2
+
+
+def test_semantic_search_cache_recent_change(get_workspace, query):
+    # Just ingested, the reader endpoint may not have the new chunks yet
+    updated_at = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    get_workspace.return_value = {**workspace, "updated_at": updated_at}
+
+    semantic_search("workspace-id", "query")
+    semantic_search("workspace-id", "query")
+
+    assert query.call_count == 2
@@ -0,0 +1,36 @@
+from genai_core.utils.cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 3, "misses": 1}
+
+
+def test_lru_cache_expires_items(mocker):
+    monotonic = mocker.patch("genai_core.utils.cache.time.monotonic")
+    monotonic.return_value = 100
+    cache = LRUCache(maxsize=2, ttl=10)
+    cache.put("a", 1)
+
+    monotonic.return_value = 105
+    assert cache.get("a") == 1
+
+    monotonic.return_value = 111
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_disabled():
+    cache = LRUCache(maxsize=0)
+    cache.put("a", 1)
+
+    assert cache.get("a", "default") == "default"
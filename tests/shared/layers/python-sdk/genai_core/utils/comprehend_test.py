@@ -0,0 +1,53 @@
+import pytest
+from genai_core.utils import comprehend
+from genai_core.utils.comprehend import get_query_language
+
+
+@pytest.fixture
+def detect_dominant_language(mocker):
+    comprehend.language_cache.clear()
+
+    return mocker.patch.object(
+        comprehend.comprehend,
+        "detect_dominant_language",
+        return_value={"Languages": [{"LanguageCode": "de", "Score": 0.97}]},
+    )
+
+
+def test_get_query_language_offline(detect_dominant_language):
+    language_name, detected_languages = get_query_language(
+        "Wie viel kostet die Fahrkarte nach Berlin?", ["english", "german"]
+    )
+
+    assert language_name == "german"
+    assert detected_languages == [{"code": "de", "score": 1.0}]
+    detect_dominant_language.assert_not_called()
+
+
+def test_get_query_language_comprehend_fallback(detect_dominant_language):
+    # No stopwords, the offline detection is not confident
+    language_name, detected_languages = get_query_language(
+        "Fahrkarte Berlin", ["english", "german"]
+    )
+
+    assert language_name == "german"
+    assert detected_languages == [{"code": "de", "score": 0.97}]
+    detect_dominant_language.assert_called_once_with(Text="Fahrkarte Berlin")
+
+    # Language of the workspace not detected
+    assert get_query_language("Fahrkarte", ["english"])[0] == "english"
+
+
+def test_get_query_language_cache(detect_dominant_language):
+    for _ in range(3):
+        assert get_query_language("Fahrkarte Berlin", ["german"])[0] == "german"
+
+    # Same query once case and spacing are normalized
+    get_query_language(" fahrkarte  BERLIN", ["german"])
+
+    detect_dominant_language.assert_called_once()
+    assert comprehend.language_cache.stats()["hits"] == 3
+
+    # The workspace languages are part of the key
+    get_query_language("Fahrkarte Berlin", ["german", "english"])
+    assert detect_dominant_language.call_count == 2
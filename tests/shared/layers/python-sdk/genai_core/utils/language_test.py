@@ -0,0 +1,38 @@
+import pytest
+from genai_core.utils.language import detect_language, get_chunk_language
+
+
+def test_detect_language():
+    languages = ["english", "french", "german"]
+
+    assert detect_language("What is the price of the ticket?", languages) == (
+        "english",
+        1.0,
+    )
+    assert detect_language("Quel est le prix du billet ?", languages)[0] == "french"
+    assert detect_language("Was kostet die Fahrkarte?", languages)[0] == "german"
+    assert detect_language("12345 ABC", languages) == (None, 0)
+
+
+def test_detect_language_script():
+    assert detect_language("Сколько стоит билет?", ["english", "russian"]) == (
+        "russian",
+        1.0,
+    )
+    assert detect_language("این بلیط چند است", ["persian", "arabic"])[0] == "persian"
+    # The script of a language missing from the workspace
+    assert detect_language("Сколько стоит билет?", ["english"]) == (None, 0)
+
+
+def test_get_chunk_language():
+    assert get_chunk_language("Wo ist der Bahnhof?", ["english"]) == "english"
+    assert get_chunk_language("Wo ist der Bahnhof?", ["english", "german"]) == "german"
+    assert get_chunk_language("42", ["german", "english"]) == "german"
+    assert get_chunk_language("42", []) is None
+
+
+def test_detect_language_confidence():
+    # A single stopword is little evidence
+    language, score = detect_language("the station", ["english", "german"])
+    assert language == "english"
+    assert score == pytest.approx(1 / 3)